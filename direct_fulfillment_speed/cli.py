@@ -94,7 +94,7 @@ def main():
     logger.info(f"Optimization done.")
 
     # Print output
-    ProcessOutputs(config, predict_obj, optimization_obj)
+    ProcessOutputs(config, predict_obj, optimization_obj, inputs.rejection_report)
 
     end_time = dt.datetime.now()
     logger.info(f"Total run time {util.get_clockwise_time_diff(start_time, end_time)} seconds")
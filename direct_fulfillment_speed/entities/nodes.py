@@ -1,9 +1,12 @@
 import enum
 from collections import defaultdict
-from typing import Dict, List, Set
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 from direct_fulfillment_speed.utils import util
 
+if TYPE_CHECKING:
+    from direct_fulfillment_speed.entities.shipment_metrics import RecentMetrics
+
 
 class CarrierType(enum.Enum):
     FIRST_PARTY = "1P"
@@ -80,6 +83,7 @@ class Vendor:
         self.vendor_id: str = vendor_id
         self.vendor_primary_gl: str = vendor_primary_gl
         self.warehouses: Set["Warehouse"] = set()
+        self._hash: int = hash(self.hash_member)
 
     def add_warehouse(self, warehouse: "Warehouse"):
         """Add a warehouse to this vendor."""
@@ -94,12 +98,14 @@ class Vendor:
         return f"{self.vendor_id}"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, Vendor):
             return self.hash_member == other.hash_member
         return False
 
     def __hash__(self):
-        return hash(self.hash_member)
+        return self._hash
 
     @property
     def hash_member(self):
@@ -121,6 +127,9 @@ class Warehouse:
         self.ship_count_before_clustering = 0
         self.use_zip3: bool = False
         self.recent_ship_counts: int = 0
+        # Window label (e.g. T4W) -> recent metrics over that window
+        self.window_metrics: Dict[str, "RecentMetrics"] = {}
+        self._hash: int = hash(self.hash_member)
         vendor.add_warehouse(self)
 
     @property
@@ -136,12 +145,14 @@ class Warehouse:
         return f"{self.warehouse_id}"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, Warehouse):
             return self.hash_member == other.hash_member
         return False
 
     def __hash__(self):
-        return hash(self.hash_member)
+        return self._hash
 
     @property
     def hash_member(self):
@@ -158,6 +169,7 @@ class Carrier:
         self.ship_method: str = ship_method
         self.carrier_type: CarrierType = self.determine_carrier_type(carrier_name)
         self.shipment_type: ShipmentType = ShipmentType.from_ship_method(ship_method)
+        self._hash: int = hash(self.hash_member)
 
     @staticmethod
     def determine_carrier_type(carrier_name: str) -> CarrierType:
@@ -184,12 +196,14 @@ class Carrier:
         return f"{self.ship_method}"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, Carrier):
             return self.hash_member == other.hash_member
         return False
 
     def __hash__(self):
-        return hash(self.hash_member)
+        return self._hash
 
     @property
     def hash_member(self):
@@ -203,6 +217,7 @@ class Destination:
     def __init__(self, zip5: str):
         self.dest_zip5: str = util.to_zip5(zip5)
         self.dest_zip3: str = util.to_zip3(self.dest_zip5)
+        self._hash: int = hash(self.hash_member)
 
     def __str__(self):
         """Print the instance"""
@@ -213,12 +228,14 @@ class Destination:
         return f"{self.dest_zip5}"
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, Destination):
             return self.hash_member == other.hash_member
         return False
 
     def __hash__(self):
-        return hash(self.hash_member)
+        return self._hash
 
     @property
     def hash_member(self):
@@ -253,6 +270,9 @@ class ODS:
         self.recent_c2d_days: float = -1.0
         self.ship_count: int = 0
         self.recent_ship_counts: int = 0
+        # Window label (e.g. T4W) -> recent metrics over that window
+        self.window_metrics: Dict[str, "RecentMetrics"] = {}
+        self._hash: int = hash(self.hash_member)
 
     @property
     def primary_gl(self):
@@ -267,12 +287,14 @@ class ODS:
         return self.__str__()
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, ODS):
             return self.hash_member == other.hash_member
         return False
 
     def __hash__(self):
-        return hash(self.hash_member)
+        return self._hash
 
     @property
     def hash_member(self):
@@ -280,10 +302,23 @@ class ODS:
 
 
 class Node:
-    """Data object for class Nodes."""
+    """
+    Registry of the network nodes, like VendorManager for vendors: every distinct warehouse,
+    carrier, destination and ODS is created once and shared by all the shipments referencing it.
 
-    def __init__(self):
+    Lookups are keyed by the raw input values first, so a repeated record costs one dict lookup
+    instead of a new object, ZIP normalization and a hash of its members.
+    """
+
+    def __init__(self, vendor_manager: Optional[VendorManager] = None):
+        self.vendor_manager = vendor_manager if vendor_manager is not None else VendorManager()
         self.vendors_warehouses: Dict[Vendor, Set[Warehouse]] = defaultdict(set)
+        self._warehouses_by_input: Dict[Tuple[str, str, str], Warehouse] = {}
+        self._warehouses: Dict[Tuple[str, str], Warehouse] = {}
+        self._carriers: Dict[Tuple[str, str, str], Carrier] = {}
+        self._destinations_by_input: Dict[str, Destination] = {}
+        self._destinations: Dict[str, Destination] = {}
+        self._ods: Dict[Tuple[str, str, str], ODS] = {}
 
     def add_warehouse(self, vendor: Vendor, warehouse: Warehouse):
         """Associate a warehouse with a vendor."""
@@ -292,3 +327,73 @@ class Node:
     def get_all_vendors_warehouses(self, vendor: Vendor) -> List[Warehouse]:
         """Get all warehouse objects of a vendor."""
         return list(self.vendors_warehouses.get(vendor, []))
+
+    def get_or_create_vendor(self, vendor_id: str, vendor_primary_gl: str) -> Vendor:
+        """Fetches an existing vendor or creates a new one if it doesn't exist."""
+        return self.vendor_manager.get_or_create_vendor(vendor_id, vendor_primary_gl)
+
+    def get_or_create_warehouse(self, vendor: Vendor, warehouse_id: str, zip5: str) -> Warehouse:
+        """
+        Fetches the warehouse with this ID and ZIP5, creating it on first use, and associates it
+        with the vendor.
+        """
+        input_key = (vendor.vendor_id, warehouse_id, zip5)
+        warehouse = self._warehouses_by_input.get(input_key)
+        if warehouse is None:
+            key = (warehouse_id, util.to_zip5(zip5))
+            warehouse = self._warehouses.get(key)
+            if warehouse is None:
+                warehouse = Warehouse(vendor, warehouse_id, zip5)
+                self._warehouses[key] = warehouse
+            vendor.add_warehouse(warehouse)
+            self.add_warehouse(vendor, warehouse)
+            self._warehouses_by_input[input_key] = warehouse
+        return warehouse
+
+    def get_or_create_carrier(
+        self, carrier_name: str, ship_method_orig: str, ship_method: str
+    ) -> Carrier:
+        """Fetches an existing carrier or creates a new one if it doesn't exist."""
+        key = (carrier_name, ship_method_orig, ship_method)
+        carrier = self._carriers.get(key)
+        if carrier is None:
+            carrier = Carrier(carrier_name, ship_method_orig, ship_method)
+            self._carriers[key] = carrier
+        return carrier
+
+    def get_or_create_destination(self, zip5: str) -> Destination:
+        """Fetches an existing destination or creates a new one if it doesn't exist."""
+        destination = self._destinations_by_input.get(zip5)
+        if destination is None:
+            normalized_zip5 = util.to_zip5(zip5)
+            destination = self._destinations.get(normalized_zip5)
+            if destination is None:
+                destination = Destination(normalized_zip5)
+                self._destinations[normalized_zip5] = destination
+            self._destinations_by_input[zip5] = destination
+        return destination
+
+    def get_or_create_ods(
+        self,
+        origin: Warehouse,
+        carrier: Carrier,
+        dest: Destination,
+        shipment_method: str,
+        distance_zone: str = "",
+    ) -> ODS:
+        """
+        Fetches the ODS of the origin warehouse ID, destination ZIP3 and ship method, creating
+        it from these arguments on first use.
+        """
+        key = (origin.warehouse_id, dest.dest_zip3, shipment_method)
+        ods = self._ods.get(key)
+        if ods is None:
+            ods = ODS(
+                origin=origin,
+                carrier=carrier,
+                dest=dest,
+                shipment_method=shipment_method,
+                distance_zone=distance_zone,
+            )
+            self._ods[key] = ods
+        return ods
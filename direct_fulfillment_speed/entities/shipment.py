@@ -1,18 +1,32 @@
 import logging
-import statistics
 from collections import defaultdict
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
 from direct_fulfillment_speed.entities.nodes import (
     ODS,
     CarrierType,
+    Node,
     ShipmentType,
     ShippingCarrier,
     Warehouse,
 )
+from direct_fulfillment_speed.entities.shipment_metrics import (
+    MetricWindow,
+    RecentMetrics,
+    ShipmentMetrics,
+    aggregate_windows,
+    metric_windows,
+    window_label,
+)
+from direct_fulfillment_speed.entities.shipment_store import (
+    SHIPMENT_TYPES,
+    ShipmentSlice,
+    ShipmentStore,
+)
 from direct_fulfillment_speed.utils import util
 from direct_fulfillment_speed.utils.config import ConfigManager
 
@@ -57,16 +71,39 @@ class ShipmentDistance:
 class ShipmentInstance:
     """
     The class that contains the infor of each shipment.
+
+    Only the fields the pipeline reads are kept, in slots. Datetimes, numbers and the distance
+    are parsed once when the shipment is created instead of on every access.
     """
 
+    __slots__ = (
+        "shipment_id",
+        "order_id",
+        "tracking_id",
+        "vendor",
+        "warehouse",
+        "carrier",
+        "destination",
+        "ship_method",
+        "order_datetime",
+        "of_datetime",
+        "order_date",
+        "c2p_days",
+        "c2p_days_unpadded",
+        "c2d_days",
+        "c2d_c2p_unpadded_gap",
+        "gl_group",
+        "primary_gl",
+        "shipment_type",
+        "distance_to_zip3",
+        "distance_zone",
+    )
+
     def __init__(
         self,
-        region_id,
-        marketplace_id,
         shipment_id,
         order_id,
         tracking_id,
-        package_id,
         vendor,
         warehouse,
         carrier,
@@ -74,70 +111,52 @@ class ShipmentInstance:
         ship_method,
         order_datetime,
         of_datetime,
-        is_fasttrack,
-        c2exsd,
         c2p_days,
         c2p_days_unpadded,
         c2d_days,
-        att_c2d_days,
-        att_failed_pdd,
-        no_att_scan,
-        unpadded_pdd_date,
-        tt_pad,
         gl_group,
         vendor_primary_gl_description,
         distance_mi,
     ):
-        self.region_id = region_id
-        self.marketplace_id = marketplace_id
         self.shipment_id = shipment_id
         self.order_id = order_id
         self.tracking_id = tracking_id
-        self.package_id = package_id
         self.vendor = vendor
         self.warehouse = warehouse
         self.carrier = carrier
         self.destination = destination
         self.ship_method = ship_method
-        self._order_datetime_str = order_datetime
-        self._of_datetime_str = of_datetime
-        self.is_fasttrack = is_fasttrack
-        self.c2exsd = c2exsd
-        self.c2p_days = c2p_days
-        self.c2p_days_unpadded = float(c2p_days_unpadded)
-        self.c2d_days = float(c2d_days)
-        self.att_c2d_days = att_c2d_days
-        self.att_failed_pdd = att_failed_pdd
-        self.no_att_scan = no_att_scan
-        self.unpadded_pdd_date = unpadded_pdd_date
-        self.tt_pad = tt_pad
+        self.order_datetime: Optional[datetime] = util.convert_time_str_to_dt_object(
+            order_datetime
+        )
+        self.of_datetime: Optional[datetime] = (
+            None if pd.isna(of_datetime) else util.convert_time_str_to_dt_object(of_datetime)
+        )
+        self.order_date: Optional[datetime] = (
+            self.of_datetime if self.of_datetime is not None else self.order_datetime
+        )
+        self.c2p_days: float = self._parse_days(c2p_days)
+        self.c2p_days_unpadded: float = float(c2p_days_unpadded)
+        self.c2d_days: float = float(c2d_days)
+        self.c2d_c2p_unpadded_gap: float = self.c2d_days - self.c2p_days_unpadded
         self.gl_group = gl_group
         self.primary_gl = vendor_primary_gl_description
-        self.c2d_c2p_unpadded_gap = self.c2d_days - self.c2p_days_unpadded
         self.shipment_type = carrier.shipment_type
-        self.distance = ShipmentDistance(distance_mi)
-
-    @property
-    def order_datetime(self):
-        return util.convert_time_str_to_dt_object(self._order_datetime_str)
-
-    @property
-    def distance_to_zip3(self):
-        return self.distance.distance_mi
+        distance = ShipmentDistance(distance_mi)
+        self.distance_to_zip3: Optional[int] = distance.distance_mi
+        self.distance_zone: str = distance.zone
 
-    @property
-    def distance_zone(self):
-        return self.distance.zone
-
-    @property
-    def of_datetime(self):
-        if pd.isna(self._of_datetime_str):
-            return None
-        return util.convert_time_str_to_dt_object(self._of_datetime_str)
+    @staticmethod
+    def _parse_days(days) -> float:
+        """Convert a day count to float; missing or non-numeric values become NaN."""
+        try:
+            return float(days)
+        except (TypeError, ValueError):
+            return float("nan")
 
     @property
-    def get_order_date(self):
-        return self.of_datetime if self.of_datetime is not None else self.order_datetime
+    def get_order_date(self) -> Optional[datetime]:
+        return self.order_date
 
     def __str__(self):
         """
@@ -174,15 +193,80 @@ class ShipmentInstance:
         )
 
 
+class ShipmentCounts:
+    """
+    Shipment counts by group, shipment type, GL, distance zone and entity.
+
+    The counts are computed in one pass over the store when the shipment groups are built, so
+    that count and percentage queries are lookups instead of scans over the shipments.
+    """
+
+    def __init__(self):
+        # Counts are arrays indexed by the shipment type codes of SHIPMENT_TYPES
+        self._by_entity: Dict[str, Dict[Union[ODS, Warehouse], np.ndarray]] = defaultdict(dict)
+        self._by_segment: Dict[Tuple[str, str, Optional[str]], np.ndarray] = {}
+        self._by_group: Dict[str, np.ndarray] = {}
+
+    def add(self, group: str, entity: Union[ODS, Warehouse], type_counts: np.ndarray) -> None:
+        """Register the shipment counts by type of one entity of a group."""
+        self._by_entity[group][entity] = type_counts
+        distance_zone = entity.distance_zone if isinstance(entity, ODS) else None
+        segment = (group, entity.primary_gl, distance_zone)
+        self._by_segment[segment] = self._by_segment.get(segment, 0) + type_counts
+        self._by_group[group] = self._by_group.get(group, 0) + type_counts
+
+    def count(
+        self,
+        group: str,
+        shipment_type: Optional[ShipmentType] = None,
+        primary_gl: Optional[str] = None,
+        distance_zone: Optional[str] = None,
+        entity: Optional[Union[ODS, Warehouse]] = None,
+    ) -> int:
+        """
+        Return the number of shipments of a group, optionally restricted to a shipment type,
+        a GL, a distance zone or a single entity.
+
+        Args:
+            group: Name of the shipment group.
+            shipment_type: Air/Ground/SWA.
+            primary_gl: Primary GL of the ODS/Warehouse.
+            distance_zone: Distance zone of the ODS.
+            entity: ODS or Warehouse.
+
+        Returns:
+            The number of matching shipments.
+        """
+        if entity is not None:
+            counts = self._by_entity[group].get(entity)
+        elif primary_gl is None and distance_zone is None:
+            counts = self._by_group.get(group)
+        else:
+            counts = None
+            for segment, segment_counts in self._by_segment.items():
+                segment_group, segment_gl, segment_zone = segment
+                if (
+                    segment_group == group
+                    and (primary_gl is None or segment_gl == primary_gl)
+                    and (distance_zone is None or segment_zone == distance_zone)
+                ):
+                    counts = segment_counts if counts is None else counts + segment_counts
+        if counts is None:
+            return 0
+        if shipment_type is not None:
+            return int(counts[SHIPMENT_TYPES.index(shipment_type)])
+        return int(counts.sum())
+
+
 class ShipmentClass:
-    def __init__(self, config: ConfigManager) -> None:
-        self.shipment_groups: Dict[str, Dict[Union[ODS, Warehouse], List[ShipmentInstance]]] = {
-            CarrierType.ALL.name: defaultdict(list),
-            CarrierType.THIRD_PARTY.name: defaultdict(list),
-            ShippingCarrier.SWA.name: defaultdict(list),
-            CarrierType.OTHERS.name: defaultdict(list),
-        }
+    def __init__(self, config: ConfigManager, nodes: Optional[Node] = None) -> None:
+        self._shipment_groups: Optional[
+            Dict[str, Dict[Union[ODS, Warehouse], ShipmentSlice]]
+        ] = None
+        self._shipment_counts: Optional[ShipmentCounts] = None
         self.config = config
+        # Registry of the warehouses, carriers, destinations and ODSs the shipments refer to
+        self.nodes: Node = nodes if nodes is not None else Node()
         self.sparse_groups: Dict[
             str, Dict[Union[ODS, Warehouse], List[ShipmentInstance]]
         ] = defaultdict(dict)
@@ -197,20 +281,53 @@ class ShipmentClass:
         if self.model_test_end_date is None:
             raise ValueError("Test end date is not configured or is None.")
 
-        # Find the most recent of_datetime
-        # TODO: For now, get the unpadded_DEA for T4W (3weeks). Need to check it out again.
-        self.most_recent_shipment = (self.model_test_end_date - timedelta(days=28)).date()
-        if self.most_recent_shipment is None:
-            raise ValueError("No date found for most recent date. Check config file.")
+        # The recent metrics are computed over every metric window; the recent window is the one
+        # the model reads through the recent_* attributes of the ODSs/Warehouses.
+        self.metric_windows: List[MetricWindow] = metric_windows(
+            self.model_test_end_date, self.config.metric_window_days
+        )
+        self.recent_window = window_label(self.config.recent_window_days)
+        self.most_recent_shipment = (
+            self.model_test_end_date - timedelta(days=self.config.recent_window_days)
+        ).date()
+
+        # All shipments, as columns; the shipment groups are views over its rows. In streaming
+        # mode the recent metrics, and the sketches of the dense entities if enabled, are
+        # accumulated while the shipments are added.
+        self.store = ShipmentStore(
+            ShipmentMetrics(
+                self.metric_windows,
+                self.config.sketch_bins_per_day if self.config.sketch_min_shipments > 0 else 0,
+            )
+            if self.config.streaming_metrics
+            else None
+        )
+
+    @property
+    def shipment_groups(self) -> Dict[str, Dict[Union[ODS, Warehouse], ShipmentSlice]]:
+        """
+        The shipments of each group ('ALL', 'THIRD_PARTY', 'SWA' and 'OTHERS'), keyed by ODS or
+        Warehouse. Each entry is a ShipmentSlice view over the store. The groups are built on
+        first access, after which the store is final.
+        """
+        if self._shipment_groups is None:
+            self._shipment_groups, self._shipment_counts = self._build_shipment_groups()
+        return self._shipment_groups
+
+    @property
+    def shipment_counts(self) -> ShipmentCounts:
+        """Shipment counts of the shipment groups, built with them."""
+        if self._shipment_counts is None:
+            self._shipment_groups, self._shipment_counts = self._build_shipment_groups()
+        return self._shipment_counts
 
     def add_shipment(self, shipment_instance: ShipmentInstance) -> None:
         """
-        Adds a shipment instance to the relevant group based on the carrier.
+        Adds a shipment instance to the shipment store.
 
-          This method checks the carrier of the given shipment instance and,
-          if it's one of the specified carriers (SWA, UPS, AMXL), adds it to
-          the appropriate group ('ALL', 'THIRD_PARTY', or 'SWA'). Shipments from
-          other carriers are not processed and are added to OTHERS group.
+          The shipment is grouped by its carrier when the groups are built: SWA and UPS
+          shipments go to the 'SWA' and 'THIRD_PARTY' groups, shipments from other carriers to
+          the 'OTHERS' group, and every shipment to the 'ALL' group of its warehouse.
 
           TODO: Re-evaluate the carrier filter. This method currently only processes
           shipments from SWA, and UPS carriers. Consider whether shipments
@@ -222,43 +339,195 @@ class ShipmentClass:
         Returns:
             None
         """
-        self.shipment_groups[CarrierType.ALL.name][shipment_instance.warehouse].append(
-            shipment_instance
+        self.store.append_row(
+            {
+                "vendor_id": shipment_instance.vendor.vendor_id or "",
+                "primary_gl": shipment_instance.primary_gl or "Unknown",
+                "gl_group": shipment_instance.gl_group or "Unknown",
+                "warehouse_id": shipment_instance.warehouse.warehouse_id,
+                "origin_zip5": shipment_instance.warehouse.warehouse_zip5,
+                "carrier": shipment_instance.carrier.carrier,
+                "ship_method_orig": shipment_instance.carrier.ship_method_orig or "",
+                "ship_method": shipment_instance.ship_method,
+                "dest_zip5": shipment_instance.destination.dest_zip5,
+                "dest_zip3": shipment_instance.destination.dest_zip3,
+            },
+            {
+                "order_date": shipment_instance.order_date,
+                "c2p_days": shipment_instance.c2p_days,
+                "c2p_days_unpadded": shipment_instance.c2p_days_unpadded,
+                "c2d_days": shipment_instance.c2d_days,
+                "distance_mi": shipment_instance.distance_to_zip3,
+            },
         )
-        if shipment_instance.carrier.carrier in (
-            ShippingCarrier.SWA.name,
-            ShippingCarrier.UPS.name,
-        ):
-            group, key = self._determine_group_and_key_for_shipment(shipment_instance)
-            self.shipment_groups[group][key].append(shipment_instance)
-        else:
-            self.shipment_groups[CarrierType.OTHERS.name][shipment_instance.warehouse].append(
-                shipment_instance
-            )
 
-    @staticmethod
-    def _determine_group_and_key_for_shipment(
-        shipment_instance: ShipmentInstance,
-    ) -> Tuple[str, Union[ODS, Warehouse]]:
+    def add_shipment_store(self, store: ShipmentStore) -> None:
         """
-        Identify 1P vs. 3P shipments and carries.
+        Add the shipments of a columnar ShipmentStore, e.g. from the columnar ingestion mode.
+
         Args:
-            shipment_instance: Object of shipment instance to be added.
+            store: Columnar shipments.
 
         Returns:
-            String contains the name of teh carrier and node type i.e., ODS or SWA.
+            None
+        """
+        if self.store.is_empty and not self.store.is_finalized:
+            self.store = store.finalize()
+        else:
+            self.store.append_store(store)
+
+    def _build_shipment_groups(
+        self,
+    ) -> Tuple[Dict[str, Dict[Union[ODS, Warehouse], ShipmentSlice]], ShipmentCounts]:
+        """
+        Split the shipments of the store into the shipment groups.
+
+        The rows are keyed by ODS/Warehouse with vectorized operations on the integer codes of
+        the store, so the node registry is queried once per distinct key, and keys are numbered in
+        order of first appearance. The store rows are then sorted by key, and each group entry is
+        a ShipmentSlice view over its contiguous rows. The 'ALL' group holds index views, since
+        the shipments of a warehouse are spread over several groups. The shipment counts by type
+        of every entity are computed in the same pass.
 
+        Returns:
+            The shipment groups and their shipment counts.
         """
-        if shipment_instance.carrier.carrier == ShippingCarrier.SWA.name:
-            return ShippingCarrier.SWA.name, shipment_instance.warehouse
+        shipment_groups: Dict[str, Dict[Union[ODS, Warehouse], ShipmentSlice]] = {
+            CarrierType.ALL.name: {},
+            CarrierType.THIRD_PARTY.name: {},
+            ShippingCarrier.SWA.name: {},
+            CarrierType.OTHERS.name: {},
+        }
+        store = self.store.finalize()
+        shipment_counts = ShipmentCounts()
+        if len(store) == 0:
+            return shipment_groups, shipment_counts
+
+        codes = store.codes
+        swa, third_party, others = 0, 1, 2
+        group_names = {
+            swa: ShippingCarrier.SWA.name,
+            third_party: CarrierType.THIRD_PARTY.name,
+            others: CarrierType.OTHERS.name,
+        }
+        carrier_groups = np.array(
+            [
+                swa
+                if carrier == ShippingCarrier.SWA.name
+                else third_party
+                if carrier == ShippingCarrier.UPS.name
+                else others
+                for carrier in store.categories["carrier"]
+            ],
+            dtype=np.int64,
+        )
+        row_groups = carrier_groups[codes["carrier"]]
+
+        # Warehouses are keyed by (warehouse_id, zip5), ODSs by (warehouse_id, zip3, ship method).
+        # Keys are numbered in order of first appearance, like dicts populated record by record.
+        warehouse_keys, warehouse_first_rows = store.factorize_keys(
+            codes["warehouse_id"], codes["origin_zip5"]
+        )
+        is_third_party = row_groups == third_party
+        entity_keys, entity_first_rows = store.factorize_keys(
+            row_groups,
+            np.where(is_third_party, codes["warehouse_id"], warehouse_keys),
+            np.where(is_third_party, codes["dest_zip3"], 0),
+            np.where(is_third_party, codes["ship_method"], 0),
+        )
+
+        # Vendors, warehouses and entities come from the registry, built from their first record.
+        # A streaming store does not keep the fields only needed here; the metrics saved them.
+        metrics = store.metrics
+        if metrics is None:
+            _, vendor_first_rows = np.unique(codes["vendor_id"], return_index=True)
+            for row in vendor_first_rows:
+                self.nodes.get_or_create_vendor(
+                    store.value_at("vendor_id", row), store.value_at("primary_gl", row)
+                )
         else:
-            return CarrierType.THIRD_PARTY.name, ODS(
-                origin=shipment_instance.warehouse,
-                carrier=shipment_instance.carrier,
-                dest=shipment_instance.destination,
-                shipment_method=shipment_instance.ship_method,
-                distance_zone=shipment_instance.distance_zone,
+            for vendor_id, primary_gl in metrics.vendor_primary_gls.items():
+                self.nodes.get_or_create_vendor(vendor_id, primary_gl)
+
+        warehouses: List[Warehouse] = []
+        for row in warehouse_first_rows:
+            warehouse_id = store.value_at("warehouse_id", row)
+            zip5 = store.value_at("origin_zip5", row)
+            if metrics is None:
+                vendor_id = store.value_at("vendor_id", row)
+                primary_gl = store.value_at("primary_gl", row)
+            else:
+                vendor_id = metrics.warehouse_vendors[(warehouse_id, zip5)]
+                primary_gl = metrics.vendor_primary_gls[vendor_id]
+            vendor = self.nodes.get_or_create_vendor(vendor_id, primary_gl)
+            warehouses.append(self.nodes.get_or_create_warehouse(vendor, warehouse_id, zip5))
+
+        entities: List[Union[ODS, Warehouse]] = []
+        for row in entity_first_rows:
+            warehouse = warehouses[warehouse_keys[row]]
+            if row_groups[row] == third_party:
+                ship_method = store.value_at("ship_method", row)
+                if metrics is None:
+                    ship_method_orig = store.value_at("ship_method_orig", row)
+                    distance_mi = store.value_at("distance_mi", row)
+                else:
+                    first_row = metrics.entities[
+                        (
+                            CarrierType.THIRD_PARTY.name,
+                            warehouse.warehouse_id,
+                            store.value_at("dest_zip3", row),
+                            ship_method,
+                        )
+                    ].first_row
+                    ship_method_orig = first_row["ship_method_orig"]
+                    distance_mi = first_row["distance_mi"]
+                entities.append(
+                    self.nodes.get_or_create_ods(
+                        origin=warehouse,
+                        carrier=self.nodes.get_or_create_carrier(
+                            store.value_at("carrier", row), ship_method_orig, ship_method
+                        ),
+                        dest=self.nodes.get_or_create_destination(store.value_at("dest_zip5", row)),
+                        shipment_method=ship_method,
+                        distance_zone=ShipmentDistance(distance_mi).zone,
+                    )
+                )
+            else:
+                entities.append(warehouse)
+
+        # Shipment counts by entity and shipment type
+        num_types = len(SHIPMENT_TYPES)
+        type_codes = store.values["shipment_type"].astype(np.int64)
+        entity_type_counts = np.bincount(
+            entity_keys * num_types + type_codes, minlength=len(entities) * num_types
+        ).reshape(len(entities), num_types)
+        warehouse_type_counts = np.bincount(
+            warehouse_keys * num_types + type_codes, minlength=len(warehouses) * num_types
+        ).reshape(len(warehouses), num_types)
+
+        # Make the rows of every entity contiguous; the stable sort keeps the input order
+        # within each entity.
+        order = np.argsort(entity_keys, kind="stable")
+        store.reorder(order)
+        entity_stops = np.cumsum(np.bincount(entity_keys, minlength=len(entities)))
+        entity_starts = entity_stops - np.bincount(entity_keys, minlength=len(entities))
+
+        for key, entity in enumerate(entities):
+            group = group_names[row_groups[entity_first_rows[key]]]
+            shipment_groups[group][entity] = ShipmentSlice(
+                store, slice(int(entity_starts[key]), int(entity_stops[key]))
             )
+            shipment_counts.add(group, entity, entity_type_counts[key])
+
+        # The ALL group holds every shipment of a warehouse, which is not contiguous in the store
+        sorted_warehouse_keys = warehouse_keys[order]
+        warehouse_order = np.argsort(sorted_warehouse_keys, kind="stable")
+        warehouse_stops = np.cumsum(np.bincount(sorted_warehouse_keys, minlength=len(warehouses)))
+        for key, rows in enumerate(np.split(warehouse_order, warehouse_stops[:-1])):
+            shipment_groups[CarrierType.ALL.name][warehouses[key]] = ShipmentSlice(store, rows)
+            shipment_counts.add(CarrierType.ALL.name, warehouses[key], warehouse_type_counts[key])
+
+        return shipment_groups, shipment_counts
 
     def calculate_cumulative_ship_percentages(self) -> Dict[Union[ODS, Warehouse], float]:
         """
@@ -272,9 +541,9 @@ class ShipmentClass:
             self.total_number_shipments_by_group(group) for group in relevant_groups
         )
         cumulative_percentages = {
-            key: len(shipments) / total_shipments * 100
+            key: self.shipment_counts.count(group, entity=key) / total_shipments * 100
             for group in relevant_groups
-            for key, shipments in self.shipment_groups[group].items()
+            for key in self.shipment_groups[group]
         }
         return cumulative_percentages
 
@@ -295,81 +564,118 @@ class ShipmentClass:
         if group not in self.shipment_groups:
             raise ValueError(f"Group '{group}' not found in shipment groups.")
 
-        if shipment_type:
-            return sum(
-                len([s for s in shipments if s.shipment_type == shipment_type])
-                for shipments in self.shipment_groups[group].values()
-            )
-        else:
-            return sum(len(shipments) for shipments in self.shipment_groups[group].values())
+        return self.shipment_counts.count(group, shipment_type=shipment_type)
 
     def extract_ods_warehouse_metrics(self) -> None:
         """
         Calculate the unpadded DEA and padded DEA for each ODS or warehouse and add it to a dictionary.
 
-        This method performs the following steps:
-        1. Filters shipments for the most recent weeks.
-        2. Groups the recent shipments by week.
+        This method performs the following steps as one grouped aggregation over the store, for
+        every metric window at once:
+        1. Filters shipments for the weeks of each window.
+        2. Groups the shipments by (window, entity, week).
         3. Calculates the DEA for each week.
         4. Uses the mean of the weekly DEAs to mitigate the effect of outliers.
         5. Calculates C2P metrics using the mean.
 
-        Calculated Metrics:
+        The metrics of every window are set in key.window_metrics, keyed by the window label
+        (e.g. T4W), and those of the recent window also in:
             key.recent_unpadded_dea (float): The original unpadded DEA calculated for comparison.
             key.recent_dea (float): The original padded DEA calculated for comparison.
             key.recent_unpadded_c2p_days (float): The median unpadded click-to-promise days.
             key.recent_c2d_days (float): The median click-to-delivery days.
             key.recent_c2p_days (float): The median click-to-promise days.
             key.recent_ship_counts (int): The total number of recent shipments.
+
+        In streaming mode the metrics were accumulated during ingestion and are only copied.
         """
+        if self.store.metrics is not None:
+            self._copy_streaming_metrics(self.store.metrics)
+            return
+
+        entities: List[Union[ODS, Warehouse]] = []
+        slices: List[ShipmentSlice] = []
         for group in [CarrierType.THIRD_PARTY.name, ShippingCarrier.SWA.name]:
             for key, shipments in self.shipment_groups[group].items():
-                # Filter shipments for the most recent weeks
-                recent_shipments = [
-                    s for s in shipments if s.get_order_date.date() >= self.most_recent_shipment
-                ]
-                if not recent_shipments:
-                    continue
-
-                total_recent_shipments = len(recent_shipments)
-                key.recent_ship_counts = total_recent_shipments
-
-                # Group shipments by week
-                weekly_shipments = defaultdict(list)
-                for s in recent_shipments:
-                    week = (s.get_order_date.date() - self.most_recent_shipment).days // 7
-                    weekly_shipments[week].append(s)
-
-                weekly_unpadded_deas = []
-                weekly_padded_deas = []
-
-                for week_shipments in weekly_shipments.values():
-                    week_total = len(week_shipments)
-                    if week_total == 0:
-                        continue
-
-                    week_failed_unpadded = sum(
-                        1 for s in week_shipments if s.c2p_days_unpadded < s.c2d_days
-                    )
-                    week_failed_padded = sum(1 for s in week_shipments if s.c2p_days < s.c2d_days)
-
-                    week_unpadded_dea = (week_total - week_failed_unpadded) / week_total
-                    week_padded_dea = (week_total - week_failed_padded) / week_total
-
-                    weekly_unpadded_deas.append(week_unpadded_dea)
-                    weekly_padded_deas.append(week_padded_dea)
+                entities.append(key)
+                slices.append(shipments)
+        if not entities:
+            return
+
+        # Store rows of every entity, with the position of the entity in `entities`
+        rows, lengths = ShipmentSlice.concatenate_rows(slices)
+        row_entities = np.repeat(np.arange(len(entities)), lengths)
+
+        num_entities = len(entities)
+        aggregates = aggregate_windows(
+            row_entities,
+            num_entities,
+            self.store.values["order_date"][rows],
+            [window.start for window in self.metric_windows],
+            self.store.values["c2p_days"][rows],
+            self.store.values["c2p_days_unpadded"][rows],
+            self.store.values["c2d_days"][rows],
+        )
 
-                if weekly_unpadded_deas and weekly_padded_deas:
-                    key.recent_unpadded_dea = statistics.mean(weekly_unpadded_deas)
-                    key.recent_dea = statistics.mean(weekly_padded_deas)
+        # Mean of the weekly DEAs and of the C2P/C2D days of every (window, entity)
+        num_groups = len(self.metric_windows) * num_entities
+        week_totals = aggregates.week_totals
+        week_unpadded_deas = (week_totals - aggregates.week_failed_unpadded) / week_totals
+        week_padded_deas = (week_totals - aggregates.week_failed_padded) / week_totals
+        weeks_per_group = np.bincount(aggregates.week_groups, minlength=num_groups)
+        ship_counts = aggregates.ship_counts
+        week_groups = aggregates.week_groups
+        with np.errstate(invalid="ignore", divide="ignore"):
+            unpadded_deas = (
+                np.bincount(week_groups, weights=week_unpadded_deas, minlength=num_groups)
+                / weeks_per_group
+            )
+            padded_deas = (
+                np.bincount(week_groups, weights=week_padded_deas, minlength=num_groups)
+                / weeks_per_group
+            )
+            mean_c2p_days_unpadded = aggregates.sum_c2p_days_unpadded / ship_counts
+            mean_c2d_days = aggregates.sum_c2d_days / ship_counts
+            mean_c2p_days = aggregates.sum_c2p_days / ship_counts
+
+        for group in np.flatnonzero(ship_counts):
+            window, index = divmod(int(group), num_entities)
+            self._set_window_metrics(
+                entities[index],
+                self.metric_windows[window].label,
+                RecentMetrics(
+                    ship_count=int(ship_counts[group]),
+                    unpadded_dea=float(unpadded_deas[group]),
+                    dea=float(padded_deas[group]),
+                    unpadded_c2p_days=float(mean_c2p_days_unpadded[group]),
+                    c2p_days=float(mean_c2p_days[group]),
+                    c2d_days=float(mean_c2d_days[group]),
+                ),
+            )
 
-                # Calculate and store c2ps
-                if recent_shipments:
-                    key.recent_unpadded_c2p_days = statistics.mean(
-                        s.c2p_days_unpadded for s in recent_shipments
-                    )
-                    key.recent_c2d_days = statistics.mean(s.c2d_days for s in recent_shipments)
-                    key.recent_c2p_days = statistics.mean(s.c2p_days for s in recent_shipments)
+    def _copy_streaming_metrics(self, metrics: ShipmentMetrics) -> None:
+        """Set the window metrics of the 3P and SWA entities from the streaming accumulators."""
+        for group in [CarrierType.THIRD_PARTY.name, ShippingCarrier.SWA.name]:
+            for key in self.shipment_groups[group]:
+                entity_metrics = metrics.get((group, *key.hash_member))
+                if entity_metrics is None:
+                    continue
+                for window, totals in zip(metrics.windows, entity_metrics.windows):
+                    if totals.ship_count:
+                        self._set_window_metrics(key, window.label, totals.recent_metrics())
+
+    def _set_window_metrics(
+        self, key: Union[ODS, Warehouse], label: str, metrics: RecentMetrics
+    ) -> None:
+        """Attach the metrics of one window to an ODS/Warehouse."""
+        key.window_metrics[label] = metrics
+        if label == self.recent_window:
+            key.recent_ship_counts = metrics.ship_count
+            key.recent_unpadded_dea = metrics.unpadded_dea
+            key.recent_dea = metrics.dea
+            key.recent_unpadded_c2p_days = metrics.unpadded_c2p_days
+            key.recent_c2d_days = metrics.c2d_days
+            key.recent_c2p_days = metrics.c2p_days
 
     def update_shipment_counts(self) -> None:
         """
@@ -378,26 +684,26 @@ class ShipmentClass:
             None.
         """
         for group in [CarrierType.THIRD_PARTY.name, ShippingCarrier.SWA.name]:
-            for key, shipments in self.shipment_groups[group].items():
-                total_shipments = len(shipments)
-                key.ship_count = total_shipments
+            for key in self.shipment_groups[group]:
+                key.ship_count = self.shipment_counts.count(group, entity=key)
 
-    def get_shipments_for_entity(self, entity: Union[ODS, Warehouse]) -> List[ShipmentInstance]:
+    def get_shipments_for_entity(self, entity: Union[ODS, Warehouse]) -> ShipmentSlice:
         """
          Retrieve the shipments for a given ODS or Warehouse.
         Args:
             entity: ODS or Warehouse objects.
 
         Returns:
-            List of shipment instances for each ODS or Warehouse.
+            A view over the store rows of the ODS or Warehouse; empty if it has no shipments.
         """
         if isinstance(entity, ODS):
-            return self.shipment_groups[CarrierType.THIRD_PARTY.name].get(entity, [])
+            shipments = self.shipment_groups[CarrierType.THIRD_PARTY.name].get(entity)
         elif isinstance(entity, Warehouse):
-            return self.shipment_groups[ShippingCarrier.SWA.name].get(entity, [])
+            shipments = self.shipment_groups[ShippingCarrier.SWA.name].get(entity)
         else:
             logger.warning(f"Unknown entity type for {entity}.")
-            return []
+            shipments = None
+        return shipments if shipments is not None else ShipmentSlice(self.store, slice(0, 0))
 
     def identify_sparse_ods(self) -> Tuple[List[ODS], List[Union[ODS, Warehouse]]]:
         """
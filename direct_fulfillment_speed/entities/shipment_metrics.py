@@ -0,0 +1,398 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from direct_fulfillment_speed.entities.nodes import CarrierType, ShippingCarrier
+from direct_fulfillment_speed.optimization.quantile_sketch import DecayedQuantileSketch
+
+logger = logging.getLogger()
+
+# Key of an entity's metrics: (group name, *hash_member of the ODS or Warehouse)
+MetricsKey = Tuple[str, ...]
+
+
+class MetricWindow(NamedTuple):
+    """A lookback window of the recent metrics, ending at the model test end date."""
+
+    label: str
+    start: date
+
+
+def window_label(days: int) -> str:
+    """Label of a window length, e.g. T4W for 28 days or T10D for 10 days."""
+    return f"T{days // 7}W" if days % 7 == 0 else f"T{days}D"
+
+
+def metric_windows(test_end_date: datetime, window_days: Sequence[int]) -> List[MetricWindow]:
+    """
+    Build the metric windows ending at the test end date, without duplicates.
+
+    Args:
+        test_end_date: End of the windows.
+        window_days: Length of each window in days.
+
+    Returns:
+        The windows, in the order of ``window_days``.
+    """
+    windows: Dict[str, MetricWindow] = {}
+    for days in window_days:
+        if days <= 0:
+            raise ValueError(f"Metric windows must be at least one day long, got {days}.")
+        label = window_label(days)
+        start = (test_end_date - timedelta(days=days)).date()
+        windows.setdefault(label, MetricWindow(label, start))
+    return list(windows.values())
+
+
+class RecentMetrics:
+    """Recent DEA and C2P/C2D metrics of one ODS/Warehouse over one window."""
+
+    __slots__ = (
+        "ship_count",
+        "unpadded_dea",
+        "dea",
+        "unpadded_c2p_days",
+        "c2p_days",
+        "c2d_days",
+    )
+
+    def __init__(
+        self,
+        ship_count: int,
+        unpadded_dea: float,
+        dea: float,
+        unpadded_c2p_days: float,
+        c2p_days: float,
+        c2d_days: float,
+    ):
+        self.ship_count = ship_count
+        self.unpadded_dea = unpadded_dea
+        self.dea = dea
+        self.unpadded_c2p_days = unpadded_c2p_days
+        self.c2p_days = c2p_days
+        self.c2d_days = c2d_days
+
+
+class WindowAggregates(NamedTuple):
+    """
+    Sums of the shipments of each (window, key) group and counts of each (window, key, week).
+
+    Groups are numbered ``window * num_keys + key``; the per-group arrays have one entry per
+    group and the weekly arrays one entry per distinct (group, week).
+    """
+
+    ship_counts: np.ndarray
+    sum_c2p_days: np.ndarray
+    sum_c2p_days_unpadded: np.ndarray
+    sum_c2d_days: np.ndarray
+    week_groups: np.ndarray
+    weeks: np.ndarray
+    week_totals: np.ndarray
+    week_failed_unpadded: np.ndarray
+    week_failed_padded: np.ndarray
+
+
+def aggregate_windows(
+    keys: np.ndarray,
+    num_keys: int,
+    order_dates: np.ndarray,
+    window_starts: Sequence[date],
+    c2p_days: np.ndarray,
+    c2p_days_unpadded: np.ndarray,
+    c2d_days: np.ndarray,
+) -> WindowAggregates:
+    """
+    Aggregate shipments by key for all the windows in one grouped pass: every shipment is
+    repeated once per window it falls in, and the (window, key) and (window, key, week) groups
+    are counted together. Weeks are numbered from the start of their window.
+
+    Args:
+        keys: Entity key of every shipment, in ``range(num_keys)``.
+        num_keys: Number of entity keys.
+        order_dates: Order date of every shipment.
+        window_starts: First day of each window.
+        c2p_days: Padded C2P days of every shipment.
+        c2p_days_unpadded: Unpadded C2P days of every shipment.
+        c2d_days: C2D days of every shipment.
+
+    Returns:
+        The sums and weekly counts of every (window, key).
+    """
+    order_days = np.asarray(order_dates).astype("datetime64[D]")
+    earliest_start = np.datetime64(min(window_starts), "D")
+    days_since_start = (order_days - earliest_start).astype(np.int64)
+    offsets = np.array(
+        [(np.datetime64(start, "D") - earliest_start).astype(np.int64) for start in window_starts],
+        dtype=np.int64,
+    )
+    valid = ~np.isnat(order_days)
+
+    window_rows = [np.flatnonzero(valid & (days_since_start >= offset)) for offset in offsets]
+    windows = np.repeat(np.arange(len(window_starts)), [len(rows) for rows in window_rows])
+    rows = np.concatenate(window_rows)
+
+    groups = windows * num_keys + np.asarray(keys, dtype=np.int64)[rows]
+    weeks = (days_since_start[rows] - offsets[windows]) // 7
+    c2p_days = np.asarray(c2p_days, dtype=np.float64)[rows]
+    c2p_days_unpadded = np.asarray(c2p_days_unpadded, dtype=np.float64)[rows]
+    c2d_days = np.asarray(c2d_days, dtype=np.float64)[rows]
+
+    num_groups = len(window_starts) * num_keys
+    week_span = int(weeks.max(initial=0)) + 1
+    group_weeks, week_index = np.unique(groups * week_span + weeks, return_inverse=True)
+    num_weeks = len(group_weeks)
+    return WindowAggregates(
+        ship_counts=np.bincount(groups, minlength=num_groups),
+        sum_c2p_days=np.bincount(groups, weights=c2p_days, minlength=num_groups),
+        sum_c2p_days_unpadded=np.bincount(groups, weights=c2p_days_unpadded, minlength=num_groups),
+        sum_c2d_days=np.bincount(groups, weights=c2d_days, minlength=num_groups),
+        week_groups=group_weeks // week_span,
+        weeks=group_weeks % week_span,
+        week_totals=np.bincount(week_index, minlength=num_weeks),
+        week_failed_unpadded=np.bincount(
+            week_index, weights=c2p_days_unpadded < c2d_days, minlength=num_weeks
+        ),
+        week_failed_padded=np.bincount(
+            week_index, weights=c2p_days < c2d_days, minlength=num_weeks
+        ),
+    )
+
+
+class WindowTotals:
+    """Running totals of the shipments of one ODS/Warehouse in one window."""
+
+    __slots__ = (
+        "ship_count",
+        "sum_c2p_days",
+        "sum_c2p_days_unpadded",
+        "sum_c2d_days",
+        "weekly_counts",
+    )
+
+    def __init__(self):
+        self.ship_count: int = 0
+        self.sum_c2p_days: float = 0.0
+        self.sum_c2p_days_unpadded: float = 0.0
+        self.sum_c2d_days: float = 0.0
+        # Week index -> [shipments, failed unpadded, failed padded]
+        self.weekly_counts: Dict[int, List[int]] = {}
+
+    def merge(self, other: "WindowTotals") -> None:
+        self.ship_count += other.ship_count
+        self.sum_c2p_days += other.sum_c2p_days
+        self.sum_c2p_days_unpadded += other.sum_c2p_days_unpadded
+        self.sum_c2d_days += other.sum_c2d_days
+        for week, counts in other.weekly_counts.items():
+            totals = self.weekly_counts.setdefault(week, [0, 0, 0])
+            for index, count in enumerate(counts):
+                totals[index] += count
+
+    def recent_metrics(self) -> RecentMetrics:
+        """The metrics of the window: means of the weekly DEAs and of the C2P/C2D days."""
+        weekly_counts = list(self.weekly_counts.values())
+        return RecentMetrics(
+            ship_count=self.ship_count,
+            unpadded_dea=float(
+                np.mean([(total - failed) / total for total, failed, _ in weekly_counts])
+            ),
+            dea=float(np.mean([(total - failed) / total for total, _, failed in weekly_counts])),
+            unpadded_c2p_days=self.sum_c2p_days_unpadded / self.ship_count,
+            c2p_days=self.sum_c2p_days / self.ship_count,
+            c2d_days=self.sum_c2d_days / self.ship_count,
+        )
+
+
+class EntityMetrics:
+    """
+    Running totals of one ODS/Warehouse, one WindowTotals per metric window, and optionally the
+    quantile sketch of its C2D - unpadded C2P gaps.
+    """
+
+    __slots__ = ("windows", "first_row", "sketch")
+
+    def __init__(self, num_windows: int, first_row: Dict[str, Any]):
+        self.windows: List[WindowTotals] = [WindowTotals() for _ in range(num_windows)]
+        self.first_row = first_row
+        self.sketch: Optional[DecayedQuantileSketch] = None
+
+    def merge(self, other: "EntityMetrics") -> None:
+        for totals, other_totals in zip(self.windows, other.windows):
+            totals.merge(other_totals)
+        self.merge_sketch(other.sketch)
+
+    def merge_sketch(self, sketch: Optional[DecayedQuantileSketch]) -> None:
+        if sketch is None:
+            return
+        if self.sketch is None:
+            self.sketch = sketch
+        else:
+            self.sketch.merge(sketch)
+
+
+class ShipmentMetrics:
+    """
+    Per-entity accumulators of the recent DEA and C2P/C2D metrics of every metric window,
+    updated batch by batch while the input is read, so the shipments do not need another pass
+    once they are grouped.
+
+    Entities are keyed like the shipment groups: 3P shipments by (warehouse_id, zip3, ship
+    method), the others by warehouse (warehouse_id, zip5).
+
+    With ``sketch_bins_per_day`` positive, every entity also accumulates a DecayedQuantileSketch
+    of its C2D - unpadded C2P gaps, from which Predict forecasts the dense entities.
+    """
+
+    def __init__(self, windows: Sequence[MetricWindow], sketch_bins_per_day: int = 0):
+        self.windows: List[MetricWindow] = list(windows)
+        self.sketch_bins_per_day = sketch_bins_per_day
+        self.entities: Dict[MetricsKey, EntityMetrics] = {}
+        # First-record fields the nodes are created from, since the streaming store drops them:
+        # vendor_id -> primary GL, in order of first appearance, and (warehouse_id, zip5) -> vendor
+        self.vendor_primary_gls: Dict[str, str] = {}
+        self.warehouse_vendors: Dict[Tuple[str, str], str] = {}
+
+    def get(self, key: MetricsKey) -> Optional[EntityMetrics]:
+        return self.entities.get(key)
+
+    def update(
+        self,
+        categorical: Mapping[str, Tuple[np.ndarray, Sequence[str]]],
+        numeric: Mapping[str, np.ndarray],
+    ) -> None:
+        """
+        Add one batch of validated shipments, as passed to ShipmentStore.append_batch.
+
+        Args:
+            categorical: Column name to (batch-local indices, batch dictionary).
+            numeric: Column name to NumPy array.
+        """
+        if len(numeric["order_date"]) == 0:
+            return
+
+        def indices(name: str) -> np.ndarray:
+            return np.asarray(categorical[name][0], dtype=np.int64)
+
+        def decode(name: str, row: int) -> str:
+            column_indices, dictionary = categorical[name]
+            return dictionary[column_indices[row]]
+
+        carrier_groups = np.array(
+            [
+                0 if carrier == ShippingCarrier.SWA.name
+                else 1 if carrier == ShippingCarrier.UPS.name
+                else 2
+                for carrier in categorical["carrier"][1]
+            ],
+            dtype=np.int64,
+        )
+        row_groups = carrier_groups[indices("carrier")]
+        is_third_party = row_groups == 1
+
+        _, vendor_rows = np.unique(indices("vendor_id"), return_index=True)
+        for row in np.sort(vendor_rows):
+            self.vendor_primary_gls.setdefault(decode("vendor_id", row), decode("primary_gl", row))
+        _, warehouse_rows = np.unique(
+            indices("warehouse_id") * len(categorical["origin_zip5"][1]) + indices("origin_zip5"),
+            return_index=True,
+        )
+        for row in warehouse_rows:
+            self.warehouse_vendors.setdefault(
+                (decode("warehouse_id", row), decode("origin_zip5", row)), decode("vendor_id", row)
+            )
+
+        # Every entity key gets an index in this batch, in order of first appearance
+        combined = np.zeros(len(row_groups), dtype=np.int64)
+        for codes in (
+            row_groups,
+            indices("warehouse_id"),
+            np.where(is_third_party, indices("dest_zip3"), indices("origin_zip5")),
+            np.where(is_third_party, indices("ship_method"), 0),
+        ):
+            combined = combined * (int(codes.max()) + 1) + codes
+        batch_keys, _ = pd.factorize(combined)
+        _, first_rows = np.unique(batch_keys, return_index=True)
+        num_keys = len(first_rows)
+
+        group_names = (
+            ShippingCarrier.SWA.name,
+            CarrierType.THIRD_PARTY.name,
+            CarrierType.OTHERS.name,
+        )
+        batch_metrics: List[EntityMetrics] = []
+        for row in first_rows:
+            group = group_names[row_groups[row]]
+            key: MetricsKey
+            if group == CarrierType.THIRD_PARTY.name:
+                key = (
+                    group,
+                    decode("warehouse_id", row),
+                    decode("dest_zip3", row),
+                    decode("ship_method", row),
+                )
+            else:
+                key = (group, decode("warehouse_id", row), decode("origin_zip5", row))
+            metrics = self.entities.get(key)
+            if metrics is None:
+                first_row = {
+                    "ship_method_orig": decode("ship_method_orig", row),
+                    "distance_mi": float(numeric["distance_mi"][row]),
+                }
+                metrics = self.entities[key] = EntityMetrics(len(self.windows), first_row)
+            batch_metrics.append(metrics)
+
+        aggregates = aggregate_windows(
+            batch_keys,
+            num_keys,
+            numeric["order_date"],
+            [window.start for window in self.windows],
+            numeric["c2p_days"],
+            numeric["c2p_days_unpadded"],
+            numeric["c2d_days"],
+        )
+        for group in np.flatnonzero(aggregates.ship_counts):
+            window, batch_key = divmod(int(group), num_keys)
+            totals = batch_metrics[batch_key].windows[window]
+            totals.ship_count += int(aggregates.ship_counts[group])
+            totals.sum_c2p_days += float(aggregates.sum_c2p_days[group])
+            totals.sum_c2p_days_unpadded += float(aggregates.sum_c2p_days_unpadded[group])
+            totals.sum_c2d_days += float(aggregates.sum_c2d_days[group])
+
+        for index, group in enumerate(aggregates.week_groups):
+            window, batch_key = divmod(int(group), num_keys)
+            counts = batch_metrics[batch_key].windows[window].weekly_counts.setdefault(
+                int(aggregates.weeks[index]), [0, 0, 0]
+            )
+            counts[0] += int(aggregates.week_totals[index])
+            counts[1] += int(aggregates.week_failed_unpadded[index])
+            counts[2] += int(aggregates.week_failed_padded[index])
+
+        if self.sketch_bins_per_day > 0:
+            sketches = DecayedQuantileSketch.from_segments(
+                batch_keys,
+                num_keys,
+                numeric["order_date"],
+                numeric["c2d_days"] - numeric["c2p_days_unpadded"],
+                self.sketch_bins_per_day,
+            )
+            for metrics, sketch in zip(batch_metrics, sketches):
+                metrics.merge_sketch(sketch)
+
+    def merge(self, other: "ShipmentMetrics") -> "ShipmentMetrics":
+        """
+        Add the accumulators of another batch sequence, e.g. another input file. First rows of
+        entities already seen are kept, so the merge order decides which record creates them.
+        """
+        for key, metrics in other.entities.items():
+            existing = self.entities.get(key)
+            if existing is None:
+                self.entities[key] = metrics
+            else:
+                existing.merge(metrics)
+        for vendor_id, primary_gl in other.vendor_primary_gls.items():
+            self.vendor_primary_gls.setdefault(vendor_id, primary_gl)
+        for warehouse_key, vendor_id in other.warehouse_vendors.items():
+            self.warehouse_vendors.setdefault(warehouse_key, vendor_id)
+        return self
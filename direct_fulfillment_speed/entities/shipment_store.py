@@ -0,0 +1,456 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from direct_fulfillment_speed.entities.nodes import ShipmentType
+from direct_fulfillment_speed.entities.shipment_metrics import ShipmentMetrics
+
+logger = logging.getLogger()
+
+# Shipment types by their code in the shipment_type column of a ShipmentStore
+SHIPMENT_TYPES: Tuple[ShipmentType, ...] = tuple(ShipmentType)
+
+
+class CategoricalColumnBuilder:
+    """
+    Accumulates a dictionary-encoded string column across batches.
+
+    Each batch arrives as integer indices into a batch-local dictionary; the indices are remapped
+    to one global category list so the finished column is a single int32 code array.
+    """
+
+    def __init__(self):
+        self.categories: List[str] = []
+        self._lookup: Dict[str, int] = {}
+        self._chunks: List[np.ndarray] = []
+
+    def code_for(self, value: str) -> int:
+        """Return the global code of a category, registering it if needed."""
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.categories)
+            self._lookup[value] = code
+            self.categories.append(value)
+        return code
+
+    def append_codes(self, codes: np.ndarray) -> None:
+        """Append codes that were obtained from ``code_for``."""
+        self._chunks.append(codes.astype(np.int32, copy=False))
+
+    def append(self, indices: np.ndarray, dictionary: Sequence[str]) -> None:
+        """Append one batch of batch-local indices with their dictionary."""
+        remap = np.array([self.code_for(value) for value in dictionary], dtype=np.int32)
+        if len(remap):
+            self._chunks.append(remap[indices])
+        else:
+            self._chunks.append(np.empty(0, dtype=np.int32))
+
+    def finish(self) -> np.ndarray:
+        if not self._chunks:
+            return np.empty(0, dtype=np.int32)
+        return np.concatenate(self._chunks)
+
+
+class ShipmentStore:
+    """
+    Columnar storage of shipments, one NumPy array per field.
+
+    String fields are dictionary-encoded: ``codes[name]`` holds an int32 array and
+    ``categories[name]`` the distinct values. Numeric fields are kept in ``values``, along with
+    the int8 ``shipment_type`` column (indices into SHIPMENT_TYPES) derived by ``finalize``.
+    Batches or single rows are appended during ingestion and concatenated by ``finalize``.
+
+    With ``metrics`` set, every appended batch also updates the streaming ShipmentMetrics, and
+    only the columns still read after ingestion are kept: the keys of the shipment groups and the
+    fields the forecast reads per shipment.
+    """
+
+    # Rows appended one at a time are buffered and converted to arrays in chunks of this size
+    ROW_CHUNK_SIZE = 65536
+
+    CATEGORICAL_COLUMNS = (
+        "vendor_id",
+        "primary_gl",
+        "gl_group",
+        "warehouse_id",
+        "origin_zip5",
+        "carrier",
+        "ship_method_orig",
+        "ship_method",
+        "dest_zip5",
+        "dest_zip3",
+    )
+    NUMERIC_COLUMNS: Dict[str, np.dtype] = {
+        "order_date": np.dtype("datetime64[s]"),
+        "c2p_days": np.dtype(np.float64),
+        "c2p_days_unpadded": np.dtype(np.float64),
+        "c2d_days": np.dtype(np.float64),
+        "distance_mi": np.dtype(np.float64),
+    }
+    STREAMING_CATEGORICAL_COLUMNS = (
+        "warehouse_id",
+        "origin_zip5",
+        "carrier",
+        "ship_method",
+        "dest_zip5",
+        "dest_zip3",
+    )
+    STREAMING_NUMERIC_COLUMNS = ("order_date", "c2p_days_unpadded", "c2d_days")
+
+    def __init__(self, metrics: Optional[ShipmentMetrics] = None):
+        self.metrics = metrics
+        if metrics is None:
+            self.categorical_columns: Tuple[str, ...] = self.CATEGORICAL_COLUMNS
+            self.numeric_columns: Dict[str, Any] = dict(self.NUMERIC_COLUMNS)
+        else:
+            self.categorical_columns = self.STREAMING_CATEGORICAL_COLUMNS
+            self.numeric_columns = {
+                name: self.NUMERIC_COLUMNS[name] for name in self.STREAMING_NUMERIC_COLUMNS
+            }
+        # Single rows are encoded for every column, since the metrics read all of them
+        self._categorical_builders: Dict[str, CategoricalColumnBuilder] = {
+            name: CategoricalColumnBuilder() for name in self.CATEGORICAL_COLUMNS
+        }
+        self._numeric_chunks: Dict[str, List[np.ndarray]] = {
+            name: [] for name in self.numeric_columns
+        }
+        self._row_codes: Dict[str, List[int]] = {name: [] for name in self.CATEGORICAL_COLUMNS}
+        self._row_values: Dict[str, List[Any]] = {name: [] for name in self.NUMERIC_COLUMNS}
+        self._pending_rows: int = 0
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, List[str]] = {}
+        self.values: Dict[str, np.ndarray] = {}
+        self.is_finalized: bool = False
+        self.num_rows: int = 0
+
+    def append_batch(
+        self,
+        categorical: Dict[str, Tuple[np.ndarray, Sequence[str]]],
+        numeric: Dict[str, np.ndarray],
+    ) -> None:
+        """
+        Append a batch of already validated columns.
+
+        Args:
+            categorical: Column name to (batch-local indices, batch dictionary).
+            numeric: Column name to NumPy array.
+        """
+        if self.is_finalized:
+            raise RuntimeError("Cannot append to a finalized ShipmentStore.")
+        self._flush_rows()
+        if self.metrics is not None:
+            self.metrics.update(categorical, numeric)
+        self._append_columns(categorical, numeric)
+
+    def _append_columns(
+        self,
+        categorical: Mapping[str, Tuple[np.ndarray, Sequence[str]]],
+        numeric: Mapping[str, np.ndarray],
+    ) -> None:
+        """Append the kept columns of a batch."""
+        for name in self.categorical_columns:
+            indices, dictionary = categorical[name]
+            self._categorical_builders[name].append(indices, dictionary)
+        for name, dtype in self.numeric_columns.items():
+            self._numeric_chunks[name].append(np.asarray(numeric[name], dtype=dtype))
+
+    def append_row(self, categorical: Mapping[str, str], numeric: Mapping[str, Any]) -> None:
+        """
+        Append a single validated row, e.g. from the record-by-record reader.
+
+        Args:
+            categorical: Column name to string value.
+            numeric: Column name to value; None becomes NaN/NaT.
+        """
+        if self.is_finalized:
+            raise RuntimeError("Cannot append to a finalized ShipmentStore.")
+        for name, builder in self._categorical_builders.items():
+            self._row_codes[name].append(builder.code_for(categorical[name]))
+        for name in self.NUMERIC_COLUMNS:
+            self._row_values[name].append(numeric[name])
+        self._pending_rows += 1
+        if self._pending_rows >= self.ROW_CHUNK_SIZE:
+            self._flush_rows()
+
+    def _flush_rows(self) -> None:
+        """Convert the buffered single rows into one chunk per column."""
+        if not self._pending_rows:
+            return
+        codes = {}
+        for name in self.CATEGORICAL_COLUMNS:
+            codes[name] = np.array(self._row_codes[name], dtype=np.int32)
+            self._row_codes[name] = []
+        values = {}
+        for name, dtype in self.NUMERIC_COLUMNS.items():
+            values[name] = np.array(self._row_values[name], dtype=dtype)
+            self._row_values[name] = []
+        self._pending_rows = 0
+
+        if self.metrics is not None:
+            self.metrics.update(
+                {
+                    name: (codes[name], builder.categories)
+                    for name, builder in self._categorical_builders.items()
+                },
+                values,
+            )
+        for name in self.categorical_columns:
+            self._categorical_builders[name].append_codes(codes[name])
+        for name in self.numeric_columns:
+            self._numeric_chunks[name].append(values[name])
+
+    def append_store(self, other: "ShipmentStore") -> None:
+        """
+        Append all the rows of another store, unifying the categories. The metrics of a streaming
+        store are merged rather than recomputed, since it no longer has every column.
+        """
+        other.finalize()
+        if self.is_finalized:
+            raise RuntimeError("Cannot append to a finalized ShipmentStore.")
+        self._flush_rows()
+        categorical = {name: (other.codes[name], other.categories[name]) for name in other.codes}
+        if other.metrics is not None:
+            if self.metrics is None:
+                raise ValueError("Cannot append a streaming ShipmentStore to one without metrics.")
+            if other.metrics is not self.metrics:
+                self.metrics.merge(other.metrics)
+        elif self.metrics is not None:
+            self.metrics.update(categorical, other.values)
+        self._append_columns(categorical, other.values)
+
+    def finalize(self) -> "ShipmentStore":
+        """Concatenate the appended batches into one array per column."""
+        if self.is_finalized:
+            return self
+        self._flush_rows()
+        for name in self.categorical_columns:
+            builder = self._categorical_builders[name]
+            self.codes[name] = builder.finish()
+            self.categories[name] = builder.categories
+        for name, dtype in self.numeric_columns.items():
+            chunks = self._numeric_chunks[name]
+            self.values[name] = (
+                np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+            ).astype(dtype, copy=False)
+        type_codes = np.array(
+            [
+                SHIPMENT_TYPES.index(ShipmentType.from_ship_method(method))
+                for method in self.categories["ship_method"]
+            ],
+            dtype=np.int8,
+        )
+        self.values["shipment_type"] = (
+            type_codes[self.codes["ship_method"]]
+            if len(type_codes)
+            else np.empty(0, dtype=np.int8)
+        )
+        self._categorical_builders = {}
+        self._numeric_chunks = {}
+        self._row_codes = {}
+        self._row_values = {}
+        self.num_rows = len(self.values["order_date"])
+        self.is_finalized = True
+        return self
+
+    @classmethod
+    def concatenate(cls, stores: Sequence["ShipmentStore"]) -> "ShipmentStore":
+        """
+        Merge partial stores, e.g. one per input file, into one finalized store. Rows keep the
+        order of ``stores`` and the categories of all stores are unified.
+        """
+        if len(stores) == 1:
+            return stores[0].finalize()
+        metrics = stores[0].metrics
+        merged = cls(
+            ShipmentMetrics(metrics.windows, metrics.sketch_bins_per_day)
+            if metrics is not None
+            else None
+        )
+        for store in stores:
+            merged.append_store(store)
+        return merged.finalize()
+
+    def __len__(self):
+        return self.num_rows
+
+    @property
+    def is_empty(self) -> bool:
+        """True if no row has been appended yet."""
+        if self.is_finalized:
+            return self.num_rows == 0
+        return not self._pending_rows and not any(self._numeric_chunks.values())
+
+    def reorder(self, order: np.ndarray) -> None:
+        """Permute the rows of every column, e.g. to make the rows of each group contiguous."""
+        for name in self.codes:
+            self.codes[name] = self.codes[name][order]
+        for name in self.values:
+            self.values[name] = self.values[name][order]
+
+    def decode(self, name: str, codes: np.ndarray) -> np.ndarray:
+        """Translate codes of a categorical column back to their string values."""
+        return np.asarray(self.categories[name], dtype=object)[codes]
+
+    def value_at(self, name: str, row: int):
+        """Return a single field of a single row, decoding categorical columns."""
+        if name in self.codes:
+            return self.categories[name][self.codes[name][row]]
+        return self.values[name][row]
+
+    def column(self, name: str, rows: Union[slice, np.ndarray, None] = None) -> np.ndarray:
+        """Return a column (codes for categorical fields), optionally restricted to rows."""
+        data = self.codes[name] if name in self.codes else self.values[name]
+        return data if rows is None else data[rows]
+
+    @staticmethod
+    def factorize_keys(*code_arrays: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Factorize a composite key built from several integer code arrays.
+
+        Keys are numbered in order of first appearance, which mirrors the insertion order of a
+        dict populated record by record.
+
+        Returns:
+            The per-row key codes and the row index of each key's first appearance.
+        """
+        if not code_arrays or len(code_arrays[0]) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        combined = np.zeros(len(code_arrays[0]), dtype=np.int64)
+        for codes in code_arrays:
+            span = int(codes.max()) + 1 if len(codes) else 1
+            combined = combined * span + codes
+        key_codes, _ = pd.factorize(combined)
+        key_codes = key_codes.astype(np.int64, copy=False)
+        _, first_rows = np.unique(key_codes, return_index=True)
+        return key_codes, first_rows.astype(np.int64, copy=False)
+
+
+class ShipmentRow:
+    """
+    Read-only view of one row of a ShipmentStore that exposes the same attributes the pipeline
+    reads from a ShipmentInstance.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: ShipmentStore, row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def shipment_type(self) -> ShipmentType:
+        return SHIPMENT_TYPES[self._store.values["shipment_type"][self._row]]
+
+    @property
+    def get_order_date(self) -> datetime:
+        return self._store.values["order_date"][self._row].astype(datetime)
+
+    @property
+    def c2p_days(self) -> float:
+        return float(self._store.values["c2p_days"][self._row])
+
+    @property
+    def c2p_days_unpadded(self) -> float:
+        return float(self._store.values["c2p_days_unpadded"][self._row])
+
+    @property
+    def c2d_days(self) -> float:
+        return float(self._store.values["c2d_days"][self._row])
+
+    @property
+    def c2d_c2p_unpadded_gap(self) -> float:
+        return self.c2d_days - self.c2p_days_unpadded
+
+    @property
+    def distance_to_zip3(self) -> Optional[int]:
+        distance = self._store.values["distance_mi"][self._row]
+        return None if np.isnan(distance) else int(distance)
+
+    @property
+    def ship_method(self) -> str:
+        return self._store.value_at("ship_method", self._row)
+
+    @property
+    def warehouse_id(self) -> str:
+        return self._store.value_at("warehouse_id", self._row)
+
+    @property
+    def dest_zip5(self) -> str:
+        return self._store.value_at("dest_zip5", self._row)
+
+    def __repr__(self):
+        return f"{(self.warehouse_id, self.ship_method, self.dest_zip5)}"
+
+
+class ShipmentSlice:
+    """
+    The shipments of one ODS/Warehouse as a view over a ShipmentStore.
+
+    It behaves like the list of shipments it replaces (``len``, iteration, indexing), and exposes
+    the underlying columns through ``column`` for vectorized consumers.
+    """
+
+    __slots__ = ("store", "rows")
+
+    def __init__(self, store: ShipmentStore, rows: Union[slice, np.ndarray]):
+        self.store = store
+        self.rows = rows
+
+    def __len__(self):
+        if isinstance(self.rows, slice):
+            return self.rows.stop - self.rows.start
+        return len(self.rows)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def _row_index(self, position: int) -> int:
+        if isinstance(self.rows, slice):
+            return self.rows.start + position
+        return int(self.rows[position])
+
+    def __getitem__(self, position: int) -> ShipmentRow:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("ShipmentSlice index out of range")
+        return ShipmentRow(self.store, self._row_index(position))
+
+    def __iter__(self) -> Iterator[ShipmentRow]:
+        for position in range(len(self)):
+            yield ShipmentRow(self.store, self._row_index(position))
+
+    def column(self, name: str) -> np.ndarray:
+        """Return one column restricted to the rows of this slice."""
+        return self.store.column(name, self.rows)
+
+    @staticmethod
+    def concatenate_rows(slices: Sequence["ShipmentSlice"]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Concatenate the store rows of several slices of the same store, e.g. to aggregate many
+        entities with one grouped operation.
+
+        Returns:
+            The store rows of all the slices, in order, and the number of rows of every slice.
+        """
+        lengths = np.array([len(shipments) for shipments in slices], dtype=np.int64)
+        row_slices = [shipments.rows for shipments in slices if isinstance(shipments.rows, slice)]
+        if len(row_slices) == len(slices):
+            starts = np.array([row_slice.start for row_slice in row_slices], dtype=np.int64)
+            offsets = np.cumsum(lengths) - lengths
+            rows = np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+        elif slices:
+            rows = np.concatenate(
+                [
+                    np.arange(shipments.rows.start, shipments.rows.stop)
+                    if isinstance(shipments.rows, slice)
+                    else np.asarray(shipments.rows, dtype=np.int64)
+                    for shipments in slices
+                ]
+            )
+        else:
+            rows = np.empty(0, dtype=np.int64)
+        return rows, lengths
@@ -0,0 +1,226 @@
+"""Vectorized validation and conversion of Arrow record batches into a ShipmentStore."""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from direct_fulfillment_speed.entities.shipment_store import ShipmentStore
+from direct_fulfillment_speed.inputs.validation import RejectionReport
+from direct_fulfillment_speed.utils import util
+
+logger = logging.getLogger()
+
+# Input column -> (store column, value used when the column or a value is missing).
+CATEGORICAL_INPUTS: Dict[str, Tuple[str, str]] = {
+    "vendor_id": ("vendor_id", ""),
+    "vendor_primary_gl_description": ("primary_gl", "Unknown"),
+    "gl_group": ("gl_group", "Unknown"),
+    "warehouse_id": ("warehouse_id", ""),
+    "carrier": ("carrier", ""),
+    "ship_method_orig": ("ship_method_orig", ""),
+    "ship_method_1": ("ship_method", ""),
+}
+
+_NUMBER_PATTERN = r"^\s*[+-]?((\d+\.?\d*|\.\d+)([eE][+-]?\d+)?|(?i:nan|inf|infinity))\s*$"
+_INTEGER_PATTERN = r"^\s*[+-]?\d+\s*$"
+
+
+def _column(batch: pa.RecordBatch, name: str) -> pa.Array:
+    """Return a column of the batch, or an all-null string column if it is absent."""
+    index = batch.schema.get_field_index(name)
+    if index < 0:
+        return pa.nulls(batch.num_rows, type=pa.string())
+    column = batch.column(index)
+    if pa.types.is_dictionary(column.type):
+        column = column.dictionary_decode()
+    return column
+
+
+def _as_string(array: pa.Array) -> pa.Array:
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        return array
+    return pc.cast(array, pa.string())
+
+
+def _to_numpy_mask(mask: pa.Array) -> np.ndarray:
+    return pc.fill_null(mask, False).to_numpy(zero_copy_only=False)
+
+
+def is_present(array: pa.Array) -> np.ndarray:
+    """
+    Vectorized truthiness check of the record path: neither null nor an empty string. The record
+    path reads a null of a timestamp column as NaT, which is truthy, so every value of a timestamp
+    column is present and its nulls are left to the order date fallback.
+    """
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        return _to_numpy_mask(pc.greater(pc.utf8_length(array), 0))
+    if pa.types.is_timestamp(array.type):
+        return np.ones(len(array), dtype=bool)
+    return _to_numpy_mask(array.is_valid())
+
+
+def normalize_zip5(array: pa.Array) -> Tuple[pa.Array, np.ndarray]:
+    """
+    Vectorized util.to_zip5: strip the value, require at most five digits and left-pad it with
+    zeros. Blank values and masked ZIPs such as '12***' fail the digit check.
+
+    Returns:
+        The normalized ZIP5 strings and a boolean mask of the valid entries.
+    """
+    text = pc.utf8_trim_whitespace(_as_string(array))
+    valid = pc.and_(pc.utf8_is_digit(text), pc.less_equal(pc.utf8_length(text), 5))
+    return pc.utf8_lpad(text, width=5, padding="0"), _to_numpy_mask(valid)
+
+
+def parse_datetimes(array: pa.Array) -> np.ndarray:
+    """
+    Vectorized util.convert_time_str_to_dt_object. String columns are parsed with each of
+    util.DATETIME_FORMATS in turn; unparseable values become NaT.
+
+    Returns:
+        A datetime64[s] array.
+    """
+    if pa.types.is_timestamp(array.type) or pa.types.is_date(array.type):
+        parsed = pc.cast(array, pa.timestamp("s"))
+    else:
+        text = _as_string(array)
+        parsed = pc.coalesce(
+            *(
+                pc.strptime(text, format=fmt, unit="s", error_is_null=True)
+                for fmt in util.DATETIME_FORMATS
+            )
+        )
+    return parsed.to_numpy(zero_copy_only=False).astype("datetime64[s]")
+
+
+def parse_numbers(array: pa.Array, integer: bool = False) -> np.ndarray:
+    """
+    Convert a column to float64, turning non-numeric values into NaN.
+
+    Args:
+        array: Numeric or string column.
+        integer: Mimic ``int()`` instead of ``float()``: strings must be integral and numeric
+            values are truncated towards zero.
+    """
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        pattern = _INTEGER_PATTERN if integer else _NUMBER_PATTERN
+        numeric = pc.match_substring_regex(array, pattern)
+        array = pc.if_else(numeric, pc.utf8_trim_whitespace(array), pa.scalar(None, pa.string()))
+    elif pa.types.is_null(array.type) or pa.types.is_boolean(array.type):
+        array = pc.cast(array, pa.int8())
+    values = pc.cast(array, pa.float64()).to_numpy(zero_copy_only=False).astype(np.float64)
+    return np.trunc(values) if integer else values
+
+
+def is_number(array: pa.Array) -> np.ndarray:
+    """
+    Vectorized check of the record path's ``float()`` conversion. The record path reads a null
+    of a numeric column as NaN, which is kept like a 'nan' string, so only the nulls of the
+    other columns and the strings that are not numbers fail it.
+    """
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        return _to_numpy_mask(pc.match_substring_regex(array, _NUMBER_PATTERN))
+    if pa.types.is_integer(array.type) or pa.types.is_floating(array.type):
+        return np.ones(len(array), dtype=bool)
+    return _to_numpy_mask(array.is_valid()) & ~pa.types.is_null(array.type)
+
+
+def dictionary_encode(array: pa.Array, default: str) -> Tuple[np.ndarray, List[str]]:
+    """
+    Dictionary-encode a string column, replacing nulls with a default.
+
+    Returns:
+        The int32 indices and the batch dictionary.
+    """
+    encoded = pc.dictionary_encode(pc.fill_null(_as_string(array), default))
+    indices = encoded.indices.to_numpy(zero_copy_only=False).astype(np.int32, copy=False)
+    return indices, encoded.dictionary.to_pylist()
+
+
+def append_record_batch(
+    store: ShipmentStore,
+    batch: pa.RecordBatch,
+    min_order_date: Optional[datetime] = None,
+    report: Optional[RejectionReport] = None,
+) -> int:
+    """
+    Validate one record batch with vectorized masks and append the valid rows to the store.
+
+    Every rule of validation.REJECTION_RULES is one boolean mask over the batch. A rejected row is
+    counted under the first rule it fails, and a few of the rejected rows are sampled into the
+    report instead of being logged one by one.
+
+    Args:
+        store: The store receiving the rows.
+        batch: One Arrow record batch of the input.
+        min_order_date: Optional start of the history horizon; older shipments are dropped.
+        report: Optional report collecting the rejection counts and samples.
+
+    Returns:
+        The number of rejected rows.
+    """
+    dest_zip5, dest_valid = normalize_zip5(_column(batch, "destination_zip5"))
+    origin_zip5, origin_valid = normalize_zip5(_column(batch, "origin_zip5"))
+
+    order_column = _column(batch, "order_datetime")
+    of_column = _column(batch, "of_datetime")
+    order_datetime = parse_datetimes(order_column)
+    of_datetime = parse_datetimes(of_column)
+    # Same fallback as ShipmentInstance.get_order_date
+    order_date = np.where(np.isnat(of_datetime), order_datetime, of_datetime)
+
+    c2p_column = _column(batch, "c2p_days_unpadded")
+    c2d_column = _column(batch, "c2d_days")
+    c2p_days_unpadded = parse_numbers(c2p_column)
+    c2d_days = parse_numbers(c2d_column)
+    distance_column = _column(batch, "distance_mi")
+    distance_mi = parse_numbers(distance_column, integer=True)
+
+    rule_masks = {
+        "invalid_destination_zip5": dest_valid,
+        "missing_order_datetime": is_present(order_column) & is_present(of_column),
+        "invalid_origin_zip5": origin_valid,
+        "unparseable_order_date": ~np.isnat(order_date),
+        "non_numeric_c2p_days_unpadded": is_number(c2p_column),
+        "non_numeric_c2d_days": is_number(c2d_column),
+    }
+    if min_order_date is not None:
+        rule_masks["before_history_horizon"] = order_date >= np.datetime64(min_order_date, "s")
+
+    keep = np.ones(batch.num_rows, dtype=bool)
+    for rule, valid in rule_masks.items():
+        if report is not None:
+            report.add_mask(rule, keep & ~valid, batch)
+        keep &= valid
+    if report is not None:
+        report.total_rows += batch.num_rows
+        report.add_mask(
+            "unparseable_distance_mi", keep & is_present(distance_column) & np.isnan(distance_mi), batch
+        )
+
+    keep_mask = pa.array(keep)
+    dest_zip5 = pc.filter(dest_zip5, keep_mask)
+
+    categorical: Dict[str, Tuple[np.ndarray, Sequence[str]]] = {
+        "dest_zip5": dictionary_encode(dest_zip5, ""),
+        "dest_zip3": dictionary_encode(pc.utf8_slice_codeunits(dest_zip5, 0, 3), ""),
+        "origin_zip5": dictionary_encode(pc.filter(origin_zip5, keep_mask), ""),
+    }
+    for input_name, (store_name, default) in CATEGORICAL_INPUTS.items():
+        column = pc.filter(_column(batch, input_name), keep_mask)
+        categorical[store_name] = dictionary_encode(column, default)
+
+    numeric = {
+        "order_date": order_date[keep],
+        "c2p_days": parse_numbers(_column(batch, "c2p_days"))[keep],
+        "c2p_days_unpadded": c2p_days_unpadded[keep],
+        "c2d_days": c2d_days[keep],
+        "distance_mi": distance_mi[keep],
+    }
+    store.append_batch(categorical, numeric)
+
+    return int(batch.num_rows - keep.sum())
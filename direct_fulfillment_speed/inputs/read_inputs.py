@@ -1,21 +1,36 @@
 import csv
 import logging
+import multiprocessing
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import closing
+from datetime import datetime, timedelta
 from io import TextIOWrapper
+from itertools import chain
+from typing import List, Optional, Sequence, Tuple
 
 import boto3
+import pyarrow as pa
+import pyarrow.csv as pv
 import pyarrow.parquet as pq
 import s3fs
 
-from direct_fulfillment_speed.entities.nodes import (
-    Carrier,
-    Destination,
-    Node,
-    Vendor,
-    VendorManager,
-    Warehouse,
-)
+from direct_fulfillment_speed.entities.nodes import Node, Vendor, VendorManager
 from direct_fulfillment_speed.entities.shipment import ShipmentClass, ShipmentInstance
+from direct_fulfillment_speed.entities.shipment_metrics import MetricWindow, ShipmentMetrics
+from direct_fulfillment_speed.entities.shipment_store import ShipmentStore
+from direct_fulfillment_speed.inputs.columnar import append_record_batch
+from direct_fulfillment_speed.inputs.schema import (
+    INPUT_SCHEMA,
+    csv_column_types,
+    projected_columns,
+    select_row_groups,
+)
+from direct_fulfillment_speed.inputs.validation import (
+    RejectionReport,
+    record_rejection_rule,
+    record_warning_rules,
+)
 from direct_fulfillment_speed.utils import util
 from direct_fulfillment_speed.utils.config import ConfigManager
 
@@ -25,8 +40,19 @@ logger = logging.getLogger()
 class InputStream:
     """Class for data stream from a file."""
 
+    # Bytes of CSV decoded per block; blocks are parsed and converted by several threads
+    CSV_BLOCK_SIZE = 16 << 20
+    # Object key suffixes of the compressed CSV inputs, decompressed while streaming
+    CSV_COMPRESSION = {".gz": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+
     def __init__(
-        self, bucket_name, object_key, delimiter=",", header=None, input_file_format: str = "csv"
+        self,
+        bucket_name,
+        object_key,
+        delimiter=",",
+        header=None,
+        input_file_format: str = "csv",
+        min_order_date: Optional[datetime] = None,
     ):
         """
         Initializes the stream from an S3 bucket.
@@ -35,6 +61,9 @@ class InputStream:
         :param object_key: The key of the object in the S3 bucket.
         :param delimiter: The delimiter used in the CSV file.
         :param header: Optional list of header fieldnames.
+        :param input_file_format: Format of the file, csv or parquet.
+        :param min_order_date: Optional cutoff; Parquet row groups whose statistics show only
+            older shipments are skipped.
         """
         self.s3 = boto3.client("s3", region_name="us-east-1")
         self.bucket_name = bucket_name
@@ -43,6 +72,7 @@ class InputStream:
         self.s3fs = s3fs.S3FileSystem()
         self.header = header  # Predefined header or None
         self.input_file_format = input_file_format
+        self.min_order_date = min_order_date
 
     def header_exists(self, line):
         return False if self.header else True
@@ -73,14 +103,146 @@ class InputStream:
                     yield record
 
     def process_records_from_parquet(self, batch_size=500000):
+        for batch in self.process_batches_from_parquet(batch_size):
+            df_chunk = batch.to_pandas()
+            records = df_chunk.to_dict(orient="records")
+            for record in records:
+                yield record
+
+    def process_batches(self, batch_size=500000):
+        """Yield the input as Arrow record batches, without converting rows to Python objects."""
+        if self.input_file_format.lower() == "parquet":
+            return self.process_batches_from_parquet(batch_size)
+        elif self.input_file_format.lower() == "csv":
+            return self.process_batches_from_csv()
+        else:
+            raise ValueError(
+                f"Columnar ingestion is not supported for file format: {self.input_file_format}"
+            )
+
+    def process_batches_from_csv(self):
+        """
+        Stream a CSV object as typed Arrow batches. Blocks are decoded in parallel by Arrow's
+        thread pool, outside the GIL, using the explicit column types of the input schema.
+        Gzip and zstd compressed objects (.csv.gz, .csv.zst) are decompressed on the fly.
+        """
+        file_path = f"{self.bucket_name}/{self.object_key}"
+        compression = next(
+            (
+                codec
+                for suffix, codec in self.CSV_COMPRESSION.items()
+                if self.object_key.endswith(suffix)
+            ),
+            None,
+        )
+        read_options = pv.ReadOptions(
+            use_threads=True, block_size=self.CSV_BLOCK_SIZE, column_names=self.header
+        )
+        parse_options = pv.ParseOptions(delimiter=self.delimiter)
+        convert_options = pv.ConvertOptions(
+            column_types=csv_column_types(),
+            include_columns=INPUT_SCHEMA.names,
+            include_missing_columns=True,
+        )
+        with self.s3fs.open(file_path, "rb") as file_obj:
+            stream = pa.CompressedInputStream(file_obj, compression) if compression else file_obj
+            reader = pv.open_csv(
+                stream,
+                read_options=read_options,
+                parse_options=parse_options,
+                convert_options=convert_options,
+            )
+            for batch in reader:
+                yield batch
+
+    def process_batches_from_parquet(self, batch_size=500000):
+        """
+        Read only the columns of the input schema, and only the row groups that may contain
+        shipments on or after min_order_date.
+        """
         file_path = f"{self.bucket_name}/{self.object_key}"
         with self.s3fs.open(file_path, "rb") as file_obj:
             parquet_file = pq.ParquetFile(file_obj)
-            for batch in parquet_file.iter_batches(batch_size=batch_size):
-                df_chunk = batch.to_pandas()
-                records = df_chunk.to_dict(orient="records")
-                for record in records:
-                    yield record
+            columns = projected_columns(parquet_file.schema_arrow)
+            row_groups = select_row_groups(parquet_file, self.min_order_date)
+            if row_groups is not None and not row_groups:
+                return
+            logger.debug(f"Reading columns {columns} from {file_path}")
+            for batch in parquet_file.iter_batches(
+                batch_size=batch_size, row_groups=row_groups, columns=columns
+            ):
+                yield batch
+
+
+def resolve_input_objects(path: str) -> List[Tuple[str, str]]:
+    """
+    Resolve the input path into the S3 objects to read.
+
+    The path can be a single object, a prefix ending with '/' (every object under it, e.g. the
+    part files of a date/region partitioned export), or a glob such as
+    's3://bucket/inputs/date=2025-01-*/*.parquet'. Marker files whose name starts with '_' or
+    '.' (e.g. _SUCCESS) are ignored.
+
+    Returns:
+        Sorted (bucket_name, object_key) pairs, so that the read order is deterministic.
+    """
+    bucket_name, object_key = util.parse_s3_path(path)
+    is_glob = any(char in object_key for char in "*?[")
+    if not is_glob and not object_key.endswith("/"):
+        return [(bucket_name, object_key)]
+
+    fs = s3fs.S3FileSystem()
+    found = fs.glob(f"{bucket_name}/{object_key}") if is_glob else fs.find(
+        f"{bucket_name}/{object_key}"
+    )
+    objects = []
+    for file_path in sorted(found):
+        if posixpath.basename(file_path).startswith(("_", ".")):
+            continue
+        file_bucket, file_key = file_path.split("/", 1)
+        objects.append((file_bucket, file_key))
+
+    if not objects:
+        raise ValueError(f"No input files found for {path}")
+    return objects
+
+
+def read_object_into_store(
+    bucket_name: str,
+    object_key: str,
+    delimiter: str,
+    input_file_format: str,
+    batch_size: int,
+    min_order_date: Optional[datetime],
+    metric_windows: Optional[Sequence[MetricWindow]] = None,
+    sketch_bins_per_day: int = 0,
+) -> Tuple[ShipmentStore, RejectionReport]:
+    """
+    Read one input object into a finalized ShipmentStore. This is the unit of work of the
+    ingestion process pool, so it is a module-level function.
+
+    If ``metric_windows`` is set, the store accumulates streaming ShipmentMetrics over these
+    windows, with the quantile sketches of the entities if ``sketch_bins_per_day`` is positive.
+
+    Returns:
+        The store and the report of the rejected records.
+    """
+    input_stream = InputStream(
+        bucket_name,
+        object_key,
+        delimiter,
+        input_file_format=input_file_format,
+        min_order_date=min_order_date,
+    )
+
+    store = ShipmentStore(
+        ShipmentMetrics(metric_windows, sketch_bins_per_day) if metric_windows is not None else None
+    )
+    report = RejectionReport()
+    for batch in input_stream.process_batches(batch_size=batch_size):
+        append_record_batch(store, batch, min_order_date, report)
+
+    return store.finalize(), report
 
 
 class ReadInputs:
@@ -89,6 +251,20 @@ class ReadInputs:
     def __init__(self, config: ConfigManager):
         self.config = config
         self.vendor_manager = VendorManager()
+        # Canonical registry of the network nodes, shared by both ingestion modes
+        self.nodes = Node(self.vendor_manager)
+        self.min_order_date = self._get_min_order_date()
+        self.rejection_report = RejectionReport()
+
+    def _get_min_order_date(self) -> Optional[datetime]:
+        """Start of the history horizon: shipments ordered earlier are not read."""
+        horizon_days = self.config.history_horizon_days
+        if not horizon_days:
+            return None
+        test_end_date = util.convert_time_str_to_dt_object(self.config.get_model_test_end_date)
+        if test_end_date is None:
+            raise ValueError("Test end date is not configured or is None.")
+        return test_end_date - timedelta(days=horizon_days)
 
     def read_shipments(
         self,
@@ -98,61 +274,60 @@ class ReadInputs:
         Reads shipment data from an S3 bucket and creates Shipment instances.
         """
 
+        if self.config.columnar_ingestion:
+            return self.read_shipments_columnar(delimiter)
+
         path = self.config.input_path
-        bucket_name, object_key = util.parse_s3_path(path)
-        logger.info(f"Reading shipment data from {path}")
+        input_objects = resolve_input_objects(path)
+        logger.info(f"Reading shipment data from {path} ({len(input_objects)} files)")
 
-        input_stream = InputStream(
-            bucket_name, object_key, delimiter, input_file_format=self.config.input_format
-        )
+        input_streams = [
+            InputStream(
+                bucket_name,
+                object_key,
+                delimiter,
+                input_file_format=self.config.input_format,
+                min_order_date=self.min_order_date,
+            )
+            for bucket_name, object_key in input_objects
+        ]
 
         # Initialize the shipment class
-        ship_obj = ShipmentClass(self.config)
+        ship_obj = ShipmentClass(self.config, self.nodes)
+        nodes = self.nodes
 
-        # Initialize the Node class
-        nodes_obj = Node()
-
-        for record in input_stream.process_records():
-            if (
-                not record.get("destination_zip5")
-                or record.get("destination_zip5").isspace()
-                or "*" in record.get("destination_zip5")
-            ):
-                logger.info(f"Skipping record due to invalid destination_zip5: {record}")
-                continue  # Skip the records with empty dest zip5
-
-            # Skip records missing order datetime fields
-            if not record.get("order_datetime") or not record.get("of_datetime"):
-                logger.info(f"Skipping record due to missing datetime fields: {record}")
+        report = self.rejection_report
+        for record in chain.from_iterable(stream.process_records() for stream in input_streams):
+            report.total_rows += 1
+            rejection_rule = record_rejection_rule(record)
+            if rejection_rule is not None:
+                report.add_record(rejection_rule, record)
                 continue
 
             # Create the vendor using the vendor manager
-            vendor = self.vendor_manager.get_or_create_vendor(
+            vendor = nodes.get_or_create_vendor(
                 record["vendor_id"], record.get("vendor_primary_gl_description", "Unknown")
             )
 
-            warehouse = Warehouse(
+            warehouse = nodes.get_or_create_warehouse(
                 vendor,
                 record["warehouse_id"],
                 record["origin_zip5"],
             )
 
-            carrier = Carrier(
+            carrier = nodes.get_or_create_carrier(
                 record.get("carrier", ""),
                 record.get("ship_method_orig", ""),
                 record.get("ship_method_1", ""),
             )
 
-            destination = Destination(zip5=record.get("destination_zip5"))
+            destination = nodes.get_or_create_destination(record.get("destination_zip5"))
 
             # Create a Shipment instance
             shipment_instance = ShipmentInstance(
-                record["region_id"],
-                record["marketplace_id"],
-                record["shipment_id"],
-                record["order_id"],
-                record["tracking_id"],
-                record["package_id"],
+                record.get("shipment_id"),
+                record.get("order_id"),
+                record.get("tracking_id"),
                 vendor,
                 warehouse,
                 carrier,
@@ -160,22 +335,78 @@ class ReadInputs:
                 record.get("ship_method_1"),
                 record.get("order_datetime"),
                 record.get("of_datetime"),
-                record.get("is_fasttrack", False),
-                record.get("c2exsd", None),
                 record.get("c2p_days", None),
                 record.get("c2p_days_unpadded", None),
                 record.get("c2d_days", None),
-                record.get("att_c2d_days", None),
-                record.get("att_failed_pdd", False),
-                record.get("no_att_scan", False),
-                record.get("unpadded_pdd_date", None),
-                record.get("tt_pad", None),
                 record.get("gl_group", "Unknown"),
                 record.get("vendor_primary_gl_description", "Unknown"),
                 record.get("distance_mi", 0),
             )
 
+            if (
+                self.min_order_date is not None
+                and shipment_instance.get_order_date is not None
+                and shipment_instance.get_order_date < self.min_order_date
+            ):
+                report.add_record("before_history_horizon", record)
+                continue
+
+            for warning_rule in record_warning_rules(record):
+                report.add_record(warning_rule, record)
+
             ship_obj.add_shipment(shipment_instance)
-            nodes_obj.add_warehouse(vendor, warehouse)
+
+        report.log_summary()
+        return ship_obj
+
+    def read_shipments_columnar(self, delimiter=",") -> ShipmentClass:
+        """
+        Reads shipment data from an S3 bucket batch by batch as Arrow columns.
+
+        Validation, ZIP normalization and grouping into ODS/Warehouse keys run as vectorized
+        column operations, and the shipments are kept in a columnar ShipmentStore rather than
+        as one ShipmentInstance per record.
+        """
+        path = self.config.input_path
+        input_objects = resolve_input_objects(path)
+        workers = min(self.config.input_workers, len(input_objects))
+        logger.info(
+            f"Reading shipment data from {path} in columnar mode "
+            f"({len(input_objects)} files, {workers} workers)"
+        )
+
+        ship_obj = ShipmentClass(self.config, self.nodes)
+        metrics = ship_obj.store.metrics
+        tasks = [
+            (
+                bucket_name,
+                object_key,
+                delimiter,
+                self.config.input_format,
+                self.config.input_batch_size,
+                self.min_order_date,
+                metrics.windows if metrics is not None else None,
+                metrics.sketch_bins_per_day if metrics is not None else 0,
+            )
+            for bucket_name, object_key in input_objects
+        ]
+        if workers > 1:
+            # Spawned workers do not inherit the parent's S3 clients and event loops
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                # map returns the partial stores in file order, which makes the merge deterministic
+                partial_results = list(pool.map(read_object_into_store, *zip(*tasks)))
+        else:
+            partial_results = [read_object_into_store(*task) for task in tasks]
+
+        store = ShipmentStore.concatenate([partial for partial, _ in partial_results])
+        for _, partial_report in partial_results:
+            self.rejection_report.merge(partial_report)
+
+        self.rejection_report.log_summary()
+        logger.info(f"Read {len(store)} shipments.")
+
+        ship_obj.add_shipment_store(store)
 
         return ship_obj
@@ -0,0 +1,111 @@
+"""Declared schema of the shipment input: the columns the pipeline reads and their types."""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from direct_fulfillment_speed.utils import util
+
+logger = logging.getLogger()
+
+INPUT_SCHEMA = pa.schema(
+    [
+        pa.field("vendor_id", pa.string()),
+        pa.field("vendor_primary_gl_description", pa.string()),
+        pa.field("gl_group", pa.string()),
+        pa.field("warehouse_id", pa.string()),
+        pa.field("origin_zip5", pa.string()),
+        pa.field("carrier", pa.string()),
+        pa.field("ship_method_orig", pa.string()),
+        pa.field("ship_method_1", pa.string()),
+        pa.field("destination_zip5", pa.string()),
+        pa.field("order_datetime", pa.timestamp("s")),
+        pa.field("of_datetime", pa.timestamp("s")),
+        pa.field("c2p_days", pa.float64()),
+        pa.field("c2p_days_unpadded", pa.float64()),
+        pa.field("c2d_days", pa.float64()),
+        pa.field("distance_mi", pa.float64()),
+    ]
+)
+
+# A shipment's order date is of_datetime, falling back to order_datetime.
+ORDER_DATE_COLUMNS = ("order_datetime", "of_datetime")
+
+
+def csv_column_types() -> Dict[str, pa.DataType]:
+    """
+    Explicit column types for decoding CSV inputs, so that no type inference runs on the first
+    block. The declared columns are decoded as strings: ZIP codes keep their leading zeros, and a
+    malformed number or datetime cannot abort the read; the vectorized validation converts the
+    values to the INPUT_SCHEMA types and rejects the malformed ones.
+    """
+    return {name: pa.string() for name in INPUT_SCHEMA.names}
+
+
+def projected_columns(file_schema: pa.Schema) -> List[str]:
+    """Return the columns of INPUT_SCHEMA present in a file, in the order of the file."""
+    wanted = set(INPUT_SCHEMA.names)
+    return [name for name in file_schema.names if name in wanted]
+
+
+def _statistic_as_datetime(value) -> Optional[datetime]:
+    """
+    Convert a Parquet min/max statistic to a naive datetime. String statistics are only used
+    when they are ISO formatted (year first), since only then is their lexical order the
+    chronological one.
+    """
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="ignore")
+    if isinstance(value, str) and value[:4].isdigit() and value[4:5] == "-":
+        return util.convert_time_str_to_dt_object(value)
+    return None
+
+
+def _column_max(row_group: pq.RowGroupMetaData, column_index: int) -> Optional[datetime]:
+    statistics = row_group.column(column_index).statistics
+    if statistics is None or not statistics.has_min_max:
+        return None
+    if _statistic_as_datetime(statistics.min) is None:
+        return None
+    return _statistic_as_datetime(statistics.max)
+
+
+def select_row_groups(
+    parquet_file: pq.ParquetFile, min_order_date: Optional[datetime]
+) -> Optional[List[int]]:
+    """
+    Select the row groups that may hold shipments with an order date on or after
+    ``min_order_date``, using the min/max statistics of order_datetime and of_datetime.
+
+    A row group is skipped only when the maximum of both columns is before the cutoff, because
+    the order date of a shipment is either of them.
+
+    Returns:
+        The indices of the row groups to read, or None to read all of them.
+    """
+    if min_order_date is None:
+        return None
+
+    metadata = parquet_file.metadata
+    names = parquet_file.schema_arrow.names
+    column_indices = [names.index(name) for name in ORDER_DATE_COLUMNS if name in names]
+    if len(column_indices) != len(ORDER_DATE_COLUMNS):
+        return None
+
+    selected = []
+    for index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(index)
+        maxima = [_column_max(row_group, column_index) for column_index in column_indices]
+        if any(maximum is None or maximum >= min_order_date for maximum in maxima):
+            selected.append(index)
+
+    logger.info(
+        f"Reading {len(selected)} of {metadata.num_row_groups} row groups with shipments "
+        f"since {min_order_date}."
+    )
+    return selected
@@ -0,0 +1,170 @@
+"""Data-quality rules of the shipment input and the aggregated report of the rows they reject."""
+
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+import pyarrow as pa
+
+from direct_fulfillment_speed.utils import util
+
+logger = logging.getLogger()
+
+# Rules that drop a row, in the order they are evaluated. A row is counted under the first rule
+# it fails only, so the counts add up to the number of rejected rows.
+REJECTION_RULES: Dict[str, str] = {
+    "invalid_destination_zip5": "destination_zip5 is empty, blank, masked or not a ZIP5",
+    "missing_order_datetime": "order_datetime or of_datetime is missing",
+    "invalid_origin_zip5": "origin_zip5 is not a ZIP5",
+    "unparseable_order_date": "neither of_datetime nor order_datetime is a valid datetime",
+    "non_numeric_c2p_days_unpadded": "c2p_days_unpadded is not numeric",
+    "non_numeric_c2d_days": "c2d_days is not numeric",
+    "before_history_horizon": "ordered before the history horizon",
+}
+
+# Rules that flag a kept row: the value is unusable but the shipment is still read.
+WARNING_RULES: Dict[str, str] = {
+    "unparseable_distance_mi": "distance_mi is set but not an integer; the distance zone is unknown",
+}
+
+
+def _is_zip5(value) -> bool:
+    try:
+        util.to_zip5(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_number(value) -> bool:
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def record_rejection_rule(record: Mapping[str, Any]) -> Optional[str]:
+    """
+    Apply the rejection rules to a single input record, for the record-by-record reader.
+
+    The history horizon is not checked here since it needs the parsed order date.
+
+    Returns:
+        The first rule the record fails, or None if it is valid.
+    """
+    if not _is_zip5(record.get("destination_zip5")):
+        return "invalid_destination_zip5"
+    if not record.get("order_datetime") or not record.get("of_datetime"):
+        return "missing_order_datetime"
+    if not _is_zip5(record.get("origin_zip5")):
+        return "invalid_origin_zip5"
+    if (
+        util.convert_time_str_to_dt_object(record["of_datetime"]) is None
+        and util.convert_time_str_to_dt_object(record["order_datetime"]) is None
+    ):
+        return "unparseable_order_date"
+    if not _is_number(record.get("c2p_days_unpadded")):
+        return "non_numeric_c2p_days_unpadded"
+    if not _is_number(record.get("c2d_days")):
+        return "non_numeric_c2d_days"
+    return None
+
+
+def record_warning_rules(record: Mapping[str, Any]) -> List[str]:
+    """Return the warning rules a kept record fails."""
+    distance_mi = record.get("distance_mi")
+    if distance_mi is None or distance_mi == "":
+        return []
+    try:
+        int(distance_mi)
+    except (TypeError, ValueError):
+        return ["unparseable_distance_mi"]
+    return []
+
+
+def _json_value(value):
+    """Make a sampled value JSON serializable."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class RejectionReport:
+    """
+    Counts of the rows failing each data-quality rule, with a capped sample of those rows.
+
+    Rows are added in bulk from the boolean masks of the columnar reader, or one at a time by the
+    record reader. Partial reports, e.g. one per input file, are combined with ``merge``.
+    """
+
+    SAMPLE_SIZE = 5
+
+    def __init__(self, sample_size: int = SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.total_rows: int = 0
+        self.counts: Dict[str, int] = {rule: 0 for rule in {**REJECTION_RULES, **WARNING_RULES}}
+        self.samples: Dict[str, List[Dict[str, Any]]] = {rule: [] for rule in self.counts}
+
+    @property
+    def rejected_rows(self) -> int:
+        return sum(self.counts[rule] for rule in REJECTION_RULES)
+
+    def _sample_room(self, rule: str) -> int:
+        return self.sample_size - len(self.samples[rule])
+
+    def add_mask(self, rule: str, mask: np.ndarray, batch: pa.RecordBatch) -> None:
+        """
+        Count the rows of a batch selected by a boolean mask under a rule, sampling the first ones.
+        """
+        count = int(np.count_nonzero(mask))
+        if not count:
+            return
+        self.counts[rule] += count
+        room = self._sample_room(rule)
+        if room > 0:
+            rows = pa.array(np.flatnonzero(mask)[:room])
+            for row in batch.take(rows).to_pylist():
+                self.samples[rule].append({name: _json_value(value) for name, value in row.items()})
+
+    def add_record(self, rule: str, record: Mapping[str, Any]) -> None:
+        """Count one record under a rule, keeping it as a sample while there is room."""
+        self.counts[rule] += 1
+        if self._sample_room(rule) > 0:
+            self.samples[rule].append({name: _json_value(value) for name, value in record.items()})
+
+    def merge(self, other: "RejectionReport") -> "RejectionReport":
+        """Add the counts and samples of another report to this one."""
+        self.total_rows += other.total_rows
+        for rule, count in other.counts.items():
+            self.counts[rule] += count
+            self.samples[rule].extend(other.samples[rule][: self._sample_room(rule)])
+        return self
+
+    def log_summary(self) -> None:
+        """Log one line per rule that matched any row."""
+        if self.rejected_rows:
+            logger.info(f"Skipped {self.rejected_rows} of {self.total_rows} input records.")
+        for rule, description in {**REJECTION_RULES, **WARNING_RULES}.items():
+            if self.counts[rule]:
+                action = "rejected" if rule in REJECTION_RULES else "flagged"
+                logger.info(f"{self.counts[rule]} records {action} by {rule}: {description}.")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The report as a JSON serializable dict."""
+        return {
+            "total_rows": self.total_rows,
+            "rejected_rows": self.rejected_rows,
+            "rules": {
+                rule: {
+                    "description": description,
+                    "rejects": rule in REJECTION_RULES,
+                    "count": self.counts[rule],
+                    "samples": self.samples[rule],
+                }
+                for rule, description in {**REJECTION_RULES, **WARNING_RULES}.items()
+            },
+        }
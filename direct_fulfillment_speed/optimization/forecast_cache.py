@@ -0,0 +1,138 @@
+"""Local store of the forecasts of the previous run, to forecast only the changed entities."""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from direct_fulfillment_speed.entities.nodes import ODS, Warehouse
+from direct_fulfillment_speed.optimization.quantile_sketch import SKETCH_MAX_CELLS
+
+logger = logging.getLogger()
+
+CACHE_FORMAT_VERSION = 1
+
+
+class ForecastCache:
+    """
+    Quantile forecasts keyed by entity, each stored with the fingerprint of the shipments and
+    parameters it was computed from. A forecast is reused only when its entity has the same
+    fingerprint in the current run, and the saved cache holds the forecasts of the current run
+    only, so it does not grow as entities leave the rolling window.
+
+    Attributes:
+        path (str): Path of the cache file.
+        hits (int): Forecasts of this run found in the cache.
+        misses (int): Forecasts of this run computed because of a missing or changed fingerprint.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lambda_decay: float,
+        quantile_list: Sequence[float],
+        sketch_min_shipments: int = 0,
+        sketch_bins_per_day: int = 100,
+    ):
+        self.path = path
+        self._parameters = json.dumps(
+            [
+                CACHE_FORMAT_VERSION,
+                float(lambda_decay),
+                [float(q) for q in quantile_list],
+                int(sketch_min_shipments),
+                int(sketch_bins_per_day),
+                SKETCH_MAX_CELLS,
+            ]
+        ).encode()
+        self._previous: Dict[str, Dict] = self._load()
+        self._current: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> Dict[str, Dict]:
+        """Entries of the cache file, or none if it is missing or unreadable."""
+        if not os.path.exists(self.path):
+            logger.info(f"No forecast cache at {self.path}, forecasting every entity.")
+            return {}
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)["entries"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable forecast cache {self.path}: {e}")
+            return {}
+
+    @staticmethod
+    def entity_key(entity: Union[ODS, Warehouse]) -> str:
+        """Key of an entity, from the members its equality is based on."""
+        return "|".join([type(entity).__name__, *map(str, entity.hash_member)])
+
+    def fingerprints(
+        self, lengths: np.ndarray, order_dates: np.ndarray, values: np.ndarray
+    ) -> List[str]:
+        """
+        Fingerprint of every segment of shipments: a digest of the forecast parameters and of
+        the order dates and values the forecast is computed from.
+
+        Args:
+            lengths: Number of shipments of every segment.
+            order_dates: datetime64 order date of every shipment.
+            values: Value of every shipment.
+
+        Returns:
+            The hexadecimal digest of every segment.
+        """
+        dates = np.ascontiguousarray(np.asarray(order_dates).astype("datetime64[s]"))
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        stops = np.cumsum(lengths)
+        digests = []
+        for start, stop in zip(stops - lengths, stops):
+            digest = hashlib.blake2b(self._parameters, digest_size=16)
+            digest.update(dates[start:stop].tobytes())
+            digest.update(values[start:stop].tobytes())
+            digests.append(digest.hexdigest())
+        return digests
+
+    def get(self, key: str, fingerprint: str) -> Optional[Dict[float, float]]:
+        """The cached forecast of an entity if its fingerprint is unchanged, else None."""
+        entry = self._previous.get(key)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._current[key] = entry
+        return {quantile: value for quantile, value in entry["forecast"]}
+
+    def put(self, key: str, fingerprint: str, forecast: Dict[float, float]) -> None:
+        """Store the forecast computed for an entity in this run."""
+        self._current[key] = {
+            "fingerprint": fingerprint,
+            "forecast": [[float(quantile), float(value)] for quantile, value in forecast.items()],
+        }
+
+    def save(self) -> None:
+        """Replace the cache file with the forecasts of this run."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"version": CACHE_FORMAT_VERSION, "entries": self._current}, file)
+        os.replace(temporary_path, self.path)
+        logger.info(
+            f"Saved {len(self._current)} forecasts to {self.path} "
+            f"({self.hits} cache hits, {self.misses} misses)."
+        )
+
+    @property
+    def statistics(self) -> Dict[str, float]:
+        """Hits, misses and hit rate of this run."""
+        lookups = self.hits + self.misses
+        return {
+            "forecast_cache_hits": self.hits,
+            "forecast_cache_misses": self.misses,
+            "forecast_cache_hit_rate": self.hits / lookups if lookups else 0.0,
+        }
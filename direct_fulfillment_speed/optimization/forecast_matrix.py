@@ -0,0 +1,157 @@
+"""Quantile forecasts of all the entities as one dense matrix, with a validity mask."""
+
+import logging
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger()
+
+
+class ForecastMatrix:
+    """
+    The quantile forecasts of every entity, one row per entity and one column per quantile.
+
+    The columns are the forecast quantiles, in percent, and the quantiles at which a 0 forecast
+    can be inserted, in ascending order. An entity only forecasts the quantiles whose cell is
+    valid, so an entity with no forecast is a row without any valid cell.
+
+    Attributes:
+        quantiles (np.ndarray): Quantile of every column, in percent, ascending.
+        values (np.ndarray): (entities x quantiles) float64 forecast values.
+        valid (np.ndarray): (entities x quantiles) whether every value is forecast.
+        entities (List[Hashable]): Entity of every row, in the order they were added.
+    """
+
+    def __init__(self, quantiles: np.ndarray):
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        self.values = np.zeros((0, len(self.quantiles)), dtype=np.float64)
+        self.valid = np.zeros((0, len(self.quantiles)), dtype=bool)
+        self.entities: List[Hashable] = []
+        self.rows: Dict[Hashable, int] = {}
+
+    @classmethod
+    def for_quantiles(cls, quantiles: np.ndarray) -> "ForecastMatrix":
+        """
+        Empty matrix for forecasts of quantiles given as proportions in [0, 1]. A 0 forecast is
+        inserted halfway between two consecutive quantiles, at half the first one, or just after
+        the last one, so all these quantiles get a column too.
+        """
+        forecast_quantiles = np.unique(np.asarray(quantiles, dtype=np.float64) * 100)
+        zero_quantiles = np.concatenate(
+            [
+                forecast_quantiles[:1] // 2,
+                (forecast_quantiles[:-1] + forecast_quantiles[1:]) // 2,
+                forecast_quantiles[-1:] + 1,
+            ]
+        )
+        return cls(np.union1d(forecast_quantiles, zero_quantiles))
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def __contains__(self, entity: Hashable) -> bool:
+        return entity in self.rows
+
+    def append(self, entities: Sequence[Hashable], values: np.ndarray, valid: np.ndarray) -> None:
+        """
+        Add the forecasts of entities; the forecasts of an entity already in the matrix are
+        replaced in place.
+
+        Args:
+            entities: Entity of every row.
+            values: (entities x quantiles) forecast values.
+            valid: (entities x quantiles) whether every value is forecast.
+        """
+        existing = np.array([entity in self.rows for entity in entities], dtype=bool)
+        for index in np.flatnonzero(existing):
+            row = self.rows[entities[index]]
+            self.values[row] = values[index]
+            self.valid[row] = valid[index]
+
+        new = np.flatnonzero(~existing)
+        for index in new:
+            self.rows[entities[index]] = len(self.entities)
+            self.entities.append(entities[index])
+        self.values = np.concatenate([self.values, values[new].astype(np.float64)])
+        self.valid = np.concatenate([self.valid, valid[new]])
+
+    def finalize(
+        self, quantiles: np.ndarray, quantile_values: np.ndarray, has_zero: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Forecast rows from the quantile values of entities, like Predict.adjust_quantiles for
+        each of them: 0 is inserted if it is one of the values of an entity but none of its
+        quantiles reached it, and only the highest quantile of equal values is kept.
+
+        The quantile values of an entity are non-decreasing in the quantile, so the 0 of an
+        entity goes right before its first positive value.
+
+        Args:
+            quantiles: Quantiles as proportions in [0, 1].
+            quantile_values: (entities x quantiles) value of every quantile.
+            has_zero: Whether any of the values the quantiles of every entity were taken from
+                is 0.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The (entities x columns) values and validity.
+        """
+        num_rows = len(quantile_values)
+        columns = np.searchsorted(self.quantiles, np.asarray(quantiles, dtype=np.float64) * 100)
+        values = np.zeros((num_rows, len(self.quantiles)), dtype=np.float64)
+        valid = np.zeros((num_rows, len(self.quantiles)), dtype=bool)
+        values[:, columns] = quantile_values
+        valid[:, columns] = True
+
+        # Insert 0 halfway between the quantiles around the first positive value
+        needs_zero = np.asarray(has_zero, dtype=bool) & ~(valid & (values == 0)).any(axis=1)
+        positive = valid & (values > 0)
+        first_positive = np.argmax(positive, axis=1)
+        no_positive = ~positive.any(axis=1)
+        valid_before = valid & (np.arange(len(self.quantiles)) < first_positive[:, None])
+        last_before = len(self.quantiles) - 1 - np.argmax(valid_before[:, ::-1], axis=1)
+        last_valid = len(self.quantiles) - 1 - np.argmax(valid[:, ::-1], axis=1)
+        zero_quantiles = np.where(
+            no_positive,
+            self.quantiles[last_valid] + 1,
+            np.where(
+                valid_before.any(axis=1),
+                (self.quantiles[last_before] + self.quantiles[first_positive]) // 2,
+                self.quantiles[first_positive] // 2,
+            ),
+        )
+        rows = np.flatnonzero(needs_zero)
+        zero_columns = np.searchsorted(self.quantiles, zero_quantiles[rows])
+        values[rows, zero_columns] = 0.0
+        valid[rows, zero_columns] = True
+
+        # Keep only the highest quantile of equal values
+        rows, columns = np.nonzero(valid)
+        order = np.lexsort((columns, values[rows, columns], rows))
+        rows, columns = rows[order], columns[order]
+        duplicate = (rows[:-1] == rows[1:]) & (
+            values[rows[:-1], columns[:-1]] == values[rows[1:], columns[1:]]
+        )
+        valid[rows[:-1][duplicate], columns[:-1][duplicate]] = False
+        return values, valid
+
+    def row_items(self, row: int) -> List[Tuple[float, float]]:
+        """The (quantile, value) forecasts of a row, by ascending quantile."""
+        columns = np.flatnonzero(self.valid[row])
+        return list(zip(self.quantiles[columns].tolist(), self.values[row, columns].tolist()))
+
+    def items_to_row(self, items: Iterable[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """The values and validity of a row with (quantile, value) forecasts of its columns."""
+        values = np.zeros(len(self.quantiles), dtype=np.float64)
+        valid = np.zeros(len(self.quantiles), dtype=bool)
+        for quantile, value in items:
+            column = np.searchsorted(self.quantiles, quantile)
+            if column == len(self.quantiles) or self.quantiles[column] != quantile:
+                raise ValueError(f"Quantile {quantile} is not a column of the forecast matrix.")
+            values[column] = value
+            valid[column] = True
+        return values, valid
+
+    def to_dict(self, row: int) -> Dict[float, float]:
+        """The forecasts of a row as a dictionary of quantile to value."""
+        return dict(self.row_items(row))
@@ -0,0 +1,469 @@
+"""
+Lagrangian solver of the pad selection model as a multiple-choice knapsack.
+
+Every entity selects exactly one of its columns, and the choices of the entities are only coupled
+by a few DEA rows. Relaxing these rows with multipliers mu >= 0 splits the problem by entity:
+each entity picks its column of least reduced cost c - mu A, and
+
+    L(mu) = sum over the entities of their least reduced cost + mu b
+
+is a lower bound of the optimal objective for every mu. It is tightened by first removing the
+columns that violate a row even if every other group selects its column of most activity in the
+row, which can be removed from any feasible solution. The multipliers are improved by projected
+subgradient ascent. The relaxed choices are repaired into feasible ones by greedy moves of the
+entities to the columns covering the violated rows at the least reduced cost, then improved by
+moves saving cost without violating any row, and by exchanges of a saving move against the
+repair it needs. The best of them is the upper bound, and the gap between the two bounds
+certifies how far it can be from the optimum.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger()
+
+# Subgradient iterations, and iterations without a better bound before the step is halved
+MAX_SUBGRADIENT_ITERATIONS = 300
+STALL_ITERATIONS = 20
+# Batches of moves of a repair or an improvement
+MAX_REPAIR_ROUNDS = 100
+# Exchanges tried from the final solution, and saving moves tried per exchange
+MAX_EXCHANGE_ROUNDS = 30
+EXCHANGE_CANDIDATES = 10
+# Tolerance on the rows and the objective
+FEASIBILITY_TOLERANCE = 1e-9
+
+
+@dataclass
+class LagrangianResult:
+    """
+    Best feasible solution of the Lagrangian solver, with its certified lower bound.
+
+    Attributes:
+        choice: Column selected by every entity, or None if no feasible solution was found.
+        objective: Objective value of the solution, inf if none was found.
+        bound: Best Lagrangian lower bound of the optimal objective.
+        iterations: Number of subgradient iterations.
+    """
+
+    choice: Optional[np.ndarray]
+    objective: float
+    bound: float
+    iterations: int
+
+    @property
+    def feasible(self) -> bool:
+        return self.choice is not None
+
+    @property
+    def gap(self) -> float:
+        """Relative gap between the objective and the bound; inf without a solution."""
+        if not self.feasible:
+            return np.inf
+        return max(0.0, self.objective - self.bound) / max(abs(self.objective), 1e-9)
+
+
+def as_greater_equal_rows(
+    coefficients: np.ndarray, senses: Sequence[str], rhs: Sequence[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The rows as greater-or-equal rows: a LESS_EQUAL row is negated, and an EQUAL row is split
+    into a greater-or-equal and a negated less-or-equal row.
+
+    Args:
+        coefficients: (rows x columns) coefficients.
+        senses: EQUAL, GREATER_EQUAL or LESS_EQUAL sense of every row.
+        rhs: Right-hand side of every row.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The coefficients and right-hand sides of the rows.
+    """
+    rows, signs = [], []
+    for row, sense in enumerate(senses):
+        if sense in ("GREATER_EQUAL", "EQUAL"):
+            rows.append(row)
+            signs.append(1.0)
+        if sense in ("LESS_EQUAL", "EQUAL"):
+            rows.append(row)
+            signs.append(-1.0)
+    row_signs = np.array(signs, dtype=np.float64)
+    return (
+        coefficients[rows] * row_signs[:, None],
+        np.asarray(rhs, dtype=np.float64)[rows] * row_signs,
+    )
+
+
+def _group_argmin(values: np.ndarray, starts: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """First column of least value of every group of contiguous columns."""
+    minimums = np.minimum.reduceat(values, starts[:-1])
+    candidates = np.flatnonzero(values == minimums[group])
+    candidate_groups = group[candidates]
+    first = np.ones(len(candidates), dtype=bool)
+    first[1:] = candidate_groups[1:] != candidate_groups[:-1]
+    return candidates[first]
+
+
+def _subset_group_argmin(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """
+    Position of the first least value of every group among some columns, given the value and
+    the non-decreasing group of every column.
+    """
+    first = np.ones(len(groups), dtype=bool)
+    first[1:] = groups[1:] != groups[:-1]
+    starts = np.append(np.flatnonzero(first), len(groups))
+    return _group_argmin(values, starts, np.cumsum(first) - 1)
+
+
+def _prefix_length(feasible: np.ndarray) -> int:
+    """Number of leading True of a boolean array."""
+    return len(feasible) if feasible.all() else int(np.argmin(feasible))
+
+
+def feasible_columns(
+    starts: np.ndarray, coefficients: np.ndarray, rhs: np.ndarray, max_rounds: int = 10
+) -> np.ndarray:
+    """
+    Whether every column can be part of a solution meeting the greater-or-equal rows: a column
+    cannot if a row is violated even with the column of most activity in the row of every other
+    group. Removing columns lowers these activities, so this is repeated until no column is
+    removed.
+
+    Args:
+        starts: First column of every group of contiguous columns, followed by the number of
+            columns.
+        coefficients: (rows x columns) coefficients of the rows.
+        rhs: Right-hand side of every row.
+        max_rounds: Maximum number of removal rounds.
+
+    Returns:
+        np.ndarray: Whether every column is kept.
+    """
+    group = np.repeat(np.arange(len(starts) - 1), np.diff(starts))
+    feasible = np.ones(len(group), dtype=bool)
+    for _ in range(max_rounds):
+        kept_coefficients = np.where(feasible, coefficients, -np.inf)
+        group_maximums = np.maximum.reduceat(kept_coefficients, starts[:-1], axis=1)
+        other_maximums = group_maximums.sum(axis=1)[:, None] - group_maximums[:, group]
+        still_feasible = feasible & (
+            other_maximums + coefficients >= rhs[:, None] - FEASIBILITY_TOLERANCE
+        ).all(axis=0)
+        if (still_feasible == feasible).all():
+            break
+        feasible = still_feasible
+    return feasible
+
+
+class _MultipleChoiceKnapsack:
+    """min c x over one column per group, subject to A x >= b."""
+
+    def __init__(
+        self,
+        starts: np.ndarray,
+        objective: np.ndarray,
+        coefficients: np.ndarray,
+        rhs: np.ndarray,
+    ):
+        self.starts = starts
+        self.group = np.repeat(np.arange(len(starts) - 1), np.diff(starts))
+        self.objective = objective
+        self.coefficients = coefficients
+        self.rhs = rhs
+
+    def reduced_costs(self, multipliers: np.ndarray) -> np.ndarray:
+        return self.objective - multipliers @ self.coefficients
+
+    def relaxed_choice(self, multipliers: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Choice of least reduced cost of every group, and the Lagrangian bound L(mu)."""
+        reduced_costs = self.reduced_costs(multipliers)
+        choice = _group_argmin(reduced_costs, self.starts, self.group)
+        return choice, float(reduced_costs[choice].sum() + multipliers @ self.rhs)
+
+    def cost(self, choice: np.ndarray) -> float:
+        return float(self.objective[choice].sum())
+
+    def row_activity(self, choice: np.ndarray) -> np.ndarray:
+        return self.coefficients[:, choice].sum(axis=1)
+
+    def _row_changes(self, columns: np.ndarray, current: np.ndarray) -> np.ndarray:
+        """Change of the rows when some columns replace the current columns of their groups."""
+        return self.coefficients[:, columns] - self.coefficients[:, current]
+
+    def _saving_columns(self, choice: np.ndarray) -> np.ndarray:
+        """The columns of lower cost than the column chosen by their group."""
+        return np.flatnonzero(
+            self.objective < self.objective[choice[self.group]] - FEASIBILITY_TOLERANCE
+        )
+
+    def repair(self, choice: np.ndarray, reduced_costs: np.ndarray) -> np.ndarray:
+        """
+        Move entities to the columns covering the most of the violated rows per unit of reduced
+        cost, in batches covering the violations, until every row holds. The row activity is
+        updated by the changes of the moves instead of being summed again.
+        """
+        choice = choice.copy()
+        activity = self.row_activity(choice)
+        previous_violated = np.zeros(len(self.rhs), dtype=bool)
+        for _ in range(MAX_REPAIR_ROUNDS):
+            deficit = self.rhs - activity
+            violated = deficit > FEASIBILITY_TOLERANCE
+            if not violated.any():
+                break
+            if (violated & ~previous_violated).any():
+                # A newly violated row may be covered by any column
+                candidates = np.arange(len(self.group))
+            previous_violated = violated
+            current = choice[self.group[candidates]]
+            rows = np.flatnonzero(violated)[:, None]
+            violated_changes = (
+                self.coefficients[rows, candidates] - self.coefficients[rows, current]
+            )
+            row_deficits = deficit[violated, None]
+            coverage = (np.minimum(violated_changes, row_deficits) / row_deficits).sum(axis=0)
+            # Only the columns covering a violated row are candidate moves. While no other row
+            # gets violated, later rounds only consider these and the columns of the groups
+            # that moved since
+            covering = coverage > FEASIBILITY_TOLERANCE
+            candidates, current = candidates[covering], current[covering]
+            violated_changes, coverage = violated_changes[:, covering], coverage[covering]
+            if not len(candidates):
+                break
+            ratios = (reduced_costs[candidates] - reduced_costs[current]) / coverage
+            moves = _subset_group_argmin(ratios, self.group[candidates])
+            moves = moves[np.argsort(ratios[moves], kind="stable")]
+            covered = np.cumsum(violated_changes[:, moves], axis=1) >= row_deficits
+            uncovered = ~covered.all(axis=0)
+            moves = moves[: _prefix_length(uncovered) + 1]
+            activity += self._row_changes(candidates[moves], current[moves]).sum(axis=1)
+            choice[self.group[candidates[moves]]] = candidates[moves]
+            # The moved groups cover the rows differently from their new columns
+            moved = np.zeros(len(self.starts) - 1, dtype=bool)
+            moved[self.group[candidates[moves]]] = True
+            candidates = np.union1d(candidates, np.flatnonzero(moved[self.group]))
+        return choice
+
+    def improve(self, choice: np.ndarray) -> np.ndarray:
+        """
+        Move entities of a feasible choice to the columns saving the most cost, in batches whose
+        row changes keep every row feasible. Moves only lower the cost of the chosen columns,
+        so only the columns saving cost at the start are candidates in every batch, and only
+        the changes of the candidates of the groups that moved are computed again.
+        """
+        choice = choice.copy()
+        activity = self.row_activity(choice)
+        candidates = self._saving_columns(choice)
+        current = choice[self.group[candidates]]
+        savings = self.objective[candidates] - self.objective[current]
+        row_changes = self._row_changes(candidates, current)
+        moved = np.zeros(len(self.starts) - 1, dtype=bool)
+        for _ in range(MAX_REPAIR_ROUNDS):
+            saving = savings < -FEASIBILITY_TOLERANCE
+            if not saving.all():
+                candidates, current, savings = candidates[saving], current[saving], savings[saving]
+                row_changes = row_changes[:, saving]
+            slack = activity - self.rhs
+            allowed = np.flatnonzero(
+                (row_changes >= -slack[:, None] - FEASIBILITY_TOLERANCE).all(axis=0)
+            )
+            if not len(allowed):
+                break
+            moves = allowed[
+                _subset_group_argmin(savings[allowed], self.group[candidates[allowed]])
+            ]
+            moves = moves[np.argsort(savings[moves], kind="stable")]
+            remaining = slack[:, None] + np.cumsum(row_changes[:, moves], axis=1)
+            feasible = (remaining >= -FEASIBILITY_TOLERANCE).all(axis=0)
+            moves = moves[: max(1, _prefix_length(feasible))]
+            activity += row_changes[:, moves].sum(axis=1)
+            choice[self.group[candidates[moves]]] = candidates[moves]
+
+            moved[:] = False
+            moved[self.group[candidates[moves]]] = True
+            stale = np.flatnonzero(moved[self.group[candidates]])
+            current[stale] = choice[self.group[candidates[stale]]]
+            savings[stale] = self.objective[candidates[stale]] - self.objective[current[stale]]
+            row_changes[:, stale] = self._row_changes(candidates[stale], current[stale])
+        return choice
+
+    def exchange(
+        self, choice: np.ndarray, reduced_costs: np.ndarray, target_objective: float = -np.inf
+    ) -> np.ndarray:
+        """
+        Make saving moves of a feasible choice that violate rows, the ones saving the most per
+        unit of row activity first, each followed by the repair and improvement it needs, as
+        long as they lower the cost and it is above the target objective.
+        """
+        cost = self.cost(choice)
+        for _ in range(MAX_EXCHANGE_ROUNDS):
+            if cost <= target_objective:
+                break
+            candidates = self._saving_columns(choice)
+            current = choice[self.group[candidates]]
+            activity_loss = np.maximum(-self._row_changes(candidates, current), 0.0).sum(axis=0)
+            ratios = (self.objective[candidates] - self.objective[current]) / np.maximum(
+                activity_loss, FEASIBILITY_TOLERANCE
+            )
+            moves = _subset_group_argmin(ratios, self.group[candidates])
+            moves = candidates[moves[np.argsort(ratios[moves], kind="stable")]]
+            for move in moves[:EXCHANGE_CANDIDATES]:
+                candidate = choice.copy()
+                candidate[self.group[move]] = move
+                candidate = self.repair(candidate, reduced_costs)
+                if self.is_feasible(candidate):
+                    candidate = self.improve(candidate)
+                    if self.cost(candidate) < cost - FEASIBILITY_TOLERANCE * max(1.0, abs(cost)):
+                        choice, cost = candidate, self.cost(candidate)
+                        break
+            else:
+                break
+        return choice
+
+    def is_feasible(self, choice: np.ndarray) -> bool:
+        return bool((self.row_activity(choice) >= self.rhs - FEASIBILITY_TOLERANCE).all())
+
+
+def solve_multiple_choice_knapsack(
+    starts: np.ndarray,
+    objective: np.ndarray,
+    coefficients: np.ndarray,
+    rhs: np.ndarray,
+    gap_tolerance: float,
+    max_iterations: int = MAX_SUBGRADIENT_ITERATIONS,
+) -> LagrangianResult:
+    """
+    Minimize the objective over one column per group, subject to greater-or-equal rows, by
+    Lagrangian relaxation of the rows.
+
+    Args:
+        starts: First column of every group of contiguous columns, followed by the number of
+            columns.
+        objective: Objective coefficient of every column.
+        coefficients: (rows x columns) coefficients of the greater-or-equal rows.
+        rhs: Right-hand side of every row.
+        gap_tolerance: Relative gap at which the solve stops.
+        max_iterations: Maximum number of subgradient iterations.
+
+    Returns:
+        LagrangianResult: The best solution found and the best lower bound.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    objective = np.asarray(objective, dtype=np.float64)
+    coefficients = np.asarray(coefficients, dtype=np.float64).reshape(len(rhs), len(objective))
+    rhs = np.asarray(rhs, dtype=np.float64)
+
+    kept = feasible_columns(starts, coefficients, rhs)
+    kept_counts = np.add.reduceat(kept.astype(np.int64), starts[:-1])
+    if (kept_counts == 0).any():
+        logger.warning("Some entity has no column that can meet the DEA rows.")
+        return LagrangianResult(None, np.inf, np.inf, 0)
+    columns = np.flatnonzero(kept)
+    problem = _MultipleChoiceKnapsack(
+        np.concatenate([[0], np.cumsum(kept_counts)]),
+        objective[columns],
+        coefficients[:, columns],
+        rhs,
+    )
+    multipliers = best_multipliers = np.zeros(len(problem.rhs))
+    best_choice, best_objective = None, np.inf
+    best_bound = -np.inf
+    step_scale, stalled = 2.0, 0
+
+    def update_solution(choice: np.ndarray, reduced_costs: np.ndarray) -> None:
+        nonlocal best_choice, best_objective
+        candidate = problem.repair(choice, reduced_costs)
+        if problem.is_feasible(candidate):
+            candidate = problem.improve(candidate)
+            if problem.cost(candidate) < best_objective:
+                best_choice, best_objective = candidate, problem.cost(candidate)
+
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        choice, bound = problem.relaxed_choice(multipliers)
+        subgradient = problem.rhs - problem.row_activity(choice)
+        if bound > best_bound + FEASIBILITY_TOLERANCE * max(1.0, abs(bound)):
+            best_bound, best_multipliers, stalled = bound, multipliers, 0
+        else:
+            stalled += 1
+            if stalled >= STALL_ITERATIONS:
+                step_scale, stalled = step_scale / 2, 0
+
+        # Relaxed choices are repaired less and less often as the multipliers converge, at
+        # iterations 1, 2, 4, 8, ..., or when they are feasible and beat the best solution
+        power_of_two = not iteration & (iteration - 1)
+        improving = (subgradient <= FEASIBILITY_TOLERANCE).all() and (
+            problem.cost(choice) < best_objective
+        )
+        if power_of_two or improving:
+            update_solution(choice, problem.reduced_costs(multipliers))
+            result = LagrangianResult(best_choice, best_objective, best_bound, iteration)
+            if result.gap <= gap_tolerance:
+                break
+        if step_scale < 1e-6:
+            break
+
+        # Rows whose multiplier is 0 and that hold cannot move the multipliers
+        subgradient[(multipliers <= 0) & (subgradient < 0)] = 0.0
+        if not subgradient.any():
+            break
+        target = best_objective if np.isfinite(best_objective) else abs(bound) + 1.0
+        step = step_scale * max(target - bound, FEASIBILITY_TOLERANCE) / (subgradient @ subgradient)
+        multipliers = np.maximum(0.0, multipliers + step * subgradient)
+
+    result = LagrangianResult(best_choice, best_objective, best_bound, iteration)
+    if result.gap > gap_tolerance:
+        # Repair the relaxed choice of the best multipliers, and exchange moves from the best
+        reduced_costs = problem.reduced_costs(best_multipliers)
+        update_solution(problem.relaxed_choice(best_multipliers)[0], reduced_costs)
+        if best_choice is not None:
+            # The exchanges stop once the solution is within the gap tolerance of the bound
+            target_objective = best_bound + gap_tolerance * abs(best_bound)
+            best_choice = problem.exchange(best_choice, reduced_costs, target_objective)
+            best_objective = problem.cost(best_choice)
+        result = LagrangianResult(best_choice, best_objective, best_bound, iteration)
+    if result.feasible:
+        result.choice = columns[result.choice]
+
+    logger.info(
+        f"Lagrangian solve: objective {result.objective:.6f}, bound {result.bound:.6f}, "
+        f"gap {result.gap:.4%} after {result.iterations} iterations."
+    )
+    return result
+
+
+def repair_solution(
+    starts: np.ndarray,
+    objective: np.ndarray,
+    coefficients: np.ndarray,
+    rhs: np.ndarray,
+    choice: np.ndarray,
+) -> Optional[np.ndarray]:
+    """
+    Make a choice of one column per group meet greater-or-equal rows by the greedy repair of the
+    Lagrangian solver, at the least cost per unit of coverage of the violated rows, then lower
+    its cost by the moves keeping every row.
+
+    Args:
+        starts: First column of every group of contiguous columns, followed by the number of
+            columns.
+        objective: Objective coefficient of every column.
+        coefficients: (rows x columns) coefficients of the greater-or-equal rows.
+        rhs: Right-hand side of every row.
+        choice: Column chosen by every group.
+
+    Returns:
+        Optional[np.ndarray]: The repaired choice, or None if the repair could not meet every
+        row.
+    """
+    objective = np.asarray(objective, dtype=np.float64)
+    problem = _MultipleChoiceKnapsack(
+        np.asarray(starts, dtype=np.int64),
+        objective,
+        np.asarray(coefficients, dtype=np.float64).reshape(len(rhs), len(objective)),
+        np.asarray(rhs, dtype=np.float64),
+    )
+    choice = problem.repair(np.asarray(choice, dtype=np.int64), objective)
+    if not problem.is_feasible(choice):
+        return None
+    return problem.improve(choice)
@@ -0,0 +1,185 @@
+"""Array form of the pad selection MIP: its columns, objective and constraint rows in CSR."""
+
+import logging
+from typing import Callable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from direct_fulfillment_speed.entities.nodes import ODS, Warehouse
+
+logger = logging.getLogger()
+
+
+class ModelColumns:
+    """
+    Binary decision columns of the model, one per selectable (entity, pad, quantile).
+
+    Columns are appended entity by entity, so the columns of an entity are contiguous. They are
+    collected in lists while the model is built and turned into arrays once by ``finalize``.
+
+    Attributes:
+        entities (List[Union[ODS, Warehouse]]): Entity of every group of columns, in the order added.
+        group (np.ndarray): Index in ``entities`` of the entity of every column.
+        pads (np.ndarray): Pad of every column.
+        quantiles (np.ndarray): Quantile of every column, in percent.
+        objective (np.ndarray): Objective coefficient of every column.
+    """
+
+    def __init__(self):
+        self.entities: List[Union[ODS, Warehouse]] = []
+        self._group: List[int] = []
+        self._pads: List[float] = []
+        self._quantiles: List[float] = []
+        self._objective: List[float] = []
+        self.group = np.zeros(0, dtype=np.int64)
+        self.pads = np.zeros(0, dtype=np.float64)
+        self.quantiles = np.zeros(0, dtype=np.float64)
+        self.objective = np.zeros(0, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self._group)
+
+    def add(self, entity: Union[ODS, Warehouse], pad: float, quantile: float, objective: float) -> int:
+        """
+        Add a column of an entity.
+
+        Args:
+            entity: The ODS/Warehouse of the column.
+            pad: Pad selected by the column.
+            quantile: Quantile of the pad, in percent.
+            objective: Objective coefficient of the column.
+
+        Returns:
+            int: Index of the new column.
+        """
+        if not self.entities or self.entities[-1] is not entity:
+            self.entities.append(entity)
+        self._group.append(len(self.entities) - 1)
+        self._pads.append(pad)
+        self._quantiles.append(quantile)
+        self._objective.append(objective)
+        return len(self._group) - 1
+
+    def finalize(self) -> None:
+        """Turn the columns added so far into arrays."""
+        self.group = np.array(self._group, dtype=np.int64)
+        self.pads = np.array(self._pads, dtype=np.float64)
+        self.quantiles = np.array(self._quantiles, dtype=np.float64)
+        self.objective = np.array(self._objective, dtype=np.float64)
+
+    @property
+    def group_starts(self) -> np.ndarray:
+        """Index of the first column of every entity, followed by the number of columns."""
+        return np.searchsorted(self.group, np.arange(len(self.entities) + 1))
+
+    def entity_mask(self, mask: Sequence[bool]) -> np.ndarray:
+        """Indices of the columns whose entity is selected by a mask over ``entities``."""
+        return np.flatnonzero(np.asarray(mask, dtype=bool)[self.group])
+
+
+class ModelRows:
+    """
+    Constraint rows of the model, collected as they are created and stored in compressed sparse
+    row form for a single bulk load into the solver. Row names are only generated by
+    ``row_names``, when the model is written out.
+
+    Attributes:
+        senses (List[str]): Sense of every row: EQUAL, GREATER_EQUAL or LESS_EQUAL.
+        rhs (List[float]): Right-hand side of every row.
+    """
+
+    def __init__(self):
+        self._names: List[Union[str, Tuple[Callable[[int], str], int]]] = []
+        self.senses: List[str] = []
+        self.rhs: List[float] = []
+        self._lengths: List[np.ndarray] = []
+        self._columns: List[np.ndarray] = []
+        self._coefficients: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self.senses)
+
+    def add(
+        self, name: str, sense: str, columns: np.ndarray, coefficients: np.ndarray, rhs: float
+    ) -> int:
+        """
+        Add a row.
+
+        Args:
+            name: Name of the row.
+            sense: EQUAL, GREATER_EQUAL or LESS_EQUAL.
+            columns: Columns with a nonzero coefficient in the row.
+            coefficients: Coefficient of every column of the row.
+            rhs: Right-hand side of the row.
+
+        Returns:
+            int: Index of the new row.
+        """
+        self._names.append(name)
+        self.senses.append(sense)
+        self.rhs.append(float(rhs))
+        self._lengths.append(np.array([len(columns)], dtype=np.int64))
+        self._columns.append(np.asarray(columns, dtype=np.int64))
+        self._coefficients.append(np.broadcast_to(coefficients, len(columns)).astype(np.float64))
+        return len(self.senses) - 1
+
+    def add_blocks(
+        self,
+        name: Callable[[int], str],
+        sense: str,
+        starts: np.ndarray,
+        coefficient: float,
+        rhs: float,
+    ) -> None:
+        """
+        Add one row per block of contiguous columns, all with the same coefficient, sense and
+        right-hand side, e.g. one row per entity over its columns.
+
+        Args:
+            name: Name of the row of a block, from the index of the block.
+            sense: EQUAL, GREATER_EQUAL or LESS_EQUAL.
+            starts: First column of every block, followed by the end of the last block.
+            coefficient: Coefficient of every column in its row.
+            rhs: Right-hand side of every row.
+        """
+        num_blocks = len(starts) - 1
+        self._names.append((name, num_blocks))
+        self.senses.extend([sense] * num_blocks)
+        self.rhs.extend([float(rhs)] * num_blocks)
+        self._lengths.append(np.diff(starts).astype(np.int64))
+        self._columns.append(np.arange(starts[0], starts[-1], dtype=np.int64))
+        self._coefficients.append(np.full(starts[-1] - starts[0], coefficient, dtype=np.float64))
+
+    def row_names(self) -> List[str]:
+        """Name of every row."""
+        names: List[str] = []
+        for source in self._names:
+            if isinstance(source, str):
+                names.append(source)
+            else:
+                name, num_blocks = source
+                names.extend(name(block) for block in range(num_blocks))
+        return names
+
+    def dense(self, rows: Sequence[int], num_columns: int) -> np.ndarray:
+        """The (rows x columns) coefficients of some of the rows, as a dense matrix."""
+        starts, columns, coefficients = self.to_csr()
+        matrix = np.zeros((len(rows), num_columns), dtype=np.float64)
+        for position, row in enumerate(rows):
+            elements = slice(starts[row], starts[row + 1])
+            matrix[position, columns[elements]] = coefficients[elements]
+        return matrix
+
+    def to_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The rows in compressed sparse row form.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The offset of the first element of every
+            row followed by the number of elements, the column of every element and its
+            coefficient.
+        """
+        if not self._columns:
+            return np.zeros(1, dtype=np.int64), np.zeros(0, np.int64), np.zeros(0, np.float64)
+        starts = np.concatenate([[0], np.cumsum(np.concatenate(self._lengths))])
+        return starts, np.concatenate(self._columns), np.concatenate(self._coefficients)
@@ -0,0 +1,146 @@
+"""Forecast quantiles in worker processes that read the shipment columns from shared memory."""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from direct_fulfillment_speed.optimization.weighted_quantiles import forecast_quantiles
+
+logger = logging.getLogger()
+
+# Name, shape and dtype of an array in shared memory
+SharedArraySpec = Tuple[str, Tuple[int, ...], str]
+
+# Partitions per worker, so that a slow partition does not leave the other workers idle
+PARTITIONS_PER_WORKER = 4
+# Below this many shipments per worker, starting the workers costs more than it saves
+MIN_SHIPMENTS_PER_WORKER = 250000
+
+
+def _share_array(array: np.ndarray) -> Tuple[SharedMemory, SharedArraySpec]:
+    """Copy an array into a new shared memory block."""
+    shared_memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared_array: np.ndarray = np.ndarray(array.shape, dtype=array.dtype, buffer=shared_memory.buf)
+    shared_array[...] = array
+    return shared_memory, (shared_memory.name, array.shape, array.dtype.str)
+
+
+def _attach_array(spec: SharedArraySpec) -> Tuple[SharedMemory, np.ndarray]:
+    """Map an array of the parent's shared memory into this worker; the parent unlinks it."""
+    name, shape, dtype = spec
+    shared_memory = SharedMemory(name=name)
+    return shared_memory, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shared_memory.buf)
+
+
+def _forecast_partition(
+    specs: Dict[str, SharedArraySpec],
+    start: int,
+    stop: int,
+    lengths: np.ndarray,
+    quantiles: np.ndarray,
+    lambda_decay: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Forecast the segments of one partition, whose shipments are rows [start, stop) of the
+    shared columns. This is the unit of work of the process pool, so it is a module-level
+    function.
+    """
+    attached = {name: _attach_array(spec) for name, spec in specs.items()}
+    try:
+        return forecast_quantiles(
+            lengths,
+            attached["order_dates"][1][start:stop],
+            attached["values"][1][start:stop],
+            quantiles,
+            lambda_decay,
+        )
+    finally:
+        for shared_memory, _ in attached.values():
+            shared_memory.close()
+
+
+def partition_segments(lengths: np.ndarray, num_partitions: int) -> List[Tuple[int, int]]:
+    """
+    Split consecutive segments into at most ``num_partitions`` ranges of about the same number of
+    shipments.
+
+    Returns:
+        The (first segment, end segment) of every non-empty partition, in order.
+    """
+    stops = np.cumsum(lengths)
+    targets = stops[-1] * np.arange(1, num_partitions) / num_partitions
+    boundaries = np.searchsorted(stops, targets, side="left") + 1
+    edges = np.unique(np.concatenate([[0], boundaries, [len(lengths)]]))
+    return [(int(first), int(end)) for first, end in zip(edges[:-1], edges[1:]) if end > first]
+
+
+def forecast_quantiles_parallel(
+    lengths: np.ndarray,
+    order_dates: np.ndarray,
+    values: np.ndarray,
+    quantiles: np.ndarray,
+    lambda_decay: float,
+    workers: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Same as weighted_quantiles.forecast_quantiles, with the segments partitioned across worker
+    processes. The shipment columns are copied once into shared memory, so only the segment
+    lengths and the partition bounds are sent to the workers, and the results are gathered in
+    partition order, which keeps them identical to the single-process path.
+
+    Args:
+        lengths: Number of shipments of every segment, all positive.
+        order_dates: datetime64 order date of every shipment, none of them NaT.
+        values: Value of every shipment.
+        quantiles: Quantiles as proportions in [0, 1].
+        lambda_decay: Decay factor for time-based weighting.
+        workers: Number of worker processes.
+
+    Returns:
+        The (segments x quantiles) matrix of quantile values and whether any value of every
+        segment is 0.
+    """
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    partitions = partition_segments(lengths, workers * PARTITIONS_PER_WORKER)
+    row_starts = np.concatenate([[0], np.cumsum(lengths)])
+    logger.info(
+        f"Forecasting {len(lengths)} entities in {len(partitions)} partitions "
+        f"with {workers} workers."
+    )
+
+    shared: List[SharedMemory] = []
+    try:
+        specs: Dict[str, SharedArraySpec] = {}
+        for name, array in (("order_dates", order_dates), ("values", values)):
+            shared_memory, specs[name] = _share_array(np.ascontiguousarray(array))
+            shared.append(shared_memory)
+
+        tasks = [
+            (
+                specs,
+                int(row_starts[first]),
+                int(row_starts[end]),
+                lengths[first:end],
+                quantiles,
+                lambda_decay,
+            )
+            for first, end in partitions
+        ]
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            # map returns the results in partition order, which makes the gather deterministic
+            results = list(pool.map(_forecast_partition, *zip(*tasks)))
+    finally:
+        for shared_memory in shared:
+            shared_memory.close()
+            shared_memory.unlink()
+
+    return (
+        np.concatenate([quantile_matrix for quantile_matrix, _ in results]),
+        np.concatenate([has_zero for _, has_zero in results]),
+    )
@@ -1,17 +1,35 @@
 import logging
-from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
-from direct_fulfillment_speed.entities.nodes import ODS, ShipmentType, Warehouse
-from direct_fulfillment_speed.entities.shipment import ShipmentClass, ShipmentInstance
+from direct_fulfillment_speed.entities.nodes import CarrierType, ODS, ShippingCarrier, Warehouse
+from direct_fulfillment_speed.entities.shipment import ShipmentClass
+from direct_fulfillment_speed.entities.shipment_store import ShipmentSlice
+from direct_fulfillment_speed.optimization.forecast_cache import ForecastCache
+from direct_fulfillment_speed.optimization.forecast_matrix import ForecastMatrix
+from direct_fulfillment_speed.optimization.parallel_forecast import (
+    MIN_SHIPMENTS_PER_WORKER,
+    forecast_quantiles_parallel,
+)
+from direct_fulfillment_speed.optimization.quantile_sketch import DecayedQuantileSketch
+from direct_fulfillment_speed.optimization.similarity_index import (
+    SIMILARITY_WEIGHTS,
+    SimilarityIndex,
+    SimilarityScorer,
+)
+from direct_fulfillment_speed.optimization.weighted_quantiles import (
+    decay_weight_table,
+    day_offsets,
+    forecast_quantiles,
+)
 from direct_fulfillment_speed.utils.config import ConfigManager
-from direct_fulfillment_speed.utils.util import concat_strings
 
 logger = logging.getLogger(__name__)
 
+MICROSECONDS_PER_DAY = 86400 * 10**6
+
 
 class Predict:
     """
@@ -25,36 +43,53 @@ class Predict:
         config (ConfigManager): Configuration manager object.
         ship_object (ShipmentClass): Object of ShipmentClass.
         A dictionary of shipment groups.
-        forecasts (Dict[Union[ODS, Warehouse], Dict[float, float]]): Storage for forecast results.
+        forecasts (ForecastMatrix): Storage for forecast results, one row per entity.
         quantile_list (List[float]): List of quantiles to calculate.
         lambda_decay (float): Decay factor for time-based weighting.
+        forecast_cache (Optional[ForecastCache]): Forecasts of the previous run, if configured.
     """
 
     def __init__(self, config: ConfigManager, shipments: ShipmentClass):
         self.config = config
         self.ship_object = shipments
-        self.forecasts: Dict[Union[ODS, Warehouse], Dict[float, float]] = {}
         self.quantile_list = self.config.quantile_list
+        self.forecasts = ForecastMatrix.for_quantiles(
+            np.array(self.quantile_list, dtype=np.float64) / 100.0
+        )
         self.lambda_decay = self.config.lambda_decay
         self.similarity_finder = SimilarityFinder(shipments)
+        self.forecast_cache = (
+            ForecastCache(
+                config.forecast_cache_path,
+                self.lambda_decay,
+                self.quantile_list,
+                config.sketch_min_shipments,
+                config.sketch_bins_per_day,
+            )
+            if config.forecast_cache_path
+            else None
+        )
 
     @staticmethod
     def calculate_time_decay_weights(
-        dates: List[datetime], lambda_decay: float = 0.1
-    ) -> List[float]:
+        dates: Union[List[datetime], np.ndarray], lambda_decay: float = 0.1
+    ) -> np.ndarray:
         """
         Calculate time decay weights for a list of dates.
 
+        This is the per-entity reference of weighted_quantiles.segmented_time_decay_weights,
+        which the pipeline uses instead.
+
         Args:
-            dates (List[datetime]): List of dates.
+            dates (Union[List[datetime], np.ndarray]): List of dates.
             lambda_decay (float): Decay factor for time-based weighting.
 
         Returns:
-            List[float]: Calculated weights for the dates.
+            np.ndarray: Calculated weights for the dates.
         """
-        most_recent_date = max(dates)
-        dates_diff = np.array([(most_recent_date - date_obj).days for date_obj in dates])
-        weights = lambda_decay * ((1 - lambda_decay) ** np.sqrt(dates_diff))
+        microseconds = np.array(dates, dtype="datetime64[us]").astype(np.int64)
+        dates_diff = day_offsets(microseconds, microseconds.max(), MICROSECONDS_PER_DAY)
+        weights = decay_weight_table(int(dates_diff.max()), lambda_decay)[dates_diff]
         if weights.sum() == 0:
             weights = np.ones(len(weights))
         return weights / weights.sum()
@@ -63,13 +98,236 @@ class Predict:
         """
         Process a list of ODSs and calculate their forecasts.
 
+        The forecasts are the same as calculate_weighted_average of each ODS, but the weights and
+        quantiles of all the ODSs are computed together by the segmented engine of
+        weighted_quantiles, one segment of shipments per ODS.
+
         Args:
             ods_list (List[Union[ODS, Warehouse]]): List of non-sparse ODSs to perform prediction on.
         """
+        entities: List[Union[ODS, Warehouse]] = []
+        slices: List[ShipmentSlice] = []
         for ods in ods_list:
             shipments = self.ship_object.get_shipments_for_entity(ods)
             if shipments:
-                self.forecasts[ods] = self.calculate_weighted_average(shipments)
+                entities.append(ods)
+                slices.append(shipments)
+        if not entities:
+            return
+
+        quantiles = np.array(self.quantile_list, dtype=np.float64) / 100.0
+        lengths, order_dates, gaps, has_data = self.collect_gaps(slices)
+        values = np.zeros((len(entities), len(self.forecasts.quantiles)), dtype=np.float64)
+        valid = np.zeros(values.shape, dtype=bool)
+        values[has_data], valid[has_data] = self.load_or_calculate_forecasts(
+            [entity for entity, entity_has_data in zip(entities, has_data) if entity_has_data],
+            lengths,
+            order_dates,
+            gaps,
+            quantiles,
+        )
+        for _ in range(np.count_nonzero(~has_data)):
+            logger.error("No valid data for weighted average calculation.")
+        self.forecasts.append(entities, values, valid)
+
+    def load_or_calculate_forecasts(
+        self,
+        entities: List[Union[ODS, Warehouse]],
+        lengths: np.ndarray,
+        order_dates: np.ndarray,
+        gaps: np.ndarray,
+        quantiles: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantile forecasts of entities from their consecutive groups of shipments. With a
+        forecast cache, the forecasts of the entities whose shipments and parameters did not
+        change since the cached run are loaded, only the others are computed, and the cache is
+        replaced by the forecasts of this run.
+
+        Args:
+            entities (List[Union[ODS, Warehouse]]): Entities with data, in the order of the groups.
+            lengths (np.ndarray): Number of shipments of every group, all positive.
+            order_dates (np.ndarray): Order date of every shipment.
+            gaps (np.ndarray): C2D - unpadded C2P gap of every shipment.
+            quantiles (np.ndarray): Quantiles as proportions in [0, 1].
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The forecast matrix values and validity of every
+            entity.
+        """
+        sketches = self.ingested_sketches(entities)
+        if self.forecast_cache is None:
+            return self.calculate_forecasts(lengths, order_dates, gaps, quantiles, sketches)
+
+        keys = [self.forecast_cache.entity_key(entity) for entity in entities]
+        fingerprints = self.forecast_cache.fingerprints(lengths, order_dates, gaps)
+        values = np.zeros((len(entities), len(self.forecasts.quantiles)), dtype=np.float64)
+        valid = np.zeros(values.shape, dtype=bool)
+        missing = np.ones(len(entities), dtype=bool)
+        for index, (key, fingerprint) in enumerate(zip(keys, fingerprints)):
+            cached = self.forecast_cache.get(key, fingerprint)
+            if cached is not None:
+                values[index], valid[index] = self.forecasts.items_to_row(cached.items())
+                missing[index] = False
+
+        rows = np.repeat(missing, lengths)
+        values[missing], valid[missing] = self.calculate_forecasts(
+            lengths[missing],
+            order_dates[rows],
+            gaps[rows],
+            quantiles,
+            [sketches[index] for index in np.flatnonzero(missing)],
+        )
+        for index in np.flatnonzero(missing):
+            columns = np.flatnonzero(valid[index])
+            self.forecast_cache.put(
+                keys[index],
+                fingerprints[index],
+                dict(zip(self.forecasts.quantiles[columns], values[index, columns])),
+            )
+        logger.info(
+            f"Forecast {missing.sum()} entities, loaded {len(entities) - missing.sum()} "
+            "from the forecast cache."
+        )
+        self.forecast_cache.save()
+        return values, valid
+
+    def ingested_sketches(
+        self, entities: List[Union[ODS, Warehouse]]
+    ) -> List[Optional[DecayedQuantileSketch]]:
+        """
+        The quantile sketches of the gaps of entities accumulated by the streaming metrics while
+        the input was read, or None for the entities without one.
+
+        Args:
+            entities (List[Union[ODS, Warehouse]]): Entities to get the sketches of.
+
+        Returns:
+            List[Optional[DecayedQuantileSketch]]: The sketch of every entity.
+        """
+        metrics = self.ship_object.store.metrics
+        if metrics is None or metrics.sketch_bins_per_day <= 0:
+            return [None] * len(entities)
+        sketches: List[Optional[DecayedQuantileSketch]] = []
+        for entity in entities:
+            group = (
+                CarrierType.THIRD_PARTY.name
+                if isinstance(entity, ODS)
+                else ShippingCarrier.SWA.name
+            )
+            entity_metrics = metrics.get((group, *entity.hash_member))
+            sketches.append(entity_metrics.sketch if entity_metrics is not None else None)
+        return sketches
+
+    def collect_gaps(
+        self, slices: List[ShipmentSlice]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The C2D - unpadded C2P gaps of several groups of shipments, concatenated group after
+        group, without the shipments missing their order date.
+
+        Args:
+            slices (List[ShipmentSlice]): Shipments of every entity, views over the same store.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The number of shipments of
+            every group with data, the order date and gap of every shipment, and for every group
+            whether it has any shipment with an order date.
+        """
+        store = self.ship_object.store
+        rows, lengths = ShipmentSlice.concatenate_rows(slices)
+        segments = np.repeat(np.arange(len(slices)), lengths)
+
+        order_dates = store.values["order_date"][rows]
+        valid = ~np.isnat(order_dates)
+        rows, segments, order_dates = rows[valid], segments[valid], order_dates[valid]
+        lengths = np.bincount(segments, minlength=len(slices))
+        has_data = lengths > 0
+
+        gaps = store.values["c2d_days"][rows] - store.values["c2p_days_unpadded"][rows]
+        return lengths[has_data], order_dates, gaps, has_data
+
+    def calculate_forecasts(
+        self,
+        lengths: np.ndarray,
+        order_dates: np.ndarray,
+        gaps: np.ndarray,
+        quantiles: np.ndarray,
+        sketches: Optional[List[Optional[DecayedQuantileSketch]]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantile forecasts of consecutive groups of shipments, computed together.
+
+        Groups of at least MODEL.SKETCH_MIN_SHIPMENTS shipments are estimated from a
+        DecayedQuantileSketch, within the error bound of quantile_sketch: the sketch accumulated
+        during ingestion if there is one, else a sketch of the group's shipments. With more
+        than one forecast worker configured, the other groups are partitioned across worker
+        processes; the single-process path is the reference and gives the same results.
+
+        Args:
+            lengths (np.ndarray): Number of shipments of every group, all positive.
+            order_dates (np.ndarray): Order date of every shipment.
+            gaps (np.ndarray): C2D - unpadded C2P gap of every shipment.
+            quantiles (np.ndarray): Quantiles as proportions in [0, 1].
+            sketches (Optional[List[Optional[DecayedQuantileSketch]]]): Sketch of the shipments
+                of every group accumulated during ingestion, or None.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The forecast matrix values and validity of every
+            group.
+        """
+        values = np.zeros((len(lengths), len(self.forecasts.quantiles)), dtype=np.float64)
+        valid = np.zeros(values.shape, dtype=bool)
+        if not len(lengths):
+            return values, valid
+
+        # Entities with more shipments than the threshold are estimated from a sketch of
+        # constant size instead of sorting all their shipments
+        sketched = np.zeros(len(lengths), dtype=bool)
+        if self.config.sketch_min_shipments > 0:
+            sketched = lengths >= self.config.sketch_min_shipments
+        stops = np.cumsum(lengths)
+        for index in np.flatnonzero(sketched):
+            sketch = sketches[index] if sketches is not None else None
+            if sketch is None:
+                start, stop = stops[index] - lengths[index], stops[index]
+                sketch = DecayedQuantileSketch.from_arrays(
+                    order_dates[start:stop], gaps[start:stop], self.config.sketch_bins_per_day
+                )
+            if not sketch.num_shipments:
+                # No finite gap to sketch: the group is forecast from its shipments
+                sketched[index] = False
+                continue
+            sketch_values, sketch_valid = self.forecasts.finalize(
+                quantiles,
+                sketch.quantiles(quantiles, self.lambda_decay)[None, :],
+                np.array([sketch.has_zero]),
+            )
+            values[index], valid[index] = sketch_values[0], sketch_valid[0]
+        if sketched.any():
+            logger.info(f"Estimated the forecasts of {sketched.sum()} dense entities by sketches.")
+            rows = np.repeat(~sketched, lengths)
+            lengths, order_dates, gaps = lengths[~sketched], order_dates[rows], gaps[rows]
+            if not len(lengths):
+                return values, valid
+
+        workers = min(
+            self.config.forecast_workers,
+            len(lengths),
+            len(gaps) // MIN_SHIPMENTS_PER_WORKER,
+        )
+        if workers > 1:
+            quantile_matrix, has_zero = forecast_quantiles_parallel(
+                lengths, order_dates, gaps, quantiles, self.lambda_decay, workers
+            )
+        else:
+            quantile_matrix, has_zero = forecast_quantiles(
+                lengths, order_dates, gaps, quantiles, self.lambda_decay
+            )
+        values[~sketched], valid[~sketched] = self.forecasts.finalize(
+            quantiles, quantile_matrix, has_zero
+        )
+        return values, valid
 
     def extrapolate_sparse_ods(
         self, sparse_ods: List[ODS], non_sparse_ods: List[Union[ODS, Warehouse]]
@@ -81,20 +339,29 @@ class Predict:
             sparse_ods (List[ODS]): List of sparse ODSs.
             non_sparse_ods (List[Union[ODS, Warehouse]]): List of non-sparse ODSs.
         """
-        for sparse in sparse_ods:
-            similar_non_sparse = self.similarity_finder.find_similar_non_sparse(
-                sparse, [ods for ods in non_sparse_ods if isinstance(ods, ODS)]
-            )
+        non_sparse_only_ods = [ods for ods in non_sparse_ods if isinstance(ods, ODS)]
+        all_similar_non_sparse = self.similarity_finder.find_similar_non_sparse_batch(
+            sparse_ods, non_sparse_only_ods
+        )
+        extrapolated: List[ODS] = []
+        values: List[np.ndarray] = []
+        valid: List[np.ndarray] = []
+        for sparse, similar_non_sparse in zip(sparse_ods, all_similar_non_sparse):
             if similar_non_sparse:
-                self.forecasts[sparse] = self.get_estimated_distribution_for_sparse_ods(
+                row_values, row_valid = self.get_estimated_distribution_for_sparse_ods(
                     similar_non_sparse
                 )
+                extrapolated.append(sparse)
+                values.append(row_values)
+                valid.append(row_valid)
             else:
                 logger.warning(f"Unable to extrapolate forecast for sparse ODS: {sparse}")
+        if extrapolated:
+            self.forecasts.append(extrapolated, np.array(values), np.array(valid))
 
     def get_estimated_distribution_for_sparse_ods(
         self, similar_non_sparse: List[Tuple[ODS, float]]
-    ) -> Dict[float, float]:
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
         Estimate the weighted estimated pad distribution for a sparse ODS based
         on similar non-sparse ODSs.
@@ -104,10 +371,13 @@ class Predict:
             ODSs and their similarity scores.
 
         Returns:
-            Dict[float, int]: Weighted forecast for the sparse ODS with integer values.
+            Tuple[np.ndarray, np.ndarray]: Forecast matrix values and validity of the weighted
+            forecast for the sparse ODS, with integer values.
         """
+        values = np.zeros(len(self.forecasts.quantiles), dtype=np.float64)
+        valid = np.zeros(len(self.forecasts.quantiles), dtype=bool)
         if not similar_non_sparse:
-            return {}
+            return values, valid
 
         # Get the highest score
         highest_score = max(score for _, score in similar_non_sparse)
@@ -117,28 +387,28 @@ class Predict:
 
         total_similarity = sum(highest_score for _ in highest_similarity_ods)
         if total_similarity == 0:
-            return {}
+            return values, valid
 
-        weighted_forecast: Dict[float, float] = {}
         for non_sparse in highest_similarity_ods:
-            if non_sparse in self.forecasts:
-                for quantile, value in self.forecasts[non_sparse].items():
-                    if quantile not in weighted_forecast:
-                        weighted_forecast[quantile] = 0
-                    weighted_forecast[quantile] += (highest_score / total_similarity) * value
+            row = self.forecasts.rows.get(non_sparse)
+            if row is not None:
+                row_valid = self.forecasts.valid[row]
+                weighted_values = (highest_score / total_similarity) * self.forecasts.values[row]
+                np.add(values, weighted_values, out=values, where=row_valid)
+                valid |= row_valid
 
         # Round the weighted forecasts to the nearest integer
-        integer_weighted_forecast = {
-            quantile: np.round(value) for quantile, value in weighted_forecast.items()
-        }
-        return integer_weighted_forecast
+        return np.round(values), valid
 
-    def calculate_weighted_average(self, shipments: List[ShipmentInstance]) -> Dict[float, float]:
+    def calculate_weighted_average(self, shipments: ShipmentSlice) -> Dict[float, float]:
         """
         Calculate the weighted average for a group of shipments.
 
+        This is the per-entity reference of process_ods, which computes the same forecasts for
+        all the entities at once.
+
         Args:
-            shipments (List[ShipmentInstance]): List of shipments.
+            shipments (ShipmentSlice): Shipments of one entity.
 
         Returns:
             Dict[float, float]: Dictionary of quantile forecasts.
@@ -159,14 +429,17 @@ class Predict:
             return {}
 
     def adjust_quantiles(
-        self, values: List[float], weights: List[float], quantiles: List[float]
+        self, values: List[float], weights: np.ndarray, quantiles: List[float]
     ) -> Dict[float, float]:
         """
         Adjust the calculation for multiple quantiles, ensuring that 0 is included if missing.
 
+        This is the per-entity reference of weighted_quantiles.forecast_quantiles followed by
+        ForecastMatrix.finalize.
+
         Args:
             values (List[float]): List of values.
-            weights (List[float]): List of weights.
+            weights (np.ndarray): Weight of every value.
             quantiles (List[float]): List of quantiles to calculate.
 
         Returns:
@@ -174,16 +447,16 @@ class Predict:
         """
 
         # Convert values, weights, and quantiles to NumPy arrays
-        values = np.array(values, dtype=np.float64)
-        weights = np.array(weights, dtype=np.float64)
-        quantiles = (
+        value_array = np.array(values, dtype=np.float64)
+        weight_array = np.array(weights, dtype=np.float64)
+        quantile_array = (
             np.array(quantiles, dtype=np.float64) / 100.0
         )  # Convert percentages to proportions
 
         # Sort the data and weights based on the values
-        sorter = np.argsort(values)
-        values_sorted = values[sorter]
-        weights_sorted = weights[sorter]
+        sorter = np.argsort(value_array)
+        values_sorted = value_array[sorter]
+        weights_sorted = weight_array[sorter]
 
         # Compute the cumulative sum of weights
         cumulative_weights = np.cumsum(weights_sorted)
@@ -194,7 +467,7 @@ class Predict:
 
         # Use the weighted rank method
         quantile_values = []
-        for q in quantiles:
+        for q in quantile_array:
             # Find the first index where normalized_weights exceeds the quantile
             idx = np.searchsorted(normalized_weights, q)
             if idx == len(values_sorted):
@@ -202,51 +475,15 @@ class Predict:
             else:
                 quantile_values.append(values_sorted[idx])
 
-        # Create a dictionary of quantile results
-        quantile_forecasts = {q * 100: v for q, v in zip(quantiles, quantile_values)}
-
-        # Check if zero should be included in quantile forecasts
-        if not any(v == 0 for v in quantile_forecasts.values()) and any(w == 0 for w in values):
-            quantile_forecasts = self.insert_zero_into_quantiles(quantile_forecasts)
-
-        # Ensure unique quantile values
-        unique_values = set(quantile_forecasts.values())
-        for value in unique_values:
-            duplicates = {q: v for q, v in quantile_forecasts.items() if v == value}
-            if len(duplicates) > 1:
-                highest_quantile = max(duplicates.keys())
-                for q in list(duplicates):
-                    if q != highest_quantile:
-                        del quantile_forecasts[q]
-
-        return quantile_forecasts
-
-    @staticmethod
-    def insert_zero_into_quantiles(quantile_forecasts: Dict[float, float]) -> Dict[float, float]:
-        """
-        Insert zero into the quantile forecasts if it's not already present.
-
-        Args:
-            quantile_forecasts (Dict[float, float]): Dictionary of quantile forecasts.
-
-        Returns:
-            Dict[float, float]: Updated dictionary of quantile forecasts with zero included.
-        """
-        sorted_quantiles = sorted(quantile_forecasts.items(), key=lambda x: x[1])
-        zero_inserted = False
-
-        for i, (q, v) in enumerate(sorted_quantiles):
-            if v > 0:
-                zero_quantile = ((sorted_quantiles[i - 1][0] + q) // 2) if i > 0 else q // 2
-                quantile_forecasts[zero_quantile] = 0
-                zero_inserted = True
-                break
-
-        if not zero_inserted and sorted_quantiles:
-            highest_quantile = max(quantile_forecasts.keys())
-            quantile_forecasts[highest_quantile + 1] = 0
-
-        return quantile_forecasts
+        forecast_values, forecast_valid = self.forecasts.finalize(
+            quantile_array,
+            np.array([quantile_values]),
+            np.array([any(w == 0 for w in value_array)]),
+        )
+        columns = np.flatnonzero(forecast_valid[0])
+        return dict(
+            zip(self.forecasts.quantiles[columns].tolist(), forecast_values[0, columns].tolist())
+        )
 
     def perform_forecasts(self) -> None:
         """
@@ -257,12 +494,12 @@ class Predict:
         self.extrapolate_sparse_ods(sparse_ods, non_sparse_ods)
 
     @property
-    def get_forecasts(self) -> Dict[Union[ODS, Warehouse], Dict[float, float]]:
+    def get_forecasts(self) -> ForecastMatrix:
         """
         Get the calculated forecasts.
 
         Returns:
-            Dict[Union[ODS, Warehouse], Dict[float, float]]: The calculated forecasts.
+            ForecastMatrix: The calculated forecasts.
         """
         return self.forecasts
 
@@ -273,18 +510,16 @@ class SimilarityFinder:
 
     Attributes:
         ship_object (ShipmentClass): Object of ShipmentClass.
-        shipment_groups (Dict[str, Dict[Union[ODS, Warehouse], List[ShipmentInstance]]]):
+        shipment_groups (Dict[str, Dict[Union[ODS, Warehouse], ShipmentSlice]]):
         A dictionary of shipment groups.
     """
 
     def __init__(self, shipments: ShipmentClass):
         self.ship_object = shipments
         self.shipment_groups: Dict[
-            str, Dict[Union[ODS, Warehouse], List[ShipmentInstance]]
+            str, Dict[Union[ODS, Warehouse], ShipmentSlice]
         ] = shipments.shipment_groups
-        self.similarity_cache: Dict[ShipmentType, Dict[str, List[Tuple[ODS, float]]]] = defaultdict(
-            dict
-        )
+        self.index: Optional[SimilarityIndex] = None
 
     @staticmethod
     def calculate_similarity_score(sparse: ODS, non_sparse: ODS) -> float:
@@ -309,12 +544,7 @@ class SimilarityFinder:
         Returns:
             float: A similarity score between 0 and 100.
         """
-        weights = {
-            "origin": 45,
-            "primary_gl": 25,
-            "distance_zone": 25,
-            "zip_diff": 5,
-        }
+        weights = SIMILARITY_WEIGHTS
 
         score = 0
 
@@ -345,66 +575,46 @@ class SimilarityFinder:
         self, sparse: ODS, non_sparse_ods: List[ODS]
     ) -> List[Tuple[ODS, float]]:
         """
-        Find the most similar non-sparse ODSs for a given sparse ODS, considering compatible shipment types
-        and caching results for attribute combinations.
+        Find the most similar non-sparse ODSs for a given sparse ODS, considering compatible
+        shipment types.
 
-        This method checks the cache for precomputed results based on combinations of 'primary_gl', 'distance_zone',
-        and 'origin'. If a cache hit is found, it returns the cached results. If no cache hit is found, it computes
-        the similarities, sorts the results, caches the best matches, and returns them.
+        The non-sparse ODSs are indexed once per list, by shipment type, origin, primary GL and
+        distance zone with every bucket sorted by destination zip3, so a query is a few bucket
+        lookups and bisections instead of scoring every non-sparse ODS.
 
         Args:
             sparse (ODS): The sparse ODS to find a match for.
             non_sparse_ods (List[ODS]): List of non-sparse ODSs to search.
 
         Returns:
-            List[Tuple[ODS, float]]: List of tuples with the most similar non-sparse ODS and their similarity scores.
+            List[Tuple[ODS, float]]: List of tuples with the most similar non-sparse ODS and their
+            similarity scores.
         """
         if not non_sparse_ods:
             return []
+        if self.index is None or self.index.non_sparse_ods is not non_sparse_ods:
+            self.index = SimilarityIndex(non_sparse_ods)
+        return self.index.best_matches(sparse)
 
-        # Define the attributes to consider
-        attributes = ["origin", "primary_gl", "distance_zone"]
-
-        # Determine the shipment type key
-        primary_key = sparse.carrier.shipment_type
-
-        # Create a unique key for the sparse ODS based on its attributes
-        secondary_key = concat_strings("_", *(getattr(sparse, attr) for attr in attributes))
-
-        # Check cache
-        if secondary_key in self.similarity_cache[primary_key]:
-            return self.similarity_cache[primary_key][secondary_key]
-
-        # Filter non_sparse_ods based on compatible shipment types
-        compatible_non_sparse_ods = [
-            ods
-            for ods in non_sparse_ods
-            if (
-                primary_key in [ShipmentType.UPS_AIR, ShipmentType.UPS_GROUND]
-                and ods.carrier.shipment_type in [ShipmentType.UPS_AIR, ShipmentType.UPS_GROUND]
-            )
-            and sparse.carrier.shipment_type == ods.carrier.shipment_type
-        ]
-
-        if not compatible_non_sparse_ods:
-            return []
-
-        # Calculate similarities
-        similarities = [
-            (ods, self.calculate_similarity_score(sparse, ods)) for ods in compatible_non_sparse_ods
-        ]
-        similarities.sort(key=lambda x: x[1], reverse=True)
-
-        # Get the best matches
-        best_score = similarities[0][1]
-        best_matches = [item for item in similarities if item[1] == best_score]
-
-        if len(best_matches) > 1:
-            best_matches.sort(
-                key=lambda x: abs(int(sparse.dest.dest_zip3) - int(x[0].dest.dest_zip3))
-            )
+    def find_similar_non_sparse_batch(
+        self, sparse_ods: List[ODS], non_sparse_ods: List[ODS]
+    ) -> List[List[Tuple[ODS, float]]]:
+        """
+        Find the most similar non-sparse ODSs of many sparse ODSs at once, with the same result
+        as find_similar_non_sparse for each of them. The sparse ODSs sharing their candidate
+        buckets of the SimilarityIndex are scored together against the ODSs of these buckets
+        with array operations.
 
-        # Store the result in the cache
-        self.similarity_cache[primary_key][secondary_key] = best_matches
+        Args:
+            sparse_ods (List[ODS]): The sparse ODSs to find a match for.
+            non_sparse_ods (List[ODS]): List of non-sparse ODSs to search.
 
-        return best_matches
+        Returns:
+            List[List[Tuple[ODS, float]]]: The most similar non-sparse ODSs of every sparse ODS
+            and their similarity scores.
+        """
+        if not non_sparse_ods:
+            return [[] for _ in sparse_ods]
+        if self.index is None or self.index.non_sparse_ods is not non_sparse_ods:
+            self.index = SimilarityIndex(non_sparse_ods)
+        return SimilarityScorer(non_sparse_ods).best_matches(sparse_ods, self.index)
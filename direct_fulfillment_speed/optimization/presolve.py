@@ -0,0 +1,76 @@
+"""
+Presolve of the candidate pads of an entity, before their decision variables are created.
+
+The coefficient of a decision variable in every DEA constraint is its quantile times a
+nonnegative factor of its entity, so the higher the quantile the more the variable contributes
+to every constraint it is in. A candidate whose cost is at least the cost of a candidate with a
+higher quantile is therefore dominated: replacing it by that candidate keeps every constraint
+and costs no more, so removing it does not change the optimal objective.
+
+An LP relaxation vertex only selects candidates on the lower convex hull of the (quantile, cost)
+curve of the entity; the candidates strictly above it are LP-dominated. Removing them does not
+change the LP relaxation, but may remove the candidate of the integer optimum, so that pruning
+is optional.
+"""
+
+import logging
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger()
+
+# Relative tolerance of the cost comparisons
+COST_TOLERANCE = 1e-12
+
+
+def non_dominated(quantiles: np.ndarray, costs: np.ndarray) -> np.ndarray:
+    """
+    Whether every candidate of an entity is not dominated by a candidate of higher quantile and
+    lower or equal cost.
+
+    Args:
+        quantiles: Quantile of every candidate, all different.
+        costs: Objective coefficient of every candidate.
+
+    Returns:
+        np.ndarray: Whether every candidate is kept.
+    """
+    order = np.argsort(-np.asarray(quantiles, dtype=np.float64), kind="stable")
+    sorted_costs = np.asarray(costs, dtype=np.float64)[order]
+    # Least cost of the candidates of higher quantile
+    higher_costs = np.minimum.accumulate(np.concatenate([[np.inf], sorted_costs[:-1]]))
+    keep = np.empty(len(order), dtype=bool)
+    keep[order] = sorted_costs < higher_costs
+    return keep
+
+
+def on_lower_convex_hull(quantiles: np.ndarray, costs: np.ndarray) -> np.ndarray:
+    """
+    Whether every candidate of an entity is on the lower convex hull of the (quantile, cost)
+    points of its candidates, including the candidates on a hull edge.
+
+    Args:
+        quantiles: Quantile of every candidate, all different.
+        costs: Objective coefficient of every candidate.
+
+    Returns:
+        np.ndarray: Whether every candidate is kept.
+    """
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    costs = np.asarray(costs, dtype=np.float64)
+    tolerance = COST_TOLERANCE * max(1.0, float(np.abs(costs).max(initial=0.0)))
+    hull: List[int] = []
+    for candidate in np.argsort(quantiles, kind="stable").tolist():
+        # Drop the last hull point while it is strictly above the segment to the candidate
+        while len(hull) >= 2:
+            first, last = hull[-2], hull[-1]
+            slope = (costs[candidate] - costs[first]) / (quantiles[candidate] - quantiles[first])
+            segment_cost = costs[first] + slope * (quantiles[last] - quantiles[first])
+            if costs[last] <= segment_cost + tolerance:
+                break
+            hull.pop()
+        hull.append(candidate)
+    keep = np.zeros(len(quantiles), dtype=bool)
+    keep[hull] = True
+    return keep
@@ -0,0 +1,274 @@
+"""
+Bounded-memory sketch of the time-decay weighted quantiles of a very dense entity.
+
+The time decay weight of a shipment only depends on its age, in days, relative to the most
+recent shipment of its entity, which is not known until all the shipments are seen. The sketch
+therefore keeps the number of shipments per (order day, value bin) cell, and applies the
+weights of Predict.calculate_time_decay_weights to the cells when the quantiles are queried.
+Two sketches of the same entity merge by adding their counts, so the sketches of an entity can
+be built batch by batch during ingestion and merged across the partial stores of the input
+files.
+
+Fractional values of a dense entity can fill nearly one cell per shipment, as many as the order
+days times the value range times bins_per_day. A sketch holding more than max_cells cells
+therefore doubles the width of its value bins, merging pairs of adjacent bins, until it holds at
+most max_cells cells or all its values fall in the two bins around 0. A sketch thus holds at
+most max(max_cells, 2 * order days) cells of 24 bytes, whatever the number of shipments. The
+bins are merged by flooring, so the cells of a sketch only depend on its shipments, not on the
+order in which they were added or merged.
+
+Error bound, compared with Predict.adjust_quantiles over the exact shipments:
+    - Values are rounded to the nearest multiple of 1 / bins_per_day, so a returned quantile
+      differs by at most 1 / (2 * bins_per_day) days from the value of the same rank; values on
+      that grid, like whole days, are kept exactly. Once the bins are 2 ** bin_shift times
+      wider, a quantile is the middle of its merged bin and differs by at most
+      2 ** bin_shift / (2 * bins_per_day) days from the value of the same rank.
+    - Ages are counted between calendar days instead of between timestamps, which makes some of
+      them one day older. Every weight is then at least (1 - lambda_decay) times its exact
+      value, so the normalized cumulative weight of any value, i.e. the rank of a quantile, is
+      off by at most lambda_decay / (4 * (1 - lambda_decay)); 0.028 for a lambda_decay of 0.1.
+    - Non-finite values are not added, so they neither take part in the ranks nor become a
+      quantile.
+"""
+
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from direct_fulfillment_speed.optimization.weighted_quantiles import decay_weight_table
+
+logger = logging.getLogger()
+
+# Shipments added to a sketch at once, which bounds the memory of an update
+SKETCH_CHUNK_SIZE = 65536
+# Cells of a sketch beyond which its value bins are merged, about 200 KB per sketch
+SKETCH_MAX_CELLS = 8192
+
+
+def _sorted_cells(
+    days: np.ndarray, bins: np.ndarray, counts: np.ndarray, keys: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The distinct (key, day, bin) cells of shipment counts, sorted, with their counts added.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The key, day, bin and count of
+        every distinct cell.
+    """
+    order = np.lexsort((bins, days, keys))
+    keys, days, bins, counts = keys[order], days[order], bins[order], counts[order]
+    if not len(order):
+        return keys, days, bins, counts
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (keys[1:] != keys[:-1]) | (days[1:] != days[:-1]) | (bins[1:] != bins[:-1])
+    starts = np.flatnonzero(first)
+    return keys[starts], days[starts], bins[starts], np.add.reduceat(counts, starts)
+
+
+class DecayedQuantileSketch:
+    """
+    Mergeable sketch of the time-decay weighted quantiles of the values of one entity.
+
+    Attributes:
+        bins_per_day (int): Number of value bins per day of value, before any merge of bins.
+        max_cells (int): Number of cells beyond which the value bins are merged.
+        bin_shift (int): Number of times the value bins were merged by pairs.
+        days (np.ndarray): Order day, as days since the epoch, of every distinct cell.
+        bins (np.ndarray): Value bin, i.e. value times bins_per_day rounded to the nearest
+            integer and floor divided by 2 ** bin_shift, of every distinct cell.
+        counts (np.ndarray): Number of shipments of every distinct cell.
+        zero_count (int): Number of values exactly 0.
+        num_shipments (int): Number of shipments added, without the non-finite values.
+    """
+
+    __slots__ = (
+        "bins_per_day",
+        "max_cells",
+        "bin_shift",
+        "days",
+        "bins",
+        "counts",
+        "zero_count",
+        "num_shipments",
+    )
+
+    def __init__(self, bins_per_day: int = 100, max_cells: int = SKETCH_MAX_CELLS):
+        if bins_per_day <= 0:
+            raise ValueError(f"The bins per day of a sketch must be positive: {bins_per_day}")
+        if max_cells <= 0:
+            raise ValueError(f"The maximum cells of a sketch must be positive: {max_cells}")
+        self.bins_per_day = bins_per_day
+        self.max_cells = max_cells
+        self.bin_shift = 0
+        self.days = np.empty(0, dtype=np.int64)
+        self.bins = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.zero_count = 0
+        self.num_shipments = 0
+
+    @classmethod
+    def from_arrays(
+        cls,
+        order_dates: np.ndarray,
+        values: np.ndarray,
+        bins_per_day: int = 100,
+        max_cells: int = SKETCH_MAX_CELLS,
+    ) -> "DecayedQuantileSketch":
+        """Sketch of shipments, added chunk by chunk."""
+        sketch = cls(bins_per_day, max_cells)
+        for start in range(0, len(values), SKETCH_CHUNK_SIZE):
+            stop = start + SKETCH_CHUNK_SIZE
+            sketch.update(order_dates[start:stop], values[start:stop])
+        return sketch
+
+    @classmethod
+    def from_segments(
+        cls,
+        keys: np.ndarray,
+        num_keys: int,
+        order_dates: np.ndarray,
+        values: np.ndarray,
+        bins_per_day: int = 100,
+        max_cells: int = SKETCH_MAX_CELLS,
+    ) -> List["DecayedQuantileSketch"]:
+        """
+        Sketches of the shipments of several entities at once, e.g. of one input batch.
+
+        Args:
+            keys: Entity of every shipment, in ``range(num_keys)``.
+            num_keys: Number of entities.
+            order_dates: datetime64 order date of every shipment, none of them NaT.
+            values: Value of every shipment.
+            bins_per_day: Number of value bins per day of value.
+            max_cells: Number of cells of a sketch beyond which its value bins are merged.
+
+        Returns:
+            List[DecayedQuantileSketch]: The sketch of every entity, empty without finite values.
+        """
+        sketches = [cls(bins_per_day, max_cells) for _ in range(num_keys)]
+        keys, days, bins, values = cls._cells_of(
+            np.asarray(keys, dtype=np.int64), order_dates, values, bins_per_day
+        )
+        cell_keys, days, bins, counts = _sorted_cells(
+            days, bins, np.ones(len(keys), dtype=np.int64), keys
+        )
+        zero_counts = np.bincount(keys[values == 0], minlength=num_keys)
+        num_shipments = np.bincount(keys, minlength=num_keys)
+        stops = np.searchsorted(cell_keys, np.arange(num_keys), side="right")
+        for key in np.flatnonzero(num_shipments):
+            start = stops[key - 1] if key else 0
+            sketch = sketches[key]
+            sketch.days = days[start : stops[key]]
+            sketch.bins = bins[start : stops[key]]
+            sketch.counts = counts[start : stops[key]]
+            sketch.zero_count = int(zero_counts[key])
+            sketch.num_shipments = int(num_shipments[key])
+            sketch._merge_bins()
+        return sketches
+
+    @staticmethod
+    def _cells_of(
+        keys: np.ndarray, order_dates: np.ndarray, values: np.ndarray, bins_per_day: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """The key, order day, value bin and value of every shipment with a finite value."""
+        values = np.asarray(values, dtype=np.float64)
+        finite = np.isfinite(values)
+        days = np.asarray(order_dates)[finite].astype("datetime64[D]").astype(np.int64)
+        values = values[finite]
+        bins = np.rint(values * bins_per_day).astype(np.int64)
+        return keys[finite], days, bins, values
+
+    def update(self, order_dates: np.ndarray, values: np.ndarray) -> None:
+        """
+        Add shipments to the sketch. Shipments with a non-finite value are not added.
+
+        Args:
+            order_dates: datetime64 order date of every shipment, none of them NaT.
+            values: Value of every shipment.
+        """
+        keys, days, bins, values = self._cells_of(
+            np.zeros(len(values), dtype=np.int64), order_dates, values, self.bins_per_day
+        )
+        self._add_cells(days, bins >> self.bin_shift, np.ones(len(days), dtype=np.int64))
+        self.zero_count += int(np.count_nonzero(values == 0))
+        self.num_shipments += len(values)
+
+    def merge(self, other: "DecayedQuantileSketch") -> None:
+        """Add the shipments of another sketch of the same entity, e.g. of another input part."""
+        if other.bins_per_day != self.bins_per_day:
+            raise ValueError(
+                f"Cannot merge quantile sketches with {other.bins_per_day} and "
+                f"{self.bins_per_day} bins per day."
+            )
+        other_bins = other.bins
+        if other.bin_shift > self.bin_shift:
+            self._shift_bins(other.bin_shift - self.bin_shift)
+        else:
+            other_bins = other_bins >> (self.bin_shift - other.bin_shift)
+        self._add_cells(other.days, other_bins, other.counts)
+        self.zero_count += other.zero_count
+        self.num_shipments += other.num_shipments
+
+    def _add_cells(self, days: np.ndarray, bins: np.ndarray, counts: np.ndarray) -> None:
+        """
+        Add the counts of cells, of the current bin width, keeping one sorted entry per distinct
+        cell.
+        """
+        if not len(days):
+            return
+        _, self.days, self.bins, self.counts = _sorted_cells(
+            np.concatenate([self.days, days]),
+            np.concatenate([self.bins, bins]),
+            np.concatenate([self.counts, counts]),
+            np.zeros(len(self.days) + len(days), dtype=np.int64),
+        )
+        self._merge_bins()
+
+    def _shift_bins(self, shift: int) -> None:
+        """Merge the value bins 2 ** shift by 2 ** shift, adding the counts of merged cells."""
+        self.bin_shift += shift
+        _, self.days, self.bins, self.counts = _sorted_cells(
+            self.days, self.bins >> shift, self.counts, np.zeros(len(self.days), dtype=np.int64)
+        )
+
+    def _merge_bins(self) -> None:
+        """Merge pairs of value bins while the sketch holds more than max_cells cells."""
+        while len(self.counts) > self.max_cells and (
+            self.bins.min() < -1 or self.bins.max() > 0
+        ):
+            self._shift_bins(1)
+
+    @property
+    def has_zero(self) -> bool:
+        """Whether any value of the sketch is 0."""
+        return self.zero_count > 0
+
+    def quantiles(self, quantiles: np.ndarray, lambda_decay: float) -> np.ndarray:
+        """
+        Time-decay weighted quantiles of the sketched values, with the weighted rank method of
+        Predict.adjust_quantiles, within the error bound of the module.
+
+        Args:
+            quantiles: Quantiles as proportions in [0, 1].
+            lambda_decay: Decay factor for time-based weighting.
+
+        Returns:
+            The value of every quantile.
+        """
+        if not len(self.counts):
+            raise ValueError("Cannot compute the quantiles of an empty sketch.")
+        counts = self.counts.astype(np.float64)
+        ages = self.days.max() - self.days
+        weights = decay_weight_table(int(ages.max()), lambda_decay)[ages] * counts
+        if weights.sum() == 0:
+            weights = counts
+
+        value_bins, cell_bins = np.unique(self.bins, return_inverse=True)
+        cumulative_weights = np.cumsum(np.bincount(cell_bins, weights=weights))
+        normalized_weights = cumulative_weights / cumulative_weights[-1]
+        ranks = np.searchsorted(normalized_weights, np.asarray(quantiles, dtype=np.float64))
+        # The middle of the merged bins, i.e. the bin itself before any merge
+        width = 1 << self.bin_shift
+        middles = value_bins[np.minimum(ranks, len(value_bins) - 1)] * width + (width - 1) / 2
+        return middles / self.bins_per_day
@@ -0,0 +1,335 @@
+"""Find the most similar non-sparse ODSs of sparse ODSs without scoring every pair in Python."""
+
+import logging
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from direct_fulfillment_speed.entities.nodes import ODS, ShipmentType, Warehouse
+
+logger = logging.getLogger()
+
+# Weights of the attributes of SimilarityFinder.calculate_similarity_score
+SIMILARITY_WEIGHTS = {
+    "origin": 45,
+    "primary_gl": 25,
+    "distance_zone": 25,
+    "zip_diff": 5,
+}
+
+# Shipment types that can be extrapolated; an ODS is only similar to ODSs of its own type
+COMPATIBLE_SHIPMENT_TYPES = (ShipmentType.UPS_AIR, ShipmentType.UPS_GROUND)
+
+# Most similarity scores SimilarityScorer computes at once
+MAX_SCORES_PER_CHUNK = 1 << 20
+
+# (absolute zip3 difference, position in the indexed list, ODS) of a match
+Match = Tuple[int, int, ODS]
+
+
+class ZipBucket:
+    """
+    ODSs sharing their similarity attributes, sorted by destination zip3, so the ODSs at a given
+    zip3 distance of a sparse ODS are found by bisection.
+    """
+
+    __slots__ = ("zip3s", "positions", "ods", "position_array")
+
+    def __init__(self, entries: List[Tuple[int, int, ODS]]):
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        self.zip3s: List[int] = [zip3 for zip3, _, _ in entries]
+        self.positions: List[int] = [position for _, position, _ in entries]
+        self.ods: List[ODS] = [ods for _, _, ods in entries]
+        self.position_array = np.array(self.positions, dtype=np.int64)
+
+    def best_zip_score(self, zip3: int) -> int:
+        """Highest zip code proximity score of the bucket for a destination zip3."""
+        index = bisect_left(self.zip3s, zip3)
+        nearest = min(
+            abs(self.zip3s[neighbor] - zip3)
+            for neighbor in (index - 1, index)
+            if 0 <= neighbor < len(self.zip3s)
+        )
+        return max(0, SIMILARITY_WEIGHTS["zip_diff"] - nearest)
+
+    def with_zip_score(self, zip3: int, zip_score: int) -> Iterator[Match]:
+        """The ODSs of the bucket whose zip code proximity score is ``zip_score``."""
+        max_score = SIMILARITY_WEIGHTS["zip_diff"]
+        if 0 < zip_score <= max_score:
+            zip_diff = max_score - zip_score
+            for target in sorted({zip3 - zip_diff, zip3 + zip_diff}):
+                for k in range(bisect_left(self.zip3s, target), bisect_right(self.zip3s, target)):
+                    yield zip_diff, self.positions[k], self.ods[k]
+        elif zip_score == 0:
+            # Every ODS at least max_score zip3s away
+            low = bisect_left(self.zip3s, zip3 - max_score + 1)
+            high = bisect_right(self.zip3s, zip3 + max_score - 1)
+            for k in chain(range(low), range(high, len(self.zip3s))):
+                yield abs(self.zip3s[k] - zip3), self.positions[k], self.ods[k]
+
+
+class SimilarityIndex:
+    """
+    The non-sparse ODSs bucketed by shipment type, origin, primary GL and distance zone, with
+    every bucket sorted by destination zip3.
+
+    The best matches of a sparse ODS come from a few buckets: the ones of its origin score at
+    least the origin weight, which no other ODS reaches unless it matches both the primary GL
+    and the distance zone, and only without any of those does the zip code decide alone.
+
+    Attributes:
+        non_sparse_ods (Sequence[ODS]): The indexed ODSs.
+    """
+
+    def __init__(self, non_sparse_ods: Sequence[ODS]):
+        self.non_sparse_ods = non_sparse_ods
+        by_origin: Dict[Tuple, Dict[Tuple, List]] = defaultdict(lambda: defaultdict(list))
+        by_gl_zone: Dict[Tuple, List] = defaultdict(list)
+        by_type: Dict[ShipmentType, List] = defaultdict(list)
+        for position, ods in enumerate(non_sparse_ods):
+            shipment_type = ods.carrier.shipment_type
+            if shipment_type not in COMPATIBLE_SHIPMENT_TYPES:
+                continue
+            entry = (int(ods.dest.dest_zip3), position, ods)
+            by_origin[shipment_type, ods.origin][ods.primary_gl, ods.distance_zone].append(entry)
+            by_gl_zone[shipment_type, ods.primary_gl, ods.distance_zone].append(entry)
+            by_type[shipment_type].append(entry)
+
+        self.by_origin: Dict[Tuple[ShipmentType, Warehouse], Dict[Tuple, ZipBucket]] = {
+            key: {attributes: ZipBucket(entries) for attributes, entries in buckets.items()}
+            for key, buckets in by_origin.items()
+        }
+        self.by_gl_zone: Dict[Tuple, ZipBucket] = {
+            key: ZipBucket(entries) for key, entries in by_gl_zone.items()
+        }
+        self.by_type: Dict[ShipmentType, ZipBucket] = {
+            key: ZipBucket(entries) for key, entries in by_type.items()
+        }
+
+    def _candidate_buckets(self, sparse: ODS) -> List[Tuple[int, ZipBucket]]:
+        """The buckets holding the best matches of a sparse ODS, with their score before zip3."""
+        shipment_type = sparse.carrier.shipment_type
+        attributes = (sparse.primary_gl, sparse.distance_zone)
+        origin_buckets = self.by_origin.get((shipment_type, sparse.origin), {})
+
+        candidates = [
+            (
+                SIMILARITY_WEIGHTS["origin"]
+                + SIMILARITY_WEIGHTS["primary_gl"] * (primary_gl == sparse.primary_gl)
+                + SIMILARITY_WEIGHTS["distance_zone"] * (distance_zone == sparse.distance_zone),
+                bucket,
+            )
+            for (primary_gl, distance_zone), bucket in origin_buckets.items()
+        ]
+        # Other origins matching both the GL and the zone only compete with the same origin when
+        # none of its ODSs matches both too, in which case the bucket holds no ODS of the origin
+        if attributes not in origin_buckets:
+            other_origins: Optional[ZipBucket] = self.by_gl_zone.get((shipment_type, *attributes))
+            if other_origins is not None:
+                score = SIMILARITY_WEIGHTS["primary_gl"] + SIMILARITY_WEIGHTS["distance_zone"]
+                candidates.append((score, other_origins))
+        if not candidates and shipment_type in self.by_type:
+            candidates.append((0, self.by_type[shipment_type]))
+        return candidates
+
+    @staticmethod
+    def candidate_key(sparse: ODS) -> Tuple:
+        """The attributes of a sparse ODS its candidate buckets depend on."""
+        return (
+            sparse.carrier.shipment_type,
+            sparse.origin,
+            sparse.primary_gl,
+            sparse.distance_zone,
+        )
+
+    def candidate_positions(self, sparse: ODS) -> np.ndarray:
+        """
+        Positions in the indexed list of the ODSs of the buckets holding the best matches of a
+        sparse ODS, the same for all the sparse ODSs of the same candidate_key.
+        """
+        if sparse.carrier.shipment_type not in COMPATIBLE_SHIPMENT_TYPES:
+            return np.empty(0, dtype=np.int64)
+        buckets = [bucket.position_array for _, bucket in self._candidate_buckets(sparse)]
+        return np.concatenate(buckets) if buckets else np.empty(0, dtype=np.int64)
+
+    def best_matches(self, sparse: ODS) -> List[Tuple[ODS, float]]:
+        """
+        Same result as scoring every compatible non-sparse ODS with
+        SimilarityFinder.calculate_similarity_score and keeping the best ones: the ODSs with the
+        highest score, by zip3 difference and then in the order of the indexed list.
+
+        Args:
+            sparse (ODS): The sparse ODS to find a match for.
+
+        Returns:
+            List[Tuple[ODS, float]]: The most similar non-sparse ODSs and their similarity score.
+        """
+        if sparse.carrier.shipment_type not in COMPATIBLE_SHIPMENT_TYPES:
+            return []
+        candidates = self._candidate_buckets(sparse)
+        if not candidates:
+            return []
+
+        zip3 = int(sparse.dest.dest_zip3)
+        best_score = max(score + bucket.best_zip_score(zip3) for score, bucket in candidates)
+        matches = sorted(
+            chain.from_iterable(
+                bucket.with_zip_score(zip3, best_score - score) for score, bucket in candidates
+            )
+        )
+        return [(ods, best_score) for _, _, ods in matches]
+
+
+class SimilarityScorer:
+    """
+    Scores blocks of sparse ODSs against non-sparse ODSs at once: the origin, primary GL,
+    distance zone and shipment type are encoded as integer codes and the destination zip3 as an
+    integer, so the similarity scores of a block are computed by broadcasting, chunk by chunk of
+    non-sparse ODSs to cap the size of the score matrices.
+
+    With a SimilarityIndex, the sparse ODSs of the same candidate key are scored together
+    against the ODSs of their candidate buckets only, instead of every non-sparse ODS.
+
+    Attributes:
+        non_sparse_ods (Sequence[ODS]): The scored ODSs.
+    """
+
+    def __init__(self, non_sparse_ods: Sequence[ODS], max_scores: int = MAX_SCORES_PER_CHUNK):
+        self.non_sparse_ods = non_sparse_ods
+        self.max_scores = max_scores
+        self._codes: Dict[str, Dict[object, int]] = defaultdict(dict)
+        self.candidates = np.array(
+            [
+                position
+                for position, ods in enumerate(non_sparse_ods)
+                if ods.carrier.shipment_type in COMPATIBLE_SHIPMENT_TYPES
+            ],
+            dtype=np.int64,
+        )
+        self.columns = self._encode([non_sparse_ods[position] for position in self.candidates])
+        # Column of every non-sparse ODS among the candidates, -1 if it is not compatible
+        self.column_of = np.full(len(non_sparse_ods), -1, dtype=np.int64)
+        self.column_of[self.candidates] = np.arange(len(self.candidates))
+
+    def _encode(self, ods_list: Sequence[ODS]) -> Dict[str, np.ndarray]:
+        """Integer codes of the similarity attributes of ODSs, shared by all the encoded lists."""
+        attributes = {
+            "shipment_type": lambda ods: ods.carrier.shipment_type,
+            "origin": lambda ods: ods.origin,
+            "primary_gl": lambda ods: ods.primary_gl,
+            "distance_zone": lambda ods: ods.distance_zone,
+        }
+        columns = {}
+        for name, attribute in attributes.items():
+            codes = self._codes[name]
+            columns[name] = np.array(
+                [codes.setdefault(attribute(ods), len(codes)) for ods in ods_list], dtype=np.int64
+            )
+        columns["zip3"] = np.array([int(ods.dest.dest_zip3) for ods in ods_list], dtype=np.int64)
+        return columns
+
+    def scores(
+        self, sparse: Dict[str, np.ndarray], columns: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Similarity scores of encoded sparse ODSs against the candidates of some columns, like
+        SimilarityFinder.calculate_similarity_score, and -1 for the incompatible pairs.
+
+        Returns:
+            The (sparse x candidates) scores and zip3 differences.
+        """
+        candidates = {name: column[None, columns] for name, column in self.columns.items()}
+        sparse = {name: column[:, None] for name, column in sparse.items()}
+        same_gl = sparse["primary_gl"] == candidates["primary_gl"]
+        same_zone = sparse["distance_zone"] == candidates["distance_zone"]
+        zip_diffs = np.abs(sparse["zip3"] - candidates["zip3"])
+
+        scores = np.where(
+            sparse["origin"] == candidates["origin"],
+            SIMILARITY_WEIGHTS["origin"]
+            + SIMILARITY_WEIGHTS["primary_gl"] * same_gl
+            + SIMILARITY_WEIGHTS["distance_zone"] * same_zone,
+            (SIMILARITY_WEIGHTS["primary_gl"] + SIMILARITY_WEIGHTS["distance_zone"])
+            * (same_gl & same_zone),
+        )
+        scores += np.maximum(0, SIMILARITY_WEIGHTS["zip_diff"] - zip_diffs)
+        scores[sparse["shipment_type"] != candidates["shipment_type"]] = -1
+        return scores, zip_diffs
+
+    def best_matches(
+        self, sparse_ods: Sequence[ODS], index: Optional[SimilarityIndex] = None
+    ) -> List[List[Tuple[ODS, float]]]:
+        """
+        The best matches of every sparse ODS, the same as SimilarityIndex.best_matches.
+
+        Args:
+            sparse_ods (Sequence[ODS]): The sparse ODSs to find a match for.
+            index (Optional[SimilarityIndex]): Index of the same non-sparse ODSs; with it, every
+                sparse ODS is only scored against the ODSs of its candidate buckets.
+
+        Returns:
+            List[List[Tuple[ODS, float]]]: The most similar non-sparse ODSs of every sparse ODS
+            and their similarity score.
+        """
+        results: List[List[Tuple[ODS, float]]] = [[] for _ in range(len(sparse_ods))]
+        if not len(sparse_ods) or not len(self.candidates):
+            return results
+        if index is None:
+            self._best_matches_of(
+                sparse_ods, np.arange(len(sparse_ods)), np.arange(len(self.candidates)), results
+            )
+            return results
+
+        groups: Dict[Tuple, List[int]] = defaultdict(list)
+        for row, sparse in enumerate(sparse_ods):
+            groups[index.candidate_key(sparse)].append(row)
+        for rows in groups.values():
+            positions = index.candidate_positions(sparse_ods[rows[0]])
+            if len(positions):
+                self._best_matches_of(
+                    sparse_ods, np.array(rows), self.column_of[positions], results
+                )
+        return results
+
+    def _best_matches_of(
+        self,
+        sparse_ods: Sequence[ODS],
+        rows: np.ndarray,
+        columns: np.ndarray,
+        results: List[List[Tuple[ODS, float]]],
+    ) -> None:
+        """
+        Set the best matches among the candidates of some columns of some sparse ODSs.
+
+        The ODSs with the best score so far are kept chunk by chunk, and those whose score is
+        the best of all the chunks are sorted by zip3 difference and then by position.
+        """
+        block_size = max(1, min(len(rows), self.max_scores // len(columns)))
+        chunk_size = max(1, self.max_scores // block_size)
+        for block_start in range(0, len(rows), block_size):
+            block_rows = rows[block_start : block_start + block_size]
+            encoded = self._encode([sparse_ods[row] for row in block_rows])
+            best = np.full(len(block_rows), -1, dtype=np.int64)
+            matched_rows, positions, zip_diffs, scores = [], [], [], []
+            for first in range(0, len(columns), chunk_size):
+                chunk = columns[first : first + chunk_size]
+                chunk_scores, chunk_zip_diffs = self.scores(encoded, chunk)
+                best = np.maximum(best, chunk_scores.max(axis=1))
+                row, column = np.nonzero((chunk_scores == best[:, None]) & (best[:, None] >= 0))
+                matched_rows.append(row)
+                positions.append(self.candidates[chunk[column]])
+                zip_diffs.append(chunk_zip_diffs[row, column])
+                scores.append(chunk_scores[row, column])
+
+            row, position, zip_diff, score = (
+                np.concatenate(column) for column in (matched_rows, positions, zip_diffs, scores)
+            )
+            kept = score == best[row]
+            row, position, zip_diff = row[kept], position[kept], zip_diff[kept]
+            for k in np.lexsort((position, zip_diff, row)):
+                results[block_rows[row[k]]].append(
+                    (self.non_sparse_ods[position[k]], int(best[row[k]]))
+                )
@@ -1,14 +1,102 @@
-from typing import List
+"""MIP solver backends: the Solver interface, Xpress and the open-source HiGHS."""
+
+from abc import ABC, abstractmethod
+from types import ModuleType
+from typing import List, Optional
+
+import numpy as np
 
 try:
     import amazon_xpress_license
     import xpress
 except Exception:
-    import xpress
+    try:
+        import xpress
+    except ImportError:
+        xpress = None
+
+highspy: Optional[ModuleType]
+try:
+    import highspy
+except ImportError:
+    highspy = None
+
+# Xpress row type of every constraint sense
+ROW_TYPES = {"EQUAL": "E", "GREATER_EQUAL": "G", "LESS_EQUAL": "L"}
+
+
+class Solver(ABC):
+    """
+    Interface of a MIP solver backend. The optimization model is loaded, solved and read only
+    through these methods, as arrays of binary columns and CSR rows, so it can be solved by any
+    backend of SOLVER_BACKENDS. A backend missing any of them cannot be instantiated.
+    """
+
+    @abstractmethod
+    def setOutputFlag(self, optionStr):
+        """Whether the solver logs its progress."""
+
+    @abstractmethod
+    def setMaxTime(self, optionStr):
+        """Time limit of the solve in seconds, stopping even if no solution was found."""
+
+    @abstractmethod
+    def setMIPGap(self, optionStr):
+        """Relative MIP gap at which the solve stops."""
+
+    @abstractmethod
+    def setPresolve(self, optionStr):
+        """MIP presolve level; 0 turns presolve off."""
+
+    @abstractmethod
+    def setThreads(self, optionStr):
+        """Number of threads of the solver."""
+
+    @abstractmethod
+    def addBinaryColumns(self, objCoefs):
+        """Add binary columns, with no row elements, with their objective coefficients."""
+
+    @abstractmethod
+    def addRows(self, cstStrList, rhs, start, colIndices, coefs):
+        """Add rows given in CSR form, with a sense of ROW_TYPES and a rhs for every row."""
 
+    @abstractmethod
+    def addNames(self, rowNames, colNames):
+        """Name all the rows and columns, to write the model."""
 
-class Solver:
+    @abstractmethod
+    def write(self, fileNameStr):
+        """Write the model as an LP file."""
+
+    @abstractmethod
+    def loadMIPSol(self, sol):
+        """Load a value for every column as the starting incumbent of the next MIP solve."""
+
+    @abstractmethod
+    def mip_optimize(self, flags=""):
+        """Solve the MIP."""
+
+    @abstractmethod
+    def getSolution(self, var=None):
+        """Value of every column in the solution."""
+
+    @abstractmethod
+    def getObjectiveValue(self):
+        """Objective value of the solution."""
+
+    @abstractmethod
+    def getStatus(self):
+        """Status of the solve."""
+
+    @abstractmethod
+    def getAttribute(self, attrStr):
+        """COLS, ROWS, MIPOBJVAL or BESTBOUND attribute of the model."""
+
+
+class XpressSolver(Solver):
     def __init__(self, modelName, typeStr="MINIMIZE"):
+        if xpress is None:
+            raise ImportError("The xpress solver backend requires the xpress package.")
         xpress.beginlicensing()
         oem_num, oem_str = xpress.license(0, "")
         oem_lic = 63112059 - (oem_num * oem_num) // 19
@@ -47,7 +135,8 @@ class Solver:
         self.model.setControl("outputlog", optionStr)
 
     def setMaxTime(self, optionStr):
-        self.model.setControl("maxtime", optionStr)
+        # A negative maxtime stops the solve even if no solution was found
+        self.model.setControl("maxtime", -abs(optionStr))
 
     def setMIPGap(self, optionStr):
         self.model.setControl("miprelstop", optionStr)
@@ -55,6 +144,9 @@ class Solver:
     def setThreads(self, optionStr):
         self.model.setControl("threads", optionStr)
 
+    def setPresolve(self, optionStr):
+        self.model.setControl("mippresolve", optionStr)
+
     def setControl(self, controlStr, optionStr):
         self.model.setControl(controlStr, optionStr)
 
@@ -70,6 +162,25 @@ class Solver:
     def addVariable(self, var):
         self.model.addVariable(var)
 
+    def addBinaryColumns(self, objCoefs):
+        first = self.model.attributes.cols
+        numCols = len(objCoefs)
+        self.model.addcols(
+            objCoefs, [0] * (numCols + 1), [], [], [0] * numCols, [1] * numCols
+        )
+        self.model.chgcoltype(list(range(first, first + numCols)), ["B"] * numCols)
+        self.model.chgobjsense(self.probType)
+
+    def addRows(self, cstStrList, rhs, start, colIndices, coefs):
+        rowTypes = [ROW_TYPES[cstStr] for cstStr in cstStrList]
+        self.model.addrows(rowTypes, rhs, start, colIndices, coefs)
+
+    def addNames(self, rowNames, colNames):
+        if rowNames:
+            self.model.addnames(1, rowNames, 0, len(rowNames) - 1)
+        if colNames:
+            self.model.addnames(2, colNames, 0, len(colNames) - 1)
+
     def delVariable(self, varList):
         self.model.delVariable(varList)
 
@@ -146,3 +257,123 @@ class Solver:
 
     def getStatus(self):
         return self.model.getProbStatusString()
+
+
+class HighsSolver(Solver):
+    """Open-source HiGHS backend, through highspy."""
+
+    def __init__(self, modelName, typeStr="MINIMIZE"):
+        if highspy is None:
+            raise ImportError("The highs solver backend requires the highspy package.")
+        self.modelName = modelName
+        self.model = highspy.Highs()
+        self.model.changeObjectiveSense(
+            highspy.ObjSense.kMaximize if typeStr == "MAXIMIZE" else highspy.ObjSense.kMinimize
+        )
+
+    def setOutputFlag(self, optionStr):
+        self.model.setOptionValue("output_flag", bool(optionStr))
+
+    def setMaxTime(self, optionStr):
+        self.model.setOptionValue("time_limit", float(abs(optionStr)))
+
+    def setMIPGap(self, optionStr):
+        self.model.setOptionValue("mip_rel_gap", float(optionStr))
+
+    def setPresolve(self, optionStr):
+        self.model.setOptionValue("presolve", "off" if optionStr == 0 else "choose")
+
+    def setThreads(self, optionStr):
+        self.model.setOptionValue("threads", int(optionStr))
+
+    def addBinaryColumns(self, objCoefs):
+        first = self.model.getNumCol()
+        numCols = len(objCoefs)
+        self.model.addCols(
+            numCols,
+            np.asarray(objCoefs, dtype=np.float64),
+            np.zeros(numCols),
+            np.ones(numCols),
+            0,
+            np.zeros(numCols, dtype=np.int32),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0),
+        )
+        self.model.changeColsIntegrality(
+            numCols,
+            np.arange(first, first + numCols, dtype=np.int32),
+            np.full(numCols, highspy.HighsVarType.kInteger),
+        )
+
+    def addRows(self, cstStrList, rhs, start, colIndices, coefs):
+        rowTypes = np.array([ROW_TYPES[cstStr] for cstStr in cstStrList])
+        rhs = np.asarray(rhs, dtype=np.float64)
+        lower = np.where(rowTypes == "L", -highspy.kHighsInf, rhs)
+        upper = np.where(rowTypes == "G", highspy.kHighsInf, rhs)
+        self.model.addRows(
+            len(rhs),
+            lower,
+            upper,
+            len(colIndices),
+            np.asarray(start[:-1], dtype=np.int32),
+            np.asarray(colIndices, dtype=np.int32),
+            np.asarray(coefs, dtype=np.float64),
+        )
+
+    def addNames(self, rowNames, colNames):
+        for row, name in enumerate(rowNames):
+            self.model.passRowName(row, name)
+        for col, name in enumerate(colNames):
+            self.model.passColName(col, name)
+
+    def write(self, fileNameStr):
+        self.model.writeModel(f"{fileNameStr}.lp")
+
+    def loadMIPSol(self, sol):
+        sol = np.asarray(sol, dtype=np.float64)
+        return self.model.setSolution(len(sol), np.arange(len(sol), dtype=np.int32), sol)
+
+    def mip_optimize(self, flags=""):
+        self.model.run()
+
+    def getSolution(self, var=None):
+        return list(self.model.getSolution().col_value)
+
+    def getObjectiveValue(self):
+        return self.model.getInfo().objective_function_value
+
+    def getStatus(self):
+        return self.model.modelStatusToString(self.model.getModelStatus())
+
+    def getAttribute(self, attrStr):
+        if attrStr == "COLS":
+            return self.model.getNumCol()
+        elif attrStr == "ROWS":
+            return self.model.getNumRow()
+        elif attrStr == "MIPOBJVAL":
+            return self.model.getInfo().objective_function_value
+        elif attrStr == "BESTBOUND":
+            return self.model.getInfo().mip_dual_bound
+
+
+# Solver backend of every SOLVER_BACKEND config value
+SOLVER_BACKENDS = {"xpress": XpressSolver, "highs": HighsSolver}
+
+
+def create_solver(backend: str, modelName: str, typeStr: str = "MINIMIZE") -> Solver:
+    """
+    Solver of a backend.
+
+    Args:
+        backend: Name of the backend in SOLVER_BACKENDS, e.g. xpress or highs.
+        modelName: Name of the model.
+        typeStr: MINIMIZE or MAXIMIZE.
+
+    Returns:
+        Solver: The solver of the backend.
+    """
+    if backend.lower() not in SOLVER_BACKENDS:
+        raise ValueError(
+            f"Unknown solver backend {backend}, expected one of {sorted(SOLVER_BACKENDS)}."
+        )
+    return SOLVER_BACKENDS[backend.lower()](modelName, typeStr)
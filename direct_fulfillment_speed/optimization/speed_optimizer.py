@@ -4,10 +4,9 @@ import logging
 import sys
 from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import DefaultDict, Dict, Optional, Set, Tuple, Union
+from typing import DefaultDict, Dict, List, Optional, Set, Tuple, Union
 
 import numpy as np
-import xpress
 
 from direct_fulfillment_speed.entities.nodes import (
     ODS,
@@ -18,23 +17,29 @@ from direct_fulfillment_speed.entities.nodes import (
 )
 from direct_fulfillment_speed.entities.shipment import ShipmentClass
 from direct_fulfillment_speed.optimization import solver
+from direct_fulfillment_speed.optimization.forecast_matrix import ForecastMatrix
+from direct_fulfillment_speed.optimization.lagrangian import (
+    as_greater_equal_rows,
+    repair_solution,
+    solve_multiple_choice_knapsack,
+)
+from direct_fulfillment_speed.optimization.model_data import ModelColumns, ModelRows
 from direct_fulfillment_speed.optimization.predict import Predict
+from direct_fulfillment_speed.optimization.presolve import non_dominated, on_lower_convex_hull
+from direct_fulfillment_speed.optimization.warm_start import (
+    read_previous_pads,
+    warm_start_choice,
+)
 from direct_fulfillment_speed.utils import util
 from direct_fulfillment_speed.utils.config import ConfigManager
 
-try:
-    import amazon_xpress_license
-    import xpress as xp
-except ImportError:
-    import xpress as xp
-
 # Set logger
 logger = logging.getLogger()
 
 
 @dataclass
 class ConstraintData:
-    lhs: float = 0.0
+    groups: List[int] = field(default_factory=list)
     total_shipments: float = 0.0
     shipment_types: Set[str] = field(default_factory=set)
 
@@ -47,20 +52,24 @@ class Optimize:
     ):
         """Class instances."""
         self.solution: Dict[
-            str, Union[float, Dict[Tuple[Union[ODS, Warehouse], str, str], float]]
+            str, Union[str, float, Dict[Tuple[Union[ODS, Warehouse], str, str], float]]
         ] = {}
         self.shipments_object = shipments_object
         self.predict_obj = predict_obj
         self.config = config
         self.epsilon: float = config.epsilon
 
-        # Model Decision Variables
-        self.odsDecisionVars: Dict[
-            Union[ODS, Warehouse], Dict[xpress.var, Tuple[float, float]]
-        ] = defaultdict(dict)
-        self.opt = solver.Solver(f"UPRM", "MINIMIZE")
-        self.selectedPad: Dict[Tuple[Union[ODS, Warehouse], str, str], xpress.var] = {}
+        # Model decision variables, as columns, and constraints, as rows
+        self.columns = ModelColumns()
+        self.rows = ModelRows()
+        # Rows coupling the entities: the DEA constraints
+        self.dea_rows: List[int] = []
+        self.entity_ship_counts = np.zeros(0, dtype=np.float64)
+        self.opt = solver.create_solver(config.solver_backend, "UPRM", "MINIMIZE")
+        self.selectedPad: Dict[Tuple[Union[ODS, Warehouse], str, str], int] = {}
         self.filtered_pads: Dict[Tuple[Union[ODS, Warehouse], str, str], float] = {}
+        # Number of candidate pads removed by the presolve, by reason
+        self.presolve_removed: Dict[str, int] = {"dominated": 0, "lp_dominated": 0}
 
         # Model configs
         self.min_network_dea = self.config.min_network_dea
@@ -75,9 +84,7 @@ class Optimize:
         self._build_dea_targets_cache()
 
         # Model Inputs
-        self.ods_prediction: Dict[
-            Union[ODS, Warehouse], Dict[float, float]
-        ] = self.predict_obj.get_forecasts
+        self.ods_prediction: ForecastMatrix = self.predict_obj.get_forecasts
 
         # Get the total number of shipments across all groups
         self.total_number_swa_shipments: int = (
@@ -101,13 +108,17 @@ class Optimize:
 
     def build(self):
         """
-        Define DVs, Objective and Constraints.
+        Define DVs, Objective and Constraints as arrays, and load them into the solver at once.
         """
-        logger.debug("Creating the decision variables...")
+        self.create_model()
+
+        logger.debug("Loading the model into the solver...")
+        self.load_model()
+
+    def create_model(self):
+        """Define DVs, Objective and Constraints as arrays."""
+        logger.debug("Creating the decision variables and the objective function...")
         self.create_decision_variables()
-        self.store_decision_variables()
-        logger.debug("Creating the objective function...")
-        self.create_objective_function()
 
         logger.debug("Creating the constraints...")
         self.select_only_one_pad_for_ods_const()
@@ -123,13 +134,10 @@ class Optimize:
             logger.info("A GL list is passed. Creating the GL-level constraints...")
             self.create_gl_level_constraints()
 
-        if self.config.print_lp_file:  # write the lp file
-            logger.debug("writing lp file.")
-            self.print_lp_file("./")
-
     def create_decision_variables(self):
         """
-        Create the Decision Variables for THIRD_PARTY and SWA groups.
+        Create the Decision Variables for THIRD_PARTY and SWA groups, with their objective
+        coefficients.
         Returns:
             None.
         """
@@ -139,6 +147,16 @@ class Optimize:
         # Process SWA group
         self._create_decision_variables(is_third_party=False)
 
+        self.columns.finalize()
+        logger.info(
+            f"Presolve removed {self.presolve_removed['dominated']} dominated and "
+            f"{self.presolve_removed['lp_dominated']} LP-dominated decision variables; "
+            f"{len(self.columns)} decision variables are left."
+        )
+        self.entity_ship_counts = np.array(
+            [entity.ship_count for entity in self.columns.entities], dtype=np.float64
+        )
+
     def _create_decision_variables(self, is_third_party):
         """
         Create Decision Variables for the given group.
@@ -152,7 +170,7 @@ class Optimize:
         entity_type = ODS if is_third_party else Warehouse
         min_pad = self.config.min_pad
 
-        for entity, possible_pads in self.ods_prediction.items():
+        for row, entity in enumerate(self.ods_prediction.entities):
             if not isinstance(entity, entity_type):
                 continue
 
@@ -178,7 +196,7 @@ class Optimize:
 
             self._set_up_decision_variable(
                 entity=entity,
-                possible_pads=possible_pads,
+                row=row,
                 min_pad=min_pad,
                 max_pad=max_pad,
                 is_third_party=is_third_party,
@@ -187,18 +205,20 @@ class Optimize:
     def _set_up_decision_variable(
         self,
         entity: Union[ODS, Warehouse],
-        possible_pads: Dict[float, float],
+        row: int,
         min_pad: float,
         max_pad: float,
         is_third_party: bool,
     ) -> None:
         """
-        Processes each entity to determine valid decision variables and creates them.
+        Processes each entity to determine valid decision variables and creates them, except
+        the ones removed by the presolve.
         If the entity's unpadded DEA exceeds a certain threshold, and there is no zero pad in the
         possible pads but there is a positive value, it adjusts the highest negative pad to zero.
         Args:
             entity: The ODS/Warehouse to process.
-            possible_pads (dict): Dictionary of quantiles and their corresponding pads.
+            row (int): Row of the entity in the forecast matrix, whose valid cells are its
+                quantiles and their corresponding pads.
             min_pad (float): Minimum pad value.
             max_pad (float): Maximum pad value.
             is_third_party (bool): Flag indicating if the entity is third-party.
@@ -206,7 +226,6 @@ class Optimize:
         Returns:
             None.
         """
-        has_valid_decision_variable = False
         unpadded_dea = entity.recent_unpadded_dea
         shipment_type = (
             entity.carrier.shipment_type.name if isinstance(entity, ODS) else ShipmentType.SWA.name
@@ -221,49 +240,81 @@ class Optimize:
             shipment_type=shipment_type, gl=primary_gl if self.gl_list else ""
         )
 
+        columns = np.flatnonzero(self.ods_prediction.valid[row])
+        pads = self.ods_prediction.values[row, columns]
+
         #  # Check if adjustment is needed (i.e., there's no zero pad and there's at least one positive pad)
-        if (
-            unpadded_dea >= min_dea_threshold
-            and 0 not in possible_pads.values()
-            and any(pad > 0 for pad in possible_pads.values())
-        ):
-            self._adjust_negative_pad_to_zero(possible_pads)
+        if unpadded_dea >= min_dea_threshold and not (pads == 0).any() and (pads > 0).any():
+            self._adjust_negative_pad_to_zero(pads)
+            self.ods_prediction.values[row, columns] = pads
             logger.info(f"Adjusted possible pads for {entity}.")
 
-        for quantile, pad in possible_pads.items():
-            if self._is_valid_pad(pad, unpadded_dea, min_dea_threshold, min_pad, max_pad):
-                has_valid_decision_variable = True
-                self._create_decision_var(entity, pad, quantile, is_third_party)
-
-        if not has_valid_decision_variable:
+        possible_pads = dict(
+            zip(
+                self.ods_prediction.quantiles[columns].tolist(),
+                pads.astype(np.float64).tolist(),
+            )
+        )
+        valid_pads = [
+            (quantile, pad)
+            for quantile, pad in possible_pads.items()
+            if self._is_valid_pad(pad, unpadded_dea, min_dea_threshold, min_pad, max_pad)
+        ]
+        if not valid_pads:
             self._create_default_decision_var(entity, possible_pads, max_pad, is_third_party)
+            return
+
+        for quantile, pad in self._presolve_pads(entity, valid_pads):
+            self._create_decision_var(entity, pad, quantile)
+
+    def _presolve_pads(
+        self, entity: Union[ODS, Warehouse], valid_pads: List[Tuple[float, float]]
+    ) -> List[Tuple[float, float]]:
+        """
+        Remove the dominated candidate pads of an entity and, if configured, the LP-dominated
+        ones. See presolve.py.
+
+        Args:
+            entity: The ODS/Warehouse of the candidates.
+            valid_pads: The (quantile, pad) candidates of the entity.
+
+        Returns:
+            List[Tuple[float, float]]: The (quantile, pad) candidates kept.
+        """
+        if not self.config.presolve_dominated_pads or len(valid_pads) < 2:
+            return valid_pads
+        quantiles = np.array([quantile for quantile, _ in valid_pads], dtype=np.float64)
+        costs = np.array(
+            [self._decision_var_objective(entity, pad) for _, pad in valid_pads], dtype=np.float64
+        )
+        keep = non_dominated(quantiles, costs)
+        self.presolve_removed["dominated"] += int(len(keep) - keep.sum())
+        if self.config.presolve_lp_dominated_pads:
+            kept = np.flatnonzero(keep)
+            on_hull = on_lower_convex_hull(quantiles[kept], costs[kept])
+            keep[kept[~on_hull]] = False
+            self.presolve_removed["lp_dominated"] += int(len(on_hull) - on_hull.sum())
+        return [valid_pads[index] for index in np.flatnonzero(keep).tolist()]
 
     @staticmethod
-    def _adjust_negative_pad_to_zero(possible_pads):
+    def _adjust_negative_pad_to_zero(pads: np.ndarray) -> None:
         """
         Adjusts the highest quantile associated with a negative pad to zero. This ensures that
         the optimizer has a neutral (zero) pad option close to the transition point between
         negative and positive pads.
 
         Args:
-            possible_pads (Dict[float, float]): Dictionary of quantiles and their corresponding pad values.
-                This represents the predicted pad values across different quantiles.
+            pads (np.ndarray): Predicted pad values of an entity by ascending quantile, as in
+                the forecast matrix.
 
         Returns:
-            None: The method modifies the `possible_pads` dictionary in place, setting the
-            highest negative pad value to zero.
+            None: The method modifies `pads` in place, setting the highest negative pad value
+            to zero.
         """
-        # Sort the pads by quantile
-        sorted_pads = sorted(possible_pads.items(), key=lambda x: x[0])
-
-        # Find the highest quantile with a negative pad
-        highest_negative_quantile = next(
-            (quantile for quantile, pad in reversed(sorted_pads) if pad < 0), None
-        )
-
-        # If we found a highest negative quantile, replace it with 0
-        if highest_negative_quantile is not None:
-            possible_pads[highest_negative_quantile] = 0.0
+        # Find the highest quantile with a negative pad and replace it with 0
+        negative = np.flatnonzero(pads < 0)
+        if len(negative):
+            pads[negative[-1]] = 0.0
 
     @staticmethod
     def _is_valid_pad(pad, unpadded_dea, neg_pad_dea_threshold, min_pad, max_pad):
@@ -290,21 +341,25 @@ class Optimize:
 
         return True
 
-    def _create_decision_var(self, entity, pad, quantile, is_third_party):
+    def _create_decision_var(self, entity, pad, quantile):
         """
-        Creates a decision variable for an entity.
+        Creates a decision variable for an entity, as a column with its objective coefficient:
+        the pad cost weighted by the shipment percentage of the entity, plus its recent
+        performance adjustment.
 
         Parameters:
         entity: The ODS/Warehouse for which to create the decision variable.
         pad (float): The pad value.
         quantile (float): The quantile value.
-        is_third_party (bool): Flag indicating if the entity is third-party carrier.
         """
-        decision_var_name, key_tuple, decision_var = self._create_decision_var_and_key_tuple(
-            entity, pad, quantile, is_third_party
-        )
-        self.selectedPad[key_tuple] = decision_var
-        self.odsDecisionVars[entity][decision_var] = (quantile, pad)
+        key_tuple = self._decision_var_key_tuple(entity, pad, quantile)
+        objective = self._decision_var_objective(entity, pad)
+        self.selectedPad[key_tuple] = self.columns.add(entity, pad, quantile, objective)
+
+    def _decision_var_objective(self, entity, pad) -> float:
+        """Objective coefficient of a decision variable of an entity with a pad."""
+        weight = self.cumulative_shipment_percentages.get(entity, 0)
+        return weight * self._pad_cost(pad) + self.recent_performance_adjustment(pad, entity)
 
     def _create_default_decision_var(self, entity, possible_pads, max_pad, is_third_party):
         """
@@ -326,44 +381,57 @@ class Optimize:
         if positive_pads:
             closest_quantile = min(positive_pads, key=lambda q: abs(positive_pads[q] - max_pad))
             closest_pad = positive_pads[closest_quantile]
-            self._create_decision_var(entity, closest_pad, closest_quantile, is_third_party)
+            self._create_decision_var(entity, closest_pad, closest_quantile)
         else:
-            self._create_decision_var(entity, 0, 100, is_third_party)
+            self._create_decision_var(entity, 0, 100)
 
     @staticmethod
-    def _create_decision_var_and_key_tuple(entity, pad, quantile, is_third_party):
+    def _decision_var_key_tuple(entity, pad, quantile):
         """
-        Helper method to create decision variable name and key tuple.
+        Helper method to create the key tuple of a decision variable.
 
         Parameters:
         entity: The ODS/Warehouse to process.
         pad (float): The pad value.
         quantile (float): The quantile value.
-        is_third_party (bool): Flag indicating if the entity is third-party carrier.
 
         Returns:
-        tuple: The decision variable name, key tuple, and decision variable.
+        tuple: The entity, pad string and quantile string.
         """
         pad_str = f"N{abs(pad):.2f}" if pad < 0 else f"{pad:.2f}"
         quant_str = f"{int(quantile)}"
-        if is_third_party:
-            decision_var_name = f"{entity}_{pad_str.replace('.', 'p')}_{quant_str}"
-        else:
-            decision_var_name = f"SWA_{entity}_PAD_{pad_str.replace('.', 'p')}_QUAN{quant_str}"
-        key_tuple = (
-            entity,
-            pad_str,
-            quant_str,
-        )
+        return entity, pad_str, quant_str
+
+    @classmethod
+    def _decision_var_name(cls, entity, pad, quantile):
+        """
+        Helper method to create the name of a decision variable, only needed to write the model.
+
+        Parameters:
+        entity: The ODS/Warehouse to process.
+        pad (float): The pad value.
+        quantile (float): The quantile value.
 
-        decision_var = xp.var(vartype=xp.binary, name=decision_var_name)
-        return decision_var_name, key_tuple, decision_var
+        Returns:
+        str: The decision variable name.
+        """
+        _, pad_str, quant_str = cls._decision_var_key_tuple(entity, pad, quantile)
+        if isinstance(entity, ODS):
+            return f"{entity}_{pad_str.replace('.', 'p')}_{quant_str}"
+        return f"SWA_{entity}_PAD_{pad_str.replace('.', 'p')}_QUAN{quant_str}"
 
-    def store_decision_variables(self):
+    def load_model(self):
         """
-        Store decision variables in the solver.
+        Load the decision variables, the objective function and the constraints into the solver
+        in bulk.
         """
-        self.opt.addVariable(self.selectedPad)
+        self.opt.addBinaryColumns(self.columns.objective)
+        start, column_indices, coefficients = self.rows.to_csr()
+        self.opt.addRows(self.rows.senses, self.rows.rhs, start, column_indices, coefficients)
+
+        if self.config.print_lp_file:  # write the lp file
+            logger.debug("writing lp file.")
+            self.print_lp_file("./")
 
     def recent_performance_adjustment(self, pad, entity):
         """
@@ -411,29 +479,6 @@ class Optimize:
 
         return 0.0
 
-    def create_objective_function(self) -> None:
-        """
-        Create the objective function for the optimization problem.
-        Returns:
-            None.
-        """
-        total_pads = self._calculate_total_pads()
-        total_dea_adjustment = self._calculate_total_dea_adjustment()
-        self.opt.addObjective(total_pads + total_dea_adjustment)
-
-    def _calculate_total_pads(self) -> xp.Sum:
-        """
-        Calculate the total pad cost for the objective function.
-
-        Returns:
-            xp.Sum: The total pad cost.
-        """
-        return xp.Sum(
-            self.cumulative_shipment_percentages.get(key, 0) * dv * self._pad_cost(pad)
-            for key, dv_quantile_pad_dict in self.odsDecisionVars.items()
-            for dv, (quantile, pad) in dv_quantile_pad_dict.items()
-        )
-
     def _pad_cost(self, pad: float) -> float:
         """
         Calculate the cost of a pad value.
@@ -446,39 +491,29 @@ class Optimize:
         """
         return self.epsilon * pad if pad < 0 else pad
 
-    def _calculate_total_dea_adjustment(self) -> xp.Sum:
-        """
-        Calculate the total DEA adjustment for the objective function.
-
-        Returns:
-            xp.Sum: The total DEA adjustment.
-        """
-        return xp.Sum(
-            dv * self.recent_performance_adjustment(pad, key)
-            for key, dv_quantile_pad_dict in self.odsDecisionVars.items()
-            for dv, (quantile, pad) in dv_quantile_pad_dict.items()
-        )
-
     def add_usdf_constraint(self):
         """
         Add the USDF DEA constraint to the optimization problem.
         Returns:
             None.
         """
-        usdf_dea_constraint_lhs = 0
-
-        for key, dv_quantile_pad_dict in self.odsDecisionVars.items():
-            for decision_var, (quantile, pad) in dv_quantile_pad_dict.items():
-                probability = quantile / 100.0
-                weight = self.cumulative_shipment_percentages.get(key, 0) / 100
-                usdf_dea_constraint_lhs += weight * probability * decision_var
+        weights = np.array(
+            [
+                self.cumulative_shipment_percentages.get(entity, 0) / 100
+                for entity in self.columns.entities
+            ],
+            dtype=np.float64,
+        )
+        probabilities = self.columns.quantiles / 100.0
 
-        self.opt.addConstraint(
+        row = self.rows.add(
             "DEA_Constraint_USDF",
             "GREATER_EQUAL",
-            usdf_dea_constraint_lhs,
+            np.arange(len(self.columns)),
+            weights[self.columns.group] * probabilities,
             self.min_network_dea,
         )
+        self.dea_rows.append(row)
 
     def create_gl_level_constraints(self) -> None:
         """
@@ -490,37 +525,39 @@ class Optimize:
             logger.info("No GL list provided in the configuration. Skipping GL-level constraints.")
             return
 
-        entity_data = self._precompute_entity_data()
-
         combined_constraints: Dict[Tuple[str, float], ConstraintData] = defaultdict(ConstraintData)
 
-        for entity, (
-            gl,
-            weight,
-            shipment_type,
-            target_dea,
-            precomputed_terms,
-        ) in entity_data.items():
+        for group, entity in enumerate(self.columns.entities):
+            if not self._is_entity_valid_gl_group(entity):
+                continue
+            gl = (
+                entity.origin.vendor.vendor_primary_gl
+                if isinstance(entity, ODS)
+                else entity.vendor.vendor_primary_gl
+            )
+            shipment_type = self._get_shipment_type(entity)
+            target_dea = self._get_target_dea(shipment_type=shipment_type, gl=gl)
             if target_dea is None:
                 logger.error(f"No DEA target found for {shipment_type} and GL {gl}")
                 continue
 
             key = (gl, target_dea)
             constraint_data = combined_constraints[key]
-            constraint_data.total_shipments += weight
+            constraint_data.groups.append(group)
+            constraint_data.total_shipments += entity.ship_count
             constraint_data.shipment_types.add(shipment_type)
-            constraint_data.lhs += np.sum(precomputed_terms[:, 0])
 
         for (gl, target_dea), data in combined_constraints.items():
             if data.total_shipments > 0:
-                normalized_lhs = data.lhs / data.total_shipments
                 shipment_types_str = "_".join(sorted(data.shipment_types))
                 if len(data.shipment_types) > 1:
                     constraint_name = f"GL_DEA_Constraint_{gl}_Merged_{shipment_types_str}"
                 else:
                     constraint_name = f"GL_DEA_Constraint_{gl}_{shipment_types_str}"
 
-                self.opt.addConstraint(constraint_name, "GREATER_EQUAL", normalized_lhs, target_dea)
+                self._add_normalized_dea_row(
+                    constraint_name, data.groups, data.total_shipments, target_dea
+                )
                 logger.info(f"Added constraint: {constraint_name} with target DEA {target_dea:.2f}")
             else:
                 logger.warning(
@@ -565,45 +602,6 @@ class Optimize:
                     min_dea = getattr(self.config, config_attr, 0.0)
                     self.dea_targets_cache[(shipment_type, gl)] = min_dea
 
-    def _precompute_entity_data(self):
-        """
-        Precompute entity data for GL-level constraints.
-
-        Returns:
-            dict: Precomputed entity data.
-        """
-        entity_data = {}
-
-        for entity, decision_vars in self.odsDecisionVars.items():
-            if self._is_entity_valid_gl_group(entity):
-                primary_gl = (
-                    entity.origin.vendor.vendor_primary_gl
-                    if isinstance(entity, ODS)
-                    else entity.vendor.vendor_primary_gl
-                )
-                weight = entity.ship_count
-                shipment_type = (
-                    entity.carrier.shipment_type.name
-                    if isinstance(entity, ODS)
-                    else ShipmentType.SWA.name
-                )
-                target_dea = self._get_target_dea(shipment_type=shipment_type, gl=primary_gl)
-                precomputed_terms = np.array(
-                    [
-                        (weight * (quantile / 100.0) * decision_var, pad)
-                        for decision_var, (quantile, pad) in decision_vars.items()
-                    ]
-                )
-                entity_data[entity] = (
-                    primary_gl,
-                    weight,
-                    shipment_type,
-                    target_dea,
-                    precomputed_terms,
-                )
-
-        return entity_data
-
     def _is_entity_valid_gl_group(self, entity) -> bool:
         """
         Check if the entity is valid for GL-level constraints.
@@ -635,33 +633,37 @@ class Optimize:
             logger.error("Attempted to add DEA constraint with zero total shipments.")
             return
 
-        dea_constraint_lhs = 0
-        constraint_terms = []
-
-        for entity, decision_vars in self.odsDecisionVars.items():
-            if name_suffix == ShippingCarrier.SWA.name and isinstance(entity, Warehouse):
-                weight = entity.ship_count
-                for decision_var, (quantile, pad) in decision_vars.items():
-                    probability = quantile / 100.0
-                    term = weight * probability * decision_var
-                    constraint_terms.append(term)
-                    dea_constraint_lhs += term
-            elif isinstance(entity, ODS) and entity.carrier.shipment_type.name == name_suffix:
-                weight = entity.ship_count
-                for decision_var, (quantile, pad) in decision_vars.items():
-                    probability = quantile / 100.0
-                    term = weight * probability * decision_var
-                    constraint_terms.append(term)
-                    dea_constraint_lhs += term
-
-        if constraint_terms:
-            normalized_lhs = dea_constraint_lhs / total_shipments
-            self.opt.addConstraint(
-                f"DEA_Constraint_{name_suffix}", "GREATER_EQUAL", normalized_lhs, min_dea
+        groups = [
+            group
+            for group, entity in enumerate(self.columns.entities)
+            if self._get_shipment_type(entity) == name_suffix
+        ]
+        if groups:
+            self._add_normalized_dea_row(
+                f"DEA_Constraint_{name_suffix}", groups, total_shipments, min_dea
             )
         else:
             logger.warning(f"No positive DEA contribution for {name_suffix}. Constraint not added.")
 
+    def _add_normalized_dea_row(self, name, groups, total_shipments, min_dea):
+        """
+        Add a DEA row over the columns of some entities: the DEA of every column is its quantile,
+        weighted by the shipments of its entity and normalized by the total shipments.
+
+        Args:
+            name (str): The constraint name.
+            groups (List[int]): Index of every entity of the row in the model columns.
+            total_shipments (float): The total number of shipments to normalize by.
+            min_dea (float): The minimum DEA value.
+        """
+        in_row = np.zeros(len(self.columns.entities), dtype=bool)
+        in_row[groups] = True
+        columns = self.columns.entity_mask(in_row)
+        weights = self.entity_ship_counts[self.columns.group[columns]]
+        probabilities = self.columns.quantiles[columns] / 100.0
+        coefficients = weights * probabilities * (1 / total_shipments)
+        self.dea_rows.append(self.rows.add(name, "GREATER_EQUAL", columns, coefficients, min_dea))
+
     def create_dea_constraints(self) -> None:
         """
         Create a DEA for third-part or 1P DEAs.
@@ -685,24 +687,15 @@ class Optimize:
         Returns:
 
         """
-        for key in self.odsDecisionVars.keys():
-            if isinstance(key, ODS):
-                constraint_name = f"SelectOnePad_ODS_{key}"
-                relevant_decision_vars = [dv for dv, _ in self.odsDecisionVars[key].items()]
-            elif isinstance(key, Warehouse):
-                constraint_name = f"SelectOnePad_SWA_{key.warehouse_id}"
-                relevant_decision_vars = [dv for dv, _ in self.odsDecisionVars[key].items()]
-            else:
-                logger.warning(f"Unexpected key type: {type(key)}")
-                continue
+        entities = self.columns.entities
 
-            if relevant_decision_vars:
-                self.opt.addConstraint(
-                    constraint_name,
-                    "EQUAL",
-                    xp.Sum(relevant_decision_vars),
-                    1,
-                )
+        def constraint_name(group: int) -> str:
+            entity = entities[group]
+            if isinstance(entity, ODS):
+                return f"SelectOnePad_ODS_{entity}"
+            return f"SelectOnePad_SWA_{entity.warehouse_id}"
+
+        self.rows.add_blocks(constraint_name, "EQUAL", self.columns.group_starts, 1.0, 1)
 
     def extract_solutions(self):
         """
@@ -711,13 +704,87 @@ class Optimize:
         Returns:
             dict: The optimization solution.
         """
+        column_values = self.opt.getSolution()
         self.solution = {
             "optimization_status": self.opt.getStatus(),
             "objective_value": self.opt.getObjectiveValue(),
-            "selected_pads": self.opt.getSolution(self.selectedPad),
+            "selected_pads": {
+                key: float(column_values[column]) for key, column in self.selectedPad.items()
+            },
         }
         return self.solution
 
+    def solve_lagrangian(self) -> bool:
+        """
+        Solve the model by Lagrangian relaxation of its DEA rows: with one pad per entity as the
+        only other constraint, it is a multiple-choice knapsack. See lagrangian.py.
+
+        Returns:
+            bool: Whether a solution within the configured gap of the optimum was found, in
+            which case it is the solution of the model.
+        """
+        gap_tolerance = self.config.lagrangian_gap_tolerance
+        coefficients, rhs = self._dea_rows_greater_equal()
+        result = solve_multiple_choice_knapsack(
+            self.columns.group_starts, self.columns.objective, coefficients, rhs, gap_tolerance
+        )
+        if result.gap > gap_tolerance:
+            logger.warning(
+                f"The Lagrangian solution is not within {gap_tolerance:.4%} of the optimum "
+                f"(gap {result.gap:.4%}). Solving the MIP instead."
+            )
+            return False
+
+        selected = np.zeros(len(self.columns), dtype=bool)
+        selected[result.choice] = True
+        self.solution = {
+            "optimization_status": "lagrangian_feasible",
+            "objective_value": result.objective,
+            "optimality_gap": result.gap,
+            "selected_pads": {
+                key: float(selected[column]) for key, column in self.selectedPad.items()
+            },
+        }
+        return True
+
+    def _dea_rows_greater_equal(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The dense coefficients and right-hand sides of the DEA rows, as greater-or-equal rows."""
+        return as_greater_equal_rows(
+            self.rows.dense(self.dea_rows, len(self.columns)),
+            [self.rows.senses[row] for row in self.dea_rows],
+            [self.rows.rhs[row] for row in self.dea_rows],
+        )
+
+    def load_warm_start(self) -> None:
+        """
+        Load the pads selected by the previous run as the starting incumbent of the MIP: every
+        entity starts from its candidate pad closest to the previous one, and the violated DEA
+        rows are repaired greedily.
+        """
+        path = self.config.warm_start_path
+        previous_pads = read_previous_pads(path)
+        if not previous_pads:
+            logger.warning(f"No previous pads found in {path}. The MIP starts without incumbent.")
+            return
+
+        start_choice, num_matched = warm_start_choice(self.columns, previous_pads)
+        coefficients, rhs = self._dea_rows_greater_equal()
+        choice = repair_solution(
+            self.columns.group_starts, self.columns.objective, coefficients, rhs, start_choice
+        )
+        if choice is None:
+            logger.warning("The previous pads could not be repaired into a feasible warm start.")
+            return
+
+        values = np.zeros(len(self.columns), dtype=np.float64)
+        values[choice] = 1.0
+        self.opt.loadMIPSol(values)
+        logger.info(
+            f"Warm start from the previous pads of {num_matched} of {len(choice)} entities, "
+            f"{int((choice != start_choice).sum())} changed by the repair: objective "
+            f"{self.columns.objective[choice].sum():.6f}."
+        )
+
     def filter_selected_pads(self, selected_pads):
         """
         Filter only the selected decision variables i.e., the selected pads.
@@ -812,17 +879,19 @@ class Optimize:
             if primary_gl:
                 keys_to_check.append((shipment_type, primary_gl))
 
-            # Retrieve shipments for the entity
+            # Sum of c2p_unpadded + pad over the shipments of the entity
             shipments = self.shipments_object.get_shipments_for_entity(entity)
+            if not shipments:
+                continue
+            entity_speed = float(np.sum(shipments.column("c2p_days_unpadded"))) + pad * len(
+                shipments
+            )
 
-            for shipment in shipments:
-                speed = shipment.c2p_days_unpadded + pad
-
-                for a_key in keys_to_check:
-                    min_dea = self.dea_targets_cache.get(a_key, 0.0)
-                    if min_dea > 0.0:
-                        total_speed[a_key] += speed
-                        total_shipments[a_key] += 1
+            for a_key in keys_to_check:
+                min_dea = self.dea_targets_cache.get(a_key, 0.0)
+                if min_dea > 0.0:
+                    total_speed[a_key] += entity_speed
+                    total_shipments[a_key] += len(shipments)
 
         # Calculate average speeds
         average_speed: Dict[Tuple[str, Optional[str]], float] = {}
@@ -838,7 +907,17 @@ class Optimize:
         return average_speed
 
     def print_lp_file(self, output_path):
-        """This will print the lp file of the model."""
+        """This will print the lp file of the model, after naming its rows and columns."""
+        entities = self.columns.entities
+        column_names = [
+            self._decision_var_name(entities[group], pad, quantile)
+            for group, pad, quantile in zip(
+                self.columns.group.tolist(),
+                self.columns.pads.tolist(),
+                self.columns.quantiles.tolist(),
+            )
+        ]
+        self.opt.addNames(self.rows.row_names(), column_names)
         self.opt.write(output_path + util.date_now())
 
     def solve(self):
@@ -852,14 +931,20 @@ class Optimize:
             self.set_controls()
 
             logger.info(f"Building the model ...")
-            self.build()
+            self.create_model()
             logger.info(f"Building the model is done.")
 
-            logger.info(f"Optimizing ...")
-            self.opt.mip_optimize()
-
-            solution = self.extract_solutions()
-            self.filter_selected_pads(solution["selected_pads"])
+            if self.config.solver_mode == "lagrangian" and self.solve_lagrangian():
+                logger.info(f"Lagrangian solve is done.")
+            else:
+                self.load_model()
+                if self.config.warm_start_path:
+                    self.load_warm_start()
+                logger.info(f"Optimizing ...")
+                self.opt.mip_optimize()
+                self.extract_solutions()
+
+            self.filter_selected_pads(self.solution["selected_pads"])
             logger.info(f"Extracting the solution is done.")
 
         except IOError:
@@ -868,11 +953,11 @@ class Optimize:
 
     def set_controls(self):
         """
-        Set all the algorithm controls in XPRESS.
+        Set all the algorithm controls of the solver backend.
         Returns:
             None.
         """
-        self.opt.setControl("maxtime", -self.config.xpress_max_solve)
-        self.opt.setControl("outputlog", self.config.xpress_outputflag)
-        self.opt.setControl("miprelstop", self.config.integrality_gap_percentage)
-        self.opt.setControl("mippresolve", self.config.xpress_presolve)
+        self.opt.setMaxTime(self.config.xpress_max_solve)
+        self.opt.setOutputFlag(self.config.xpress_outputflag)
+        self.opt.setMIPGap(self.config.integrality_gap_percentage)
+        self.opt.setPresolve(self.config.xpress_presolve)
@@ -0,0 +1,111 @@
+"""
+Warm start of the optimization model from the pads selected by the previous run.
+
+The previous run's pads are read from its TTpad and UTTpad outputs, local or on S3, which
+identify an entity by its warehouse, destination zip3 and ship method. Every entity of the
+current model starts from the candidate pad closest to its previous one.
+"""
+
+import csv
+import glob
+import logging
+import os
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import s3fs
+
+from direct_fulfillment_speed.entities.nodes import ODS, Warehouse
+from direct_fulfillment_speed.optimization.model_data import ModelColumns
+
+logger = logging.getLogger()
+
+# Output files of the selected pads, and the destination and ship method of an SWA entity in
+# them, as written by ProcessOutputs
+PAD_OUTPUT_PREFIXES = ("TTpad", "UTTpad")
+SWA_DESTINATION = "SWA_DEST"
+SWA_SHIP_METHOD = "SWA"
+
+
+def entity_output_key(entity: Union[ODS, Warehouse]) -> Tuple[str, str, str]:
+    """The (warehouse, destination zip3, ship method) of an entity in the pad outputs."""
+    if isinstance(entity, ODS):
+        return str(entity.origin.warehouse_id), str(entity.dest.dest_zip3), str(entity.ship_method)
+    return str(entity.warehouse_id), SWA_DESTINATION, SWA_SHIP_METHOD
+
+
+def latest_output_file(folder: str, file_prefix: str) -> Optional[str]:
+    """
+    The latest output file of a prefix in a local or S3 folder. Output file names end with
+    their creation time, so the latest one is the last by name.
+    """
+    pattern = f"{file_prefix}_*.csv"
+    if folder.startswith("s3://"):
+        found = [
+            f"s3://{path}"
+            for path in s3fs.S3FileSystem().glob(f"{folder[len('s3://'):].rstrip('/')}/{pattern}")
+        ]
+    else:
+        found = glob.glob(os.path.join(folder, pattern))
+    return max(found) if found else None
+
+
+def read_previous_pads(folder: str) -> Dict[Tuple[str, str, str], float]:
+    """
+    The pads, in days, selected by the previous run for every (warehouse, destination zip3, ship
+    method), from its latest TTpad and UTTpad outputs in a folder. Missing or unreadable outputs
+    are ignored.
+
+    Args:
+        folder: Local or s3:// folder of the outputs of the previous run.
+
+    Returns:
+        Dict[Tuple[str, str, str], float]: The previous pad of every entity key.
+    """
+    previous_pads: Dict[Tuple[str, str, str], float] = {}
+    for file_prefix in PAD_OUTPUT_PREFIXES:
+        try:
+            path = latest_output_file(folder, file_prefix)
+            if path is None:
+                logger.info(f"No previous {file_prefix} output in {folder}.")
+                continue
+            opener = s3fs.S3FileSystem().open if path.startswith("s3://") else open
+            with opener(path, "r") as file:
+                for row in csv.DictReader(file):
+                    key = (row["Warehouse"], row["Destination ZIP"], row["Ship Method"])
+                    previous_pads[key] = float(row["TT Pad Value(hour)"]) / 24
+            logger.info(f"Read the previous pads of {file_prefix} from {path}.")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable previous {file_prefix} output in {folder}: {e}")
+    return previous_pads
+
+
+def warm_start_choice(
+    columns: ModelColumns, previous_pads: Dict[Tuple[str, str, str], float]
+) -> Tuple[np.ndarray, int]:
+    """
+    Column chosen by every entity to start from: the column of the pad closest to its previous
+    pad, the higher pad on a tie, or its column of least objective without a previous pad.
+
+    Args:
+        columns: The finalized model columns.
+        previous_pads: The previous pad of every entity key, see read_previous_pads.
+
+    Returns:
+        Tuple[np.ndarray, int]: The column of every entity, and the number of entities with a
+        previous pad.
+    """
+    starts = columns.group_starts
+    choice = np.empty(len(columns.entities), dtype=np.int64)
+    num_matched = 0
+    for group, entity in enumerate(columns.entities):
+        first, last = starts[group], starts[group + 1]
+        previous_pad = previous_pads.get(entity_output_key(entity))
+        if previous_pad is None:
+            choice[group] = first + int(np.argmin(columns.objective[first:last]))
+            continue
+        num_matched += 1
+        distances = np.abs(columns.pads[first:last] - previous_pad)
+        closest = np.flatnonzero(distances <= distances.min() + 1e-9)
+        choice[group] = first + closest[np.argmax(columns.pads[first:last][closest])]
+    return choice, num_matched
@@ -0,0 +1,171 @@
+"""Time decay weights and weighted quantiles of many entities at once, as segmented operations."""
+
+import logging
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger()
+
+SECONDS_PER_DAY = 86400
+
+
+def segment_starts(lengths: np.ndarray) -> np.ndarray:
+    """Offset of the first element of every segment of a flat array, given their lengths."""
+    return np.cumsum(lengths) - lengths
+
+
+def segmented_cumsum(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Cumulative sums restarting at every segment of a flat array. The segments of each length are
+    summed together as the rows of one matrix, so every sum adds the same terms in the same
+    order as np.cumsum of its segment alone.
+    """
+    starts = segment_starts(lengths)
+    result = np.empty(len(values), dtype=np.float64)
+    by_length = np.argsort(lengths, kind="stable")
+    sorted_lengths = lengths[by_length]
+    boundaries = np.flatnonzero(np.diff(sorted_lengths)) + 1
+    for group in np.split(by_length, boundaries):
+        if not len(group):
+            continue
+        index = starts[group][:, None] + np.arange(lengths[group[0]])
+        result[index] = np.cumsum(values[index], axis=1)
+    return result
+
+
+def decay_weight_table(max_days: int, lambda_decay: float) -> np.ndarray:
+    """
+    Time decay weight lambda * (1 - lambda) ** sqrt(d) of every day difference d from 0 to
+    ``max_days``, so the weights of shipments are gathered from their day differences instead
+    of raising to a power per shipment. The table holds the same values as computing the weight
+    of every shipment.
+    """
+    return lambda_decay * ((1 - lambda_decay) ** np.sqrt(np.arange(max_days + 1)))
+
+
+def day_offsets(timestamps: np.ndarray, most_recent: np.ndarray, ticks_per_day: int) -> np.ndarray:
+    """
+    Whole days between integer timestamps and the most recent timestamp of their entity, like
+    the ``days`` of a datetime difference, as int32.
+    """
+    return ((most_recent - timestamps) // ticks_per_day).astype(np.int32)
+
+
+def segmented_time_decay_weights(
+    segments: np.ndarray,
+    lengths: np.ndarray,
+    order_dates: np.ndarray,
+    lambda_decay: float,
+) -> np.ndarray:
+    """
+    Time decay weights of every segment, like Predict.calculate_time_decay_weights for each of
+    them: a shipment ordered d days before the most recent one of its segment weighs
+    lambda * (1 - lambda) ** sqrt(d), and the weights of a segment sum to 1.
+
+    Args:
+        segments: Segment of every element; the elements of a segment are contiguous.
+        lengths: Number of elements of every segment, all positive.
+        order_dates: datetime64 order date of every element.
+        lambda_decay: Decay factor for time-based weighting.
+
+    Returns:
+        The normalized weight of every element.
+    """
+    seconds = np.asarray(order_dates).astype("datetime64[s]").astype(np.int64)
+    starts = segment_starts(lengths)
+    most_recent = np.maximum.reduceat(seconds, starts)
+    days = day_offsets(seconds, most_recent[segments], SECONDS_PER_DAY)
+    weights = decay_weight_table(int(days.max()), lambda_decay)[days]
+
+    totals = np.add.reduceat(weights, starts)
+    no_weight = totals == 0
+    if no_weight.any():
+        weights[no_weight[segments]] = 1.0
+        totals[no_weight] = lengths[no_weight]
+    return weights / totals[segments]
+
+
+def segmented_weighted_quantiles(
+    segments: np.ndarray,
+    lengths: np.ndarray,
+    values: np.ndarray,
+    weights: np.ndarray,
+    quantiles: np.ndarray,
+) -> np.ndarray:
+    """
+    Weighted quantiles of every segment, with the weighted rank method of
+    Predict.adjust_quantiles: the quantile q of a segment is its smallest value whose normalized
+    cumulative weight reaches q.
+
+    All the (segment, value) pairs are sorted once, the cumulative weights are accumulated per
+    segment with segmented_cumsum, and the rank of every quantile in every segment is counted
+    with one bincount, so the number of calls does not depend on the number of segments.
+
+    Args:
+        segments: Segment of every element; the elements of a segment are contiguous.
+        lengths: Number of elements of every segment, all positive.
+        values: Value of every element.
+        weights: Weight of every element.
+        quantiles: Quantiles as proportions in [0, 1].
+
+    Returns:
+        A (segments x quantiles) matrix of the quantile values, in the order of ``quantiles``.
+    """
+    num_segments = len(lengths)
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+
+    # Sort by value within every segment; the segments keep their order
+    order = np.lexsort((values, segments))
+    values_sorted = np.asarray(values, dtype=np.float64)[order]
+    cumulative_weights = segmented_cumsum(np.asarray(weights, dtype=np.float64)[order], lengths)
+    stops = np.cumsum(lengths)
+    normalized_weights = cumulative_weights / cumulative_weights[stops - 1][segments]
+
+    # The rank of quantile q in a segment is the number of its elements whose normalized weight
+    # is below q. An element counts for the quantiles above its weight, i.e. from the
+    # searchsorted position of the weight among the sorted quantiles on.
+    quantile_order = np.argsort(quantiles, kind="stable")
+    num_quantiles = len(quantiles)
+    first_quantile = np.searchsorted(quantiles[quantile_order], normalized_weights, side="right")
+    ranks = np.cumsum(
+        np.bincount(
+            segments * (num_quantiles + 1) + first_quantile,
+            minlength=num_segments * (num_quantiles + 1),
+        ).reshape(num_segments, num_quantiles + 1)[:, :num_quantiles],
+        axis=1,
+    )
+    # A quantile beyond the total weight takes the largest value of the segment
+    ranks = np.minimum(ranks, (lengths - 1)[:, None])
+
+    quantile_values = np.empty((num_segments, num_quantiles), dtype=np.float64)
+    quantile_values[:, quantile_order] = values_sorted[(stops - lengths)[:, None] + ranks]
+    return quantile_values
+
+
+def forecast_quantiles(
+    lengths: np.ndarray,
+    order_dates: np.ndarray,
+    values: np.ndarray,
+    quantiles: np.ndarray,
+    lambda_decay: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Time-decay weighted quantiles of consecutive segments of shipments.
+
+    Args:
+        lengths: Number of shipments of every segment, all positive.
+        order_dates: datetime64 order date of every shipment, none of them NaT.
+        values: Value of every shipment.
+        quantiles: Quantiles as proportions in [0, 1].
+        lambda_decay: Decay factor for time-based weighting.
+
+    Returns:
+        The (segments x quantiles) matrix of quantile values and whether any value of every
+        segment is 0.
+    """
+    segments = np.repeat(np.arange(len(lengths)), lengths)
+    weights = segmented_time_decay_weights(segments, lengths, order_dates, lambda_decay)
+    quantile_matrix = segmented_weighted_quantiles(segments, lengths, values, weights, quantiles)
+    has_zero = np.bincount(segments, weights=values == 0, minlength=len(lengths)) > 0
+    return quantile_matrix, has_zero
@@ -3,9 +3,14 @@ import io
 import json
 import logging
 import os
-from typing import Dict, List, Tuple, Union
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 from direct_fulfillment_speed.entities.nodes import ODS, Warehouse
+from direct_fulfillment_speed.entities.shipment_metrics import window_label
+from direct_fulfillment_speed.inputs.validation import RejectionReport
+from direct_fulfillment_speed.optimization.forecast_matrix import ForecastMatrix
 from direct_fulfillment_speed.optimization.predict import Predict
 from direct_fulfillment_speed.optimization.speed_optimizer import Optimize
 from direct_fulfillment_speed.utils import util
@@ -14,11 +19,26 @@ from direct_fulfillment_speed.utils.s3 import upload_s3_file, write_s3_json
 
 logger = logging.getLogger()
 
+# Columns exported for every metric window, after "<window> Ship Count"
+WINDOW_METRICS_COLUMNS = (
+    "Avg. Unpadded C2P (days)",
+    "Avg. C2P (days)",
+    "Avg. C2D (days)",
+    "Unpadded DEA",
+    "DEA",
+)
+
 
 class ProcessOutputs:
     """Process the results and prepare outputs."""
 
-    def __init__(self, config: ConfigManager, prediction: Predict, prob: Optimize):
+    def __init__(
+        self,
+        config: ConfigManager,
+        prediction: Predict,
+        prob: Optimize,
+        rejection_report: Optional[RejectionReport] = None,
+    ):
         self.prob: Optimize = prob
         self.config = config
         self.s3_output_folder: str = config.s3_output_folder
@@ -30,10 +50,16 @@ class ProcessOutputs:
         logger.info("Getting the met DEAs from the solution.")
         self.dea_constraints_lhs = self.prob.get_dea_constraints_lhs
         logger.info("Writing the output data.")
-        tt_pad_data, utt_pad_data = self.segregate_data(self.prob.filtered_pads)
+        window_labels = [window_label(days) for days in config.metric_window_days]
+        tt_pad_data, utt_pad_data = self.segregate_data(self.prob.filtered_pads, window_labels)
         self.save_data(tt_pad_data, "TTpad")
         self.save_data(utt_pad_data, "UTTpad")
-        self.save_metadata(self.prob.solution)
+        self.save_metadata(
+            self.prob.solution,
+            prediction.forecast_cache.statistics if prediction.forecast_cache else None,
+        )
+        if rejection_report is not None:
+            self.save_rejection_report(rejection_report)
         self.save_forecast_data(forecast_data=prediction.forecasts)
 
     def save_data(self, data: List[Dict], file_prefix: str):
@@ -60,11 +86,40 @@ class ProcessOutputs:
                 logger.info(f"Uploaded {filename} to {s3_path}")
 
     @staticmethod
-    def segregate_data(selected_pads) -> Tuple[List[Dict], List[Dict]]:
+    def window_metrics_columns(
+        entity: Union[ODS, Warehouse], window_labels: Sequence[str]
+    ) -> Dict[str, Union[int, float, str]]:
+        """
+        Columns of the metrics of every window, e.g. "T1W Unpadded DEA". They are left empty for
+        the windows without shipments of the entity.
+        """
+        columns: Dict[str, Union[int, float, str]] = {}
+        for label in window_labels:
+            metrics = entity.window_metrics.get(label)
+            columns[f"{label} Ship Count"] = metrics.ship_count if metrics else 0
+            if metrics is None:
+                values: Tuple[Union[float, str], ...] = ("", "", "", "", "")
+            else:
+                values = (
+                    metrics.unpadded_c2p_days,
+                    metrics.c2p_days,
+                    metrics.c2d_days,
+                    metrics.unpadded_dea,
+                    metrics.dea,
+                )
+            for name, value in zip(WINDOW_METRICS_COLUMNS, values):
+                columns[f"{label} {name}"] = value
+        return columns
+
+    @staticmethod
+    def segregate_data(
+        selected_pads, window_labels: Sequence[str] = ()
+    ) -> Tuple[List[Dict], List[Dict]]:
         """
         Separate the optimization output to two groups of UTT and TT-Pad.
         Args:
             selected_pads: Pads with values=1 from the optimizers.
+            window_labels: Labels of the metric windows to export, e.g. T1W, T4W, T13W.
 
         Returns:
             Two tuples one for TT-pad and one for UTT.
@@ -107,6 +162,7 @@ class ProcessOutputs:
                     "Effective End Date": effect_end_date,
                     "Is Sparse?": entity.is_sparse,
                 }
+                data_dict.update(ProcessOutputs.window_metrics_columns(entity, window_labels))
                 data_list.append(data_dict)
 
             else:  # SWA
@@ -131,15 +187,19 @@ class ProcessOutputs:
                     "Effective Start Date": effect_start_date,
                     "Effective End Date": effect_end_date,
                 }
+                data_dict.update(ProcessOutputs.window_metrics_columns(entity, window_labels))
                 data_list.append(data_dict)
 
         return tt_pad_data, utt_pad_data
 
-    def save_metadata(self, solution: Dict) -> None:
+    def save_metadata(
+        self, solution: Dict, forecast_cache_statistics: Optional[Dict[str, float]] = None
+    ) -> None:
         """
         Write the optimization and model metadata to the output folder.
         Args:
             solution: Xpress Optimizer's outputs like objective value, constraints LHS, etc.
+            forecast_cache_statistics: Hits, misses and hit rate of the forecast cache, if used.
 
         Returns:
             None.
@@ -149,6 +209,8 @@ class ProcessOutputs:
             "optimization_status": solution["optimization_status"],
             "objective_value": solution["objective_value"],
         }
+        if "optimality_gap" in solution:
+            metadata["optimality_gap"] = solution["optimality_gap"]
 
         # Build metadata for DEA constraints
         for key, dea_value in self.dea_constraints_lhs.items():
@@ -168,6 +230,9 @@ class ProcessOutputs:
             speed_key = f"{key_name} Speed"
             metadata[speed_key] = speed_value
 
+        if forecast_cache_statistics:
+            metadata.update(forecast_cache_statistics)
+
         # Continue with saving metadata as before
         metadata_filename = f"model_metadata_{util.date_now(include_time=True)}.json"
         if self.output_choice in ["local", "both"]:
@@ -181,9 +246,30 @@ class ProcessOutputs:
             write_s3_json(s3_path, metadata)
             logger.info(f"Uploaded metadata to {s3_path}")
 
-    def save_forecast_data(
-        self, forecast_data: Dict[Union[ODS, Warehouse], Dict[float, float]]
-    ) -> None:
+    def save_rejection_report(self, rejection_report: RejectionReport) -> None:
+        """
+        Write the input data-quality report next to the model metadata.
+        Args:
+            rejection_report: Counts and sample rows per validation rule of the input reader.
+
+        Returns:
+            None.
+
+        """
+        report = rejection_report.to_dict()
+        report_filename = f"rejection_report_{util.date_now(include_time=True)}.json"
+        if self.output_choice in ["local", "both"]:
+            local_file_path = os.path.join(self.local_output_folder, report_filename)
+            with open(local_file_path, "w") as file:
+                json.dump(report, file, indent=4)
+            logger.info(f"Rejection report saved to local path: {local_file_path}")
+
+        if self.output_choice in ["s3", "both"] and self.s3_output_folder.startswith("s3://"):
+            s3_path = f"{self.s3_output_folder}/metadata/{report_filename}"
+            write_s3_json(s3_path, report)
+            logger.info(f"Uploaded rejection report to {s3_path}")
+
+    def save_forecast_data(self, forecast_data: ForecastMatrix) -> None:
         """
         Save forecasted values to a file and upload it to S3 or save locally.
         """
@@ -193,9 +279,15 @@ class ProcessOutputs:
         writer = csv.writer(file_content)
         writer.writerow(["ODS/Warehouse", "Quantile", "Value"])
 
-        for location, quantile_values in forecast_data.items():
-            for quantile, value in quantile_values.items():
-                writer.writerow([location, quantile, value])
+        # One row per valid cell of the matrix, entity by entity and by ascending quantile
+        rows, columns = np.nonzero(forecast_data.valid)
+        writer.writerows(
+            zip(
+                [forecast_data.entities[row] for row in rows.tolist()],
+                forecast_data.quantiles[columns].tolist(),
+                forecast_data.values[rows, columns].astype(np.float64).tolist(),
+            )
+        )
 
         file_content.seek(0)
 
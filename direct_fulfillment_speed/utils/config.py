@@ -58,6 +58,26 @@ class ConfigManager:
     def log_mode(self) -> str:
         return self.get("INPUTS", "LOG_MODE")
 
+    @property
+    def columnar_ingestion(self) -> bool:
+        return self.config.getboolean("INPUTS", "COLUMNAR", fallback=False)
+
+    @property
+    def input_batch_size(self) -> int:
+        return self.config.getint("INPUTS", "BATCH_SIZE", fallback=500000)
+
+    @property
+    def input_workers(self) -> int:
+        return max(1, self.config.getint("INPUTS", "WORKERS", fallback=1))
+
+    @property
+    def streaming_metrics(self) -> bool:
+        return self.config.getboolean("INPUTS", "STREAMING", fallback=False)
+
+    @property
+    def history_horizon_days(self) -> int:
+        return self.config.getint("INPUTS", "HISTORY_HORIZON_DAYS", fallback=0)
+
     # XPRESS Section
     @property
     def xpress_heursearchrootselect(self) -> int:
@@ -148,6 +168,64 @@ class ConfigManager:
     def get_model_test_end_date(self):
         return self.config.get("MODEL", "TESTING_END_DATE")
 
+    @property
+    def recent_window_days(self) -> int:
+        return self.config.getint("MODEL", "RECENT_WINDOW_DAYS", fallback=28)
+
+    @property
+    def metric_window_days(self) -> List[int]:
+        """Lengths of the metric windows in days, including the recent window, shortest first."""
+        windows = ast.literal_eval(self.get("MODEL", "METRIC_WINDOWS_DAYS", fallback="[]"))
+        return sorted({self.recent_window_days, *(int(days) for days in windows)})
+
+    @property
+    def forecast_workers(self) -> int:
+        return max(1, self.config.getint("MODEL", "FORECAST_WORKERS", fallback=1))
+
+    @property
+    def sketch_min_shipments(self) -> int:
+        """Shipments from which an entity is forecast by a quantile sketch; 0 never sketches."""
+        return self.config.getint("MODEL", "SKETCH_MIN_SHIPMENTS", fallback=0)
+
+    @property
+    def sketch_bins_per_day(self) -> int:
+        return self.config.getint("MODEL", "SKETCH_BINS_PER_DAY", fallback=100)
+
+    @property
+    def forecast_cache_path(self) -> str:
+        """Local file of the forecasts reused across runs; empty disables the cache."""
+        return self.get("MODEL", "FORECAST_CACHE_PATH", fallback="")
+
+    @property
+    def solver_backend(self) -> str:
+        """Solver backend of the optimization model, see solver.SOLVER_BACKENDS."""
+        return self.get("MODEL", "SOLVER_BACKEND", fallback="xpress")
+
+    @property
+    def solver_mode(self) -> str:
+        """mip to solve the model as a MIP, or lagrangian to try the Lagrangian solver first."""
+        return self.get("MODEL", "SOLVER_MODE", fallback="mip")
+
+    @property
+    def lagrangian_gap_tolerance(self) -> float:
+        """Relative gap above which a Lagrangian solution falls back to the MIP."""
+        return self.config.getfloat("MODEL", "LAGRANGIAN_GAP_TOLERANCE", fallback=0.005)
+
+    @property
+    def presolve_dominated_pads(self) -> bool:
+        """Whether the candidate pads dominated within their entity are removed."""
+        return self.config.getboolean("MODEL", "PRESOLVE_DOMINATED_PADS", fallback=True)
+
+    @property
+    def presolve_lp_dominated_pads(self) -> bool:
+        """Whether the candidate pads above the convex hull of their entity are removed."""
+        return self.config.getboolean("MODEL", "PRESOLVE_LP_DOMINATED_PADS", fallback=False)
+
+    @property
+    def warm_start_path(self) -> str:
+        """Local or S3 folder of the previous pad outputs to warm start from; empty disables it."""
+        return self.get("MODEL", "WARM_START_PATH", fallback="")
+
     @property
     def get_gl_list(self):
         return ast.literal_eval(self.config.get("MODEL", "GL_LIST"))
@@ -1,12 +1,22 @@
 import os
 import pathlib
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Union
+from functools import lru_cache
+from typing import Optional
 
-import pandas as pd
+# Number of distinct time strings whose conversion is cached
+DATE_CACHE_SIZE = 65536
 
-# Initialize this dictionary to save the dates and keep it teh converted dates
-date_cache: Dict[str, Optional[datetime]] = {}
+# Datetime formats accepted in the input data, tried in order.
+DATETIME_FORMATS = [
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%y %H:%M",
+]
 
 
 def get_clockwise_time_diff(start_time: datetime, end_time: datetime):
@@ -86,34 +96,24 @@ def concat_strings(separator: str, *argv):
 def convert_time_str_to_dt_object(time_str: str) -> Optional[datetime]:
     """
     Converts a given time string to a datetime object, or returns None if the conversion fails.
-    This function uses a cache to avoid redundant conversions.
+    The conversions of the most recent strings are cached to avoid redundant conversions.
     """
-    # Check if the conversion has already been done
-    if time_str in date_cache:
-        return date_cache[time_str]
-
     if not time_str:
         return None
 
-    if isinstance(time_str, pd.Timestamp):
+    if isinstance(time_str, datetime):
         return time_str
 
-    datetime_formats = [
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%d %H:%M",
-        "%Y-%m-%d",
-        "%m/%d/%Y %H:%M:%S",
-        "%m/%d/%y %H:%M:%S",
-        "%m/%d/%Y %H:%M",
-        "%m/%d/%y %H:%M",
-    ]
-
-    for fmt in datetime_formats:
+    return _parse_time_str(time_str)
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_time_str(time_str: str) -> Optional[datetime]:
+    for fmt in DATETIME_FORMATS:
         try:
             return datetime.strptime(time_str, fmt)
         except ValueError:
             continue
-
     return None
 
 
@@ -0,0 +1,106 @@
+"""Shared fixtures: a small synthetic shipment input, served from a local folder as fake S3."""
+
+import glob
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import fsspec
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from direct_fulfillment_speed.inputs import read_inputs  # noqa: E402
+from direct_fulfillment_speed.utils.config import ConfigManager  # noqa: E402
+
+CARRIERS = [
+    ("SWA", "SWA"),
+    ("UPS", "UPS_GROUND"),
+    ("UPS", "UPS_2ND_DAY"),
+    ("UPS", "UPS_NEXT_DAY"),
+]
+
+
+def shipments_frame(num_rows: int = 3000, seed: int = 0) -> pd.DataFrame:
+    """Synthetic shipments of a few warehouses and dense destinations, with some invalid rows."""
+    rng = np.random.default_rng(seed)
+    warehouses = [f"W{i:03d}" for i in range(4)]
+    warehouse = rng.choice(warehouses, num_rows)
+    carrier = rng.choice(len(CARRIERS), num_rows, p=[0.4, 0.4, 0.1, 0.1])
+    destination = np.array(
+        [f"{zip5:05d}" for zip5 in rng.integers(10000, 10600, num_rows)], dtype=object
+    )
+    destination[rng.random(num_rows) < 0.01] = "12***"
+    end = pd.Timestamp("2025-01-18")
+    order_datetime = end - pd.to_timedelta(rng.integers(0, 90 * 24 * 60, num_rows), unit="min")
+    c2p_days_unpadded = rng.integers(1, 8, num_rows).astype(float)
+    return pd.DataFrame(
+        {
+            "region_id": 1,
+            "marketplace_id": 1,
+            "shipment_id": np.arange(num_rows).astype(str),
+            "order_id": np.arange(num_rows).astype(str),
+            "tracking_id": np.arange(num_rows).astype(str),
+            "package_id": np.arange(num_rows).astype(str),
+            "vendor_id": [f"V{warehouses.index(w) % 2}" for w in warehouse],
+            "vendor_primary_gl_description": "Home",
+            "warehouse_id": warehouse,
+            "origin_zip5": [f"2{warehouses.index(w):04d}" for w in warehouse],
+            "carrier": [CARRIERS[i][0] for i in carrier],
+            "ship_method_orig": [CARRIERS[i][1] for i in carrier],
+            "ship_method_1": [CARRIERS[i][1] for i in carrier],
+            "destination_zip5": destination,
+            "order_datetime": order_datetime.strftime("%Y-%m-%d %H:%M:%S"),
+            "of_datetime": order_datetime.strftime("%Y-%m-%d %H:%M:%S"),
+            "c2p_days": c2p_days_unpadded + rng.integers(0, 3, num_rows),
+            "c2p_days_unpadded": c2p_days_unpadded,
+            "c2d_days": c2p_days_unpadded + rng.integers(-3, 4, num_rows),
+            "gl_group": "Home",
+            "distance_mi": rng.integers(10, 3000, num_rows).astype(float),
+        }
+    )
+
+
+@pytest.fixture
+def fake_s3(tmp_path, monkeypatch):
+    """Serve s3://<bucket>/<key> from tmp_path/<bucket>/<key> to the input readers."""
+
+    def local_path(path: str) -> str:
+        return str(tmp_path / path.replace("s3://", ""))
+
+    class LocalS3FileSystem(fsspec.implementations.local.LocalFileSystem):
+        def __init__(self, *args, **kwargs):
+            super().__init__()
+
+        def open(self, path, mode="rb", **kwargs):
+            return open(local_path(path), mode)
+
+        def glob(self, path, **kwargs):
+            prefix = len(str(tmp_path)) + 1
+            return [found[prefix:] for found in sorted(glob.glob(local_path(path)))]
+
+    class LocalS3Client:
+        def get_object(self, Bucket, Key):
+            return {"Body": open(os.path.join(tmp_path, Bucket, Key), "rb")}
+
+    monkeypatch.setattr(read_inputs.s3fs, "S3FileSystem", LocalS3FileSystem)
+    monkeypatch.setattr(read_inputs.boto3, "client", lambda *args, **kwargs: LocalS3Client())
+    (tmp_path / "bucket" / "inputs").mkdir(parents=True)
+    return tmp_path / "bucket" / "inputs"
+
+
+def make_config(
+    path: str, input_format: str, options: Optional[Dict[Tuple[str, str], object]] = None
+) -> ConfigManager:
+    """The repository config reading an input, with (section, option) overrides."""
+    config = ConfigManager(REPO_ROOT / "resources" / "config.ini", "local", "")
+    config.config.set("INPUTS", "PATH", path)
+    config.config.set("INPUTS", "FORMAT", input_format)
+    config.config.set("INPUTS", "LOG_MODE", "WARNING")
+    for (section, option), value in (options or {}).items():
+        config.config.set(section, option, str(value))
+    return config
@@ -0,0 +1,87 @@
+"""Forecasts are reused from the forecast cache only while their shipments and parameters hold."""
+
+import json
+
+import numpy as np
+from conftest import make_config, shipments_frame
+
+from direct_fulfillment_speed.inputs.read_inputs import ReadInputs
+from direct_fulfillment_speed.optimization.predict import Predict
+from direct_fulfillment_speed.outputs.print_outputs import ProcessOutputs
+
+
+def _forecast(path: str, cache_path: str, options=None) -> Predict:
+    config = make_config(path, "parquet", {("MODEL", "FORECAST_CACHE_PATH"): cache_path})
+    for (section, option), value in (options or {}).items():
+        config.config.set(section, option, str(value))
+    shipments = ReadInputs(config).read_shipments()
+    predict = Predict(config, shipments)
+    predict.process_ods(
+        [
+            entity
+            for group in ("THIRD_PARTY", "SWA")
+            for entity, rows in shipments.shipment_groups[group].items()
+            if len(rows)
+        ]
+    )
+    return predict
+
+
+def _forecasts(predict: Predict):
+    forecasts = predict.forecasts
+    return {entity: forecasts.to_dict(row) for entity, row in forecasts.rows.items()}
+
+
+def test_cached_forecasts_are_reused_until_their_inputs_change(fake_s3, tmp_path):
+    frame = shipments_frame(4000)
+    frame.loc[0, "destination_zip5"] = "10001"
+    frame.to_parquet(fake_s3 / "shipments.parquet", index=False)
+    path = "s3://bucket/inputs/shipments.parquet"
+    cache_path = str(tmp_path / "cache" / "forecasts.json")
+
+    first = _forecast(path, cache_path)
+    num_entities = len(first.forecasts.entities)
+    assert (first.forecast_cache.hits, first.forecast_cache.misses) == (0, num_entities)
+
+    second = _forecast(path, cache_path)
+    assert (second.forecast_cache.hits, second.forecast_cache.misses) == (num_entities, 0)
+    assert _forecasts(second) == _forecasts(first)
+    np.testing.assert_array_equal(second.forecasts.valid, first.forecasts.valid)
+    valid = first.forecasts.valid
+    np.testing.assert_array_equal(second.forecasts.values[valid], first.forecasts.values[valid])
+
+    # A change of one shipment only invalidates the forecast of its entity
+    frame.loc[0, "c2d_days"] += 3.5
+    frame.to_parquet(fake_s3 / "shipments.parquet", index=False)
+    changed = _forecast(path, cache_path)
+    assert (changed.forecast_cache.hits, changed.forecast_cache.misses) == (num_entities - 1, 1)
+
+    for options in (
+        {("MODEL", "LAMBDA_DECAY"): 0.2},
+        {("MODEL", "QUANTILES_INCREMENT"): 10},
+        {("MODEL", "SKETCH_MIN_SHIPMENTS"): 100},
+    ):
+        _forecast(path, cache_path)
+        other = _forecast(path, cache_path, options)
+        assert (other.forecast_cache.hits, other.forecast_cache.misses) == (0, num_entities)
+
+
+def test_cache_statistics_reach_the_metadata(fake_s3, tmp_path):
+    shipments_frame().to_parquet(fake_s3 / "shipments.parquet", index=False)
+    predict = _forecast("s3://bucket/inputs/shipments.parquet", str(tmp_path / "forecasts.json"))
+
+    outputs = ProcessOutputs.__new__(ProcessOutputs)
+    outputs.output_choice = "local"
+    outputs.local_output_folder = str(tmp_path)
+    outputs.dea_constraints_lhs = {}
+    outputs.average_speed = {}
+    outputs.save_metadata(
+        {"optimization_status": "mip_optimal", "objective_value": 1.0},
+        predict.forecast_cache.statistics,
+    )
+
+    (metadata_path,) = tmp_path.glob("model_metadata_*.json")
+    metadata = json.loads(metadata_path.read_text())
+    assert metadata["forecast_cache_misses"] == len(predict.forecasts.entities)
+    assert metadata["forecast_cache_hits"] == 0
+    assert metadata["forecast_cache_hit_rate"] == 0.0
@@ -0,0 +1,21 @@
+"""The forecast matrix keeps the forecast values exactly."""
+
+import numpy as np
+
+from direct_fulfillment_speed.optimization.forecast_matrix import ForecastMatrix
+
+
+def test_fractional_forecasts_are_stored_exactly():
+    quantiles = np.array([0.1, 0.5, 0.9])
+    forecasts = ForecastMatrix.for_quantiles(quantiles)
+    quantile_values = np.array([[-0.87, 0.1, 2.3], [-2.5, -0.5, 0.5]])
+    values, valid = forecasts.finalize(quantiles, quantile_values, np.zeros(2, dtype=bool))
+    forecasts.append(["first", "second"], values, valid)
+    forecasts.append(["second"], values[1:] + 1.0 / 3.0, valid[1:])
+
+    assert forecasts.to_dict(0) == {10.0: -0.87, 50.0: 0.1, 90.0: 2.3}
+    assert forecasts.to_dict(1) == {
+        10.0: -2.5 + 1.0 / 3.0,
+        50.0: -0.5 + 1.0 / 3.0,
+        90.0: 0.5 + 1.0 / 3.0,
+    }
@@ -0,0 +1,86 @@
+"""The Lagrangian solver's certified gap holds against the optimum found by HiGHS."""
+
+import numpy as np
+import pytest
+
+from direct_fulfillment_speed.optimization.lagrangian import (
+    MAX_SUBGRADIENT_ITERATIONS,
+    solve_multiple_choice_knapsack,
+)
+from direct_fulfillment_speed.optimization.solver import create_solver
+
+GAP_TOLERANCE = 0.005
+
+
+def _pad_model(num_entities: int, max_pads: int, num_rows: int, seed: int):
+    """
+    A pad selection model: every entity picks one pad, of increasing quantile and cost, and the
+    rows ask for a weighted quantile of the entities of a DEA class, or of all of them.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, max_pads + 1, num_entities)
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+    group = np.repeat(np.arange(num_entities), sizes)
+    quantiles = np.concatenate([np.sort(rng.uniform(30, 100, size)) for size in sizes])
+    pads = np.concatenate([np.sort(rng.integers(-2, 6, size)).astype(float) for size in sizes])
+    weights = rng.uniform(0.01, 1, num_entities)
+    objective = weights[group] * np.where(pads < 0, 0.01 * pads, pads)
+    objective += rng.normal(0, 0.05, len(group))
+
+    classes = rng.integers(0, num_rows - 1, num_entities)
+    shipments = rng.integers(10, 1000, num_entities).astype(float)
+    coefficients = np.zeros((num_rows, len(group)))
+    for row in range(num_rows - 1):
+        members = classes[group] == row
+        total = shipments[classes == row].sum()
+        coefficients[row, members] = shipments[group][members] * quantiles[members] / 100 / total
+    coefficients[-1] = weights[group] / weights.sum() * quantiles / 100
+    lowest = np.minimum.reduceat(coefficients, starts[:-1], axis=1).sum(axis=1)
+    highest = np.maximum.reduceat(coefficients, starts[:-1], axis=1).sum(axis=1)
+    rhs = lowest + rng.uniform(0.3, 0.8, num_rows) * (highest - lowest)
+    return starts, objective, coefficients, rhs
+
+
+def _highs_optimum(starts, objective, coefficients, rhs) -> float:
+    solver = create_solver("highs", "pads")
+    solver.setOutputFlag(0)
+    solver.setMIPGap(1e-9)
+    solver.addBinaryColumns(objective)
+    num_columns = len(objective)
+    solver.addRows(
+        ["EQUAL"] * (len(starts) - 1),
+        np.ones(len(starts) - 1),
+        starts,
+        np.arange(num_columns),
+        np.ones(num_columns),
+    )
+    solver.addRows(
+        ["GREATER_EQUAL"] * len(rhs),
+        rhs,
+        np.arange(len(rhs) + 1) * num_columns,
+        np.tile(np.arange(num_columns), len(rhs)),
+        coefficients.ravel(),
+    )
+    solver.mip_optimize()
+    return solver.getObjectiveValue()
+
+
+@pytest.mark.parametrize("num_entities, max_pads, num_rows, seed", [(60, 8, 4, 0), (400, 12, 6, 1)])
+def test_certified_gap_holds_against_highs(num_entities, max_pads, num_rows, seed):
+    pytest.importorskip("highspy")
+    starts, objective, coefficients, rhs = _pad_model(num_entities, max_pads, num_rows, seed)
+    optimum = _highs_optimum(starts, objective, coefficients, rhs)
+
+    result = solve_multiple_choice_knapsack(starts, objective, coefficients, rhs, GAP_TOLERANCE)
+
+    assert result.feasible
+    group = np.repeat(np.arange(len(starts) - 1), np.diff(starts))
+    np.testing.assert_array_equal(group[result.choice], np.arange(len(starts) - 1))
+    assert (coefficients[:, result.choice].sum(axis=1) >= rhs - 1e-9).all()
+    assert result.objective == pytest.approx(objective[result.choice].sum())
+    # The bound and the solution certify the gap of the solution to the optimum
+    assert result.bound <= optimum + 1e-7
+    assert result.objective >= optimum - 1e-7
+    assert (result.objective - optimum) / abs(result.objective) <= result.gap + 1e-12
+    # A small model may have a duality gap above the tolerance, which ends the subgradient
+    assert result.gap <= GAP_TOLERANCE or result.iterations == MAX_SUBGRADIENT_ITERATIONS
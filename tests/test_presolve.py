@@ -0,0 +1,61 @@
+"""Removing the dominated candidate pads leaves the optimal objective of the model unchanged."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from direct_fulfillment_speed.optimization.presolve import non_dominated, on_lower_convex_hull
+
+
+def _brute_force_optimum(candidates, factors, rhs) -> float:
+    """
+    Least cost of one (quantile, cost) candidate per entity whose rows, the quantiles times the
+    factors of their entities, reach the right-hand sides.
+    """
+    best = np.inf
+    for choice in itertools.product(*candidates):
+        quantiles = np.array([quantile for quantile, _ in choice])
+        if (factors @ quantiles >= rhs - 1e-9).all():
+            best = min(best, sum(cost for _, cost in choice))
+    return best
+
+
+def test_dominated_candidates_do_not_change_the_optimum():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        num_entities = int(rng.integers(1, 5))
+        candidates = []
+        for _ in range(num_entities):
+            quantiles = np.sort(rng.choice(np.arange(1, 100), int(rng.integers(1, 6)), False))
+            # Rounded costs, so some candidates tie
+            costs = np.round(rng.normal(0, 1, len(quantiles)), 1)
+            candidates.append(list(zip(quantiles.tolist(), costs.tolist())))
+        factors = rng.uniform(0, 1, (2, num_entities)) * (rng.random((2, num_entities)) < 0.8)
+        highest = factors @ np.array([max(q for q, _ in entity) for entity in candidates])
+        rhs = rng.uniform(0.5, 1.0, 2) * highest
+
+        presolved = []
+        for entity in candidates:
+            quantiles, costs = map(np.array, zip(*entity))
+            keep = non_dominated(quantiles, costs)
+            presolved.append([entity[index] for index in np.flatnonzero(keep)])
+
+        assert _brute_force_optimum(presolved, factors, rhs) == pytest.approx(
+            _brute_force_optimum(candidates, factors, rhs)
+        )
+
+
+def test_lower_convex_hull_keeps_the_collinear_candidates():
+    quantiles = np.array([10.0, 20.0, 25.0, 30.0, 40.0, 50.0])
+    costs = np.array([0.0, 1.0, 2.0, 2.0, 3.0, 6.0])
+    # (25, 2) is above the hull; (20, 1), (30, 2) and (40, 3) are on one edge
+    np.testing.assert_array_equal(
+        on_lower_convex_hull(quantiles, costs), [True, True, False, True, True, True]
+    )
+    order = np.array([3, 0, 5, 1, 4, 2])
+    np.testing.assert_array_equal(
+        on_lower_convex_hull(quantiles[order], costs[order]),
+        [True, True, True, True, True, False],
+    )
+
@@ -0,0 +1,123 @@
+"""The quantile sketch of the dense entities, built from arrays or during ingestion."""
+
+import numpy as np
+from conftest import make_config, shipments_frame
+
+from direct_fulfillment_speed.inputs.read_inputs import ReadInputs
+from direct_fulfillment_speed.optimization.predict import Predict
+from direct_fulfillment_speed.optimization.quantile_sketch import DecayedQuantileSketch
+
+QUANTILES = np.arange(1, 100) / 100
+
+
+def _shipments(num_rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    order_dates = np.datetime64("2025-01-01T00:00:00") + rng.integers(
+        0, 90 * 86400, num_rows
+    ).astype("timedelta64[s]")
+    values = rng.integers(-3, 5, num_rows) + rng.choice([0.0, 0.25, 0.5], num_rows)
+    return order_dates, values
+
+
+def test_non_finite_values_are_not_sketched():
+    order_dates, values = _shipments(5000)
+    with_nan = values.copy()
+    with_nan[:50] = np.nan
+    with_nan[50:60] = np.inf
+    with_nan[60:70] = -np.inf
+
+    sketch = DecayedQuantileSketch.from_arrays(order_dates, with_nan)
+    expected = DecayedQuantileSketch.from_arrays(order_dates[70:], values[70:])
+
+    assert sketch.num_shipments == 5000 - 70
+    np.testing.assert_array_equal(
+        sketch.quantiles(QUANTILES, 0.1), expected.quantiles(QUANTILES, 0.1)
+    )
+    assert np.isfinite(sketch.quantiles(QUANTILES, 0.1)).all()
+
+
+def test_merged_and_segmented_sketches_are_the_sketch_of_all_shipments():
+    order_dates, values = _shipments(20000)
+    keys = np.random.default_rng(1).integers(0, 5, len(values))
+    whole = DecayedQuantileSketch.from_arrays(order_dates, values)
+
+    merged = DecayedQuantileSketch()
+    for part in np.array_split(np.arange(len(values)), 3):
+        merged.merge(DecayedQuantileSketch.from_arrays(order_dates[part], values[part]))
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    assert (merged.zero_count, merged.num_shipments) == (whole.zero_count, whole.num_shipments)
+
+    for key, sketch in enumerate(DecayedQuantileSketch.from_segments(keys, 6, order_dates, values)):
+        rows = keys == key
+        if not rows.any():
+            assert sketch.num_shipments == 0
+            continue
+        expected = DecayedQuantileSketch.from_arrays(order_dates[rows], values[rows])
+        np.testing.assert_array_equal(
+            sketch.quantiles(QUANTILES, 0.1), expected.quantiles(QUANTILES, 0.1)
+        )
+        assert sketch.zero_count == expected.zero_count
+
+
+def test_capped_sketches_merge_their_bins_whatever_the_order_of_the_shipments():
+    order_dates, _ = _shipments(30000)
+    rng = np.random.default_rng(2)
+    values = rng.normal(0, 3, len(order_dates))
+    keys = rng.integers(0, 3, len(values))
+    exact = DecayedQuantileSketch.from_arrays(order_dates, values, max_cells=1 << 30)
+    whole = DecayedQuantileSketch.from_arrays(order_dates, values, max_cells=500)
+    assert len(whole.counts) <= 500 < len(exact.counts)
+    assert whole.bin_shift > 0
+
+    merged = DecayedQuantileSketch(max_cells=500)
+    for sketch in DecayedQuantileSketch.from_segments(keys, 3, order_dates, values, max_cells=500):
+        merged.merge(sketch)
+    assert merged.bin_shift == whole.bin_shift
+    np.testing.assert_array_equal(merged.days, whole.days)
+    np.testing.assert_array_equal(merged.bins, whole.bins)
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+
+    # A quantile is the middle of the merged bin holding the quantile of the finer bins
+    error = (1 << whole.bin_shift) / (2 * whole.bins_per_day)
+    difference = whole.quantiles(QUANTILES, 0.1) - exact.quantiles(QUANTILES, 0.1)
+    assert np.abs(difference).max() <= error + 1e-12
+
+
+def test_sketches_accumulated_while_reading_match_the_shipments(fake_s3):
+    frame = shipments_frame(6000)
+    frame.loc[::97, "c2d_days"] = np.nan
+    frame.iloc[:3000].to_parquet(fake_s3 / "part-0.parquet", index=False)
+    frame.iloc[3000:].to_parquet(fake_s3 / "part-1.parquet", index=False)
+    config = make_config(
+        "s3://bucket/inputs/*.parquet",
+        "parquet",
+        {
+            ("INPUTS", "COLUMNAR"): True,
+            ("INPUTS", "STREAMING"): True,
+            ("INPUTS", "BATCH_SIZE"): 1000,
+            ("MODEL", "SKETCH_MIN_SHIPMENTS"): 100,
+        },
+    )
+    shipments = ReadInputs(config).read_shipments()
+    predict = Predict(config, shipments)
+
+    entities = [
+        entity
+        for group in ("THIRD_PARTY", "SWA")
+        for entity, rows in shipments.shipment_groups[group].items()
+        if len(rows)
+    ]
+    sketches = predict.ingested_sketches(entities)
+    assert all(sketch is not None for sketch in sketches)
+    for entity, sketch in zip(entities, sketches):
+        lengths, order_dates, gaps, _ = predict.collect_gaps(
+            [shipments.get_shipments_for_entity(entity)]
+        )
+        expected = DecayedQuantileSketch.from_arrays(
+            order_dates, gaps, config.sketch_bins_per_day
+        )
+        assert sketch.num_shipments == expected.num_shipments, entity
+        np.testing.assert_array_equal(sketch.counts, expected.counts)
+        np.testing.assert_array_equal(
+            sketch.quantiles(QUANTILES, 0.1), expected.quantiles(QUANTILES, 0.1)
+        )
@@ -0,0 +1,103 @@
+"""The record and columnar readers keep and reject the same rows of the same input."""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_config, shipments_frame
+
+from direct_fulfillment_speed.entities.nodes import ShipmentType
+from direct_fulfillment_speed.inputs.read_inputs import ReadInputs
+
+
+def _same(first, second) -> bool:
+    """Equality treating NaN as equal to NaN."""
+    if isinstance(first, float) and isinstance(second, float):
+        return first == second or (math.isnan(first) and math.isnan(second))
+    return first == second
+
+
+def _read(path: str, input_format: str, columnar: bool):
+    config = make_config(path, input_format, {("INPUTS", "COLUMNAR"): columnar})
+    reader = ReadInputs(config)
+    shipments = reader.read_shipments()
+    shipments.update_shipment_counts()
+    shipments.extract_ods_warehouse_metrics()
+
+    metrics = {}
+    for group in ("THIRD_PARTY", "SWA"):
+        for entity in shipments.shipment_groups[group]:
+            metrics[(type(entity).__name__, str(entity))] = (
+                entity.ship_count,
+                entity.recent_unpadded_dea,
+                entity.recent_dea,
+                entity.recent_unpadded_c2p_days,
+                entity.recent_c2d_days,
+                entity.recent_c2p_days,
+            )
+    totals = (
+        shipments.total_number_shipments_by_group("SWA"),
+        shipments.total_number_shipments_by_group("THIRD_PARTY", ShipmentType.UPS_GROUND),
+        shipments.total_number_shipments_by_group("THIRD_PARTY", ShipmentType.UPS_AIR),
+    )
+    percentages = {
+        str(entity): value
+        for entity, value in shipments.calculate_cumulative_ship_percentages().items()
+    }
+    report = reader.rejection_report.to_dict()
+    rejections = {rule: counts["count"] for rule, counts in report["rules"].items()}
+    return metrics, totals, percentages, rejections
+
+
+def _assert_same_reads(path: str, input_format: str):
+    record = _read(path, input_format, columnar=False)
+    columnar = _read(path, input_format, columnar=True)
+    record_metrics, record_totals, record_percentages, record_rejections = record
+    columnar_metrics, columnar_totals, columnar_percentages, columnar_rejections = columnar
+    assert record_rejections == columnar_rejections
+    assert record_totals == columnar_totals
+    assert record_percentages == pytest.approx(columnar_percentages, rel=1e-12)
+    assert record_metrics.keys() == columnar_metrics.keys()
+    for key, values in record_metrics.items():
+        assert all(map(_same, values, columnar_metrics[key])), key
+
+
+def test_nan_numbers_are_kept_by_both_readers_of_parquet(fake_s3):
+    frame = shipments_frame()
+    rows = np.random.default_rng(1).choice(len(frame), 60, replace=False)
+    frame.loc[rows[:30], "c2d_days"] = np.nan
+    frame.loc[rows[30:], "c2p_days_unpadded"] = np.nan
+    frame.to_parquet(fake_s3 / "nan.parquet", index=False)
+
+    _assert_same_reads("s3://bucket/inputs/nan.parquet", "parquet")
+
+
+def test_null_timestamps_fall_back_in_both_readers_of_parquet(fake_s3):
+    frame = shipments_frame()
+    for column in ("order_datetime", "of_datetime"):
+        frame[column] = pd.to_datetime(frame[column])
+    rows = np.random.default_rng(2).choice(len(frame), 70, replace=False)
+    frame.loc[rows[:50], "of_datetime"] = pd.NaT
+    frame.loc[rows[50:], "order_datetime"] = pd.NaT
+    frame.to_parquet(fake_s3 / "timestamps.parquet", index=False)
+
+    _assert_same_reads("s3://bucket/inputs/timestamps.parquet", "parquet")
+    _, totals, _, rejections = _read("s3://bucket/inputs/timestamps.parquet", "parquet", True)
+    assert rejections["missing_order_datetime"] == 0
+    assert sum(totals) == len(frame) - sum(rejections.values())
+
+
+def test_nan_numbers_are_kept_and_text_rejected_by_both_readers_of_csv(fake_s3):
+    frame = shipments_frame()
+    frame["c2d_days"] = frame["c2d_days"].astype(object)
+    frame.loc[:19, "c2d_days"] = "nan"
+    frame.loc[20:39, "c2d_days"] = "n/a"
+    frame.loc[40:59, "c2d_days"] = ""
+    frame.to_csv(fake_s3 / "mixed.csv", index=False)
+
+    _assert_same_reads("s3://bucket/inputs/mixed.csv", "csv")
+    _, _, _, rejections = _read("s3://bucket/inputs/mixed.csv", "csv", columnar=True)
+    # Rows failing an earlier rule are counted under that rule
+    text_rows = frame.loc[20:59, "destination_zip5"] != "12***"
+    assert rejections["non_numeric_c2d_days"] == text_rows.sum()
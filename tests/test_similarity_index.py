@@ -0,0 +1,70 @@
+"""The best matches of the sparse ODSs found through the similarity index are the best scores."""
+
+import random
+
+from direct_fulfillment_speed.entities.nodes import (
+    ODS,
+    Carrier,
+    Destination,
+    ShipmentType,
+    Vendor,
+    Warehouse,
+)
+from direct_fulfillment_speed.optimization.predict import SimilarityFinder
+from direct_fulfillment_speed.optimization.similarity_index import (
+    COMPATIBLE_SHIPMENT_TYPES,
+    SimilarityIndex,
+    SimilarityScorer,
+)
+
+SHIP_METHODS = ["UPS_GROUND", "UPS_2ND_DAY", "SWA", "OTHER"]
+
+
+def _random_ods(rnd: random.Random, warehouses):
+    ship_method = rnd.choice(SHIP_METHODS)
+    return ODS(
+        rnd.choice(warehouses),
+        Carrier("UPS", ship_method, ship_method),
+        Destination(f"{rnd.randint(100, 140)}{rnd.randint(10, 99)}"),
+        ship_method,
+        False,
+        rnd.choice(["", "Z1", "Z2", "Z3"]),
+    )
+
+
+def _best_by_scoring_every_ods(sparse, non_sparse_ods):
+    """The highest scoring compatible ODSs, by zip3 difference and then in list order."""
+    shipment_type: ShipmentType = sparse.carrier.shipment_type
+    if shipment_type not in COMPATIBLE_SHIPMENT_TYPES:
+        return []
+    scored = [
+        (ods, SimilarityFinder.calculate_similarity_score(sparse, ods))
+        for ods in non_sparse_ods
+        if ods.carrier.shipment_type == shipment_type
+    ]
+    if not scored:
+        return []
+    best_score = max(score for _, score in scored)
+    best = [(ods, score) for ods, score in scored if score == best_score]
+    best.sort(key=lambda match: abs(int(sparse.dest.dest_zip3) - int(match[0].dest.dest_zip3)))
+    return best
+
+
+def test_indexed_batch_matches_scoring_every_ods():
+    for seed in range(100):
+        rnd = random.Random(seed)
+        vendors = [Vendor(f"V{i}", rnd.choice("ABC")) for i in range(rnd.randint(1, 6))]
+        warehouses = [
+            Warehouse(rnd.choice(vendors), f"W{i}", f"{rnd.randint(100, 130)}01")
+            for i in range(rnd.randint(1, 8))
+        ]
+        non_sparse_ods = [_random_ods(rnd, warehouses) for _ in range(rnd.randint(1, 60))]
+        sparse_ods = [_random_ods(rnd, warehouses) for _ in range(rnd.randint(0, 50))]
+        scorer = SimilarityScorer(non_sparse_ods, max_scores=rnd.choice([1, 7, 1 << 20]))
+
+        matches = scorer.best_matches(sparse_ods, SimilarityIndex(non_sparse_ods))
+        for sparse, sparse_matches in zip(sparse_ods, matches):
+            expected = _best_by_scoring_every_ods(sparse, non_sparse_ods)
+            assert [(id(ods), score) for ods, score in sparse_matches] == [
+                (id(ods), score) for ods, score in expected
+            ], seed
@@ -0,0 +1,61 @@
+"""The solver interface, and the optimization model solved end to end by the HiGHS backend."""
+
+import numpy as np
+import pytest
+from conftest import make_config, shipments_frame
+
+from direct_fulfillment_speed.inputs.read_inputs import ReadInputs
+from direct_fulfillment_speed.optimization import solver
+from direct_fulfillment_speed.optimization.predict import Predict
+from direct_fulfillment_speed.optimization.speed_optimizer import Optimize
+
+
+def test_backend_missing_a_method_cannot_be_created():
+    class PartialSolver(solver.Solver):
+        def setOutputFlag(self, optionStr):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        PartialSolver()
+
+
+def test_optimize_solves_and_writes_the_model_with_highs(fake_s3, tmp_path):
+    pytest.importorskip("highspy")
+    shipments_frame().to_parquet(fake_s3 / "shipments.parquet", index=False)
+    config = make_config(
+        "s3://bucket/inputs/shipments.parquet",
+        "parquet",
+        {
+            ("MODEL", "SOLVER_BACKEND"): "highs",
+            ("MODEL", "MIN_3P_GROUND_DEA"): 0.9,
+            ("XPRESS", "OUTPUTFLAG"): False,
+            ("XPRESS", "MAXTIME"): 60,
+        },
+    )
+    shipments = ReadInputs(config).read_shipments()
+    shipments.update_shipment_counts()
+    shipments.extract_ods_warehouse_metrics()
+    predict = Predict(config, shipments)
+    predict.perform_forecasts()
+
+    optimize = Optimize(shipments, predict, config)
+    assert isinstance(optimize.opt, solver.HighsSolver)
+    optimize.solve()
+
+    assert optimize.solution["optimization_status"] == "Optimal"
+    choice = np.array(optimize.opt.getSolution()) > 0.5
+    columns = optimize.columns
+    np.testing.assert_array_equal(
+        np.bincount(columns.group[choice], minlength=len(columns.entities)), 1
+    )
+    assert optimize.solution["objective_value"] == pytest.approx(columns.objective[choice].sum())
+    assert len(optimize.filtered_pads) == len(columns.entities)
+
+    # Warm started from its own solution, the solver finds the same optimum again
+    optimize.opt.loadMIPSol(choice.astype(float))
+    optimize.opt.mip_optimize()
+    assert optimize.opt.getObjectiveValue() == pytest.approx(optimize.solution["objective_value"])
+
+    optimize.print_lp_file(str(tmp_path / "model_"))
+    (lp_path,) = tmp_path.glob("model_*.lp")
+    assert "SelectOnePad_" in lp_path.read_text()
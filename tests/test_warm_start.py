@@ -0,0 +1,112 @@
+"""The warm start reads the previous pad outputs and repairs them into a feasible start."""
+
+import numpy as np
+
+from direct_fulfillment_speed.entities.nodes import ODS, Carrier, Destination, Vendor, Warehouse
+from direct_fulfillment_speed.optimization.lagrangian import repair_solution
+from direct_fulfillment_speed.optimization.model_data import ModelColumns
+from direct_fulfillment_speed.optimization.speed_optimizer import Optimize
+from direct_fulfillment_speed.optimization.warm_start import (
+    read_previous_pads,
+    warm_start_choice,
+)
+from direct_fulfillment_speed.outputs import print_outputs
+from direct_fulfillment_speed.outputs.print_outputs import ProcessOutputs
+
+VENDOR = Vendor("V0", "Home")
+WAREHOUSE = Warehouse(VENDOR, "W000", "20000")
+OTHER_WAREHOUSE = Warehouse(VENDOR, "W001", "20001")
+GROUND_ODS = ODS(
+    WAREHOUSE, Carrier("UPS", "UPS_GROUND", "UPS_GROUND"), Destination("10012"), "UPS_GROUND"
+)
+AIR_ODS = ODS(
+    WAREHOUSE, Carrier("UPS", "UPS_2ND_DAY", "UPS_2ND_DAY"), Destination("10112"), "UPS_2ND_DAY"
+)
+
+
+def _save_pads(folder, monkeypatch, timestamp: str, pads) -> None:
+    """Write the TTpad and UTTpad outputs of selected (entity, pad) like a run at a time."""
+    monkeypatch.setattr(
+        print_outputs.util,
+        "date_now",
+        lambda include_time=False: timestamp if include_time else timestamp[:10],
+    )
+    outputs = ProcessOutputs.__new__(ProcessOutputs)
+    outputs.output_choice = "local"
+    outputs.local_output_folder = str(folder)
+    selected_pads = {
+        Optimize._decision_var_key_tuple(entity, pad, 50): 1.0 for entity, pad in pads
+    }
+    tt_pad_data, utt_pad_data = outputs.segregate_data(selected_pads)
+    outputs.save_data(tt_pad_data, "TTpad")
+    outputs.save_data(utt_pad_data, "UTTpad")
+
+
+def test_previous_pads_are_read_from_the_latest_outputs(tmp_path, monkeypatch):
+    _save_pads(
+        tmp_path,
+        monkeypatch,
+        "2025-01-02 080000",
+        [(GROUND_ODS, 3.0), (AIR_ODS, 1.0), (WAREHOUSE, 2.0)],
+    )
+    _save_pads(
+        tmp_path,
+        monkeypatch,
+        "2025-01-10 080000",
+        [(GROUND_ODS, -0.5), (WAREHOUSE, 1.25), (OTHER_WAREHOUSE, 0.0)],
+    )
+
+    assert read_previous_pads(str(tmp_path)) == {
+        ("W000", "100", "UPS_GROUND"): -0.5,
+        ("W000", "SWA_DEST", "SWA"): 1.25,
+        ("W001", "SWA_DEST", "SWA"): 0.0,
+    }
+    assert read_previous_pads(str(tmp_path / "missing")) == {}
+
+
+def _columns(candidates) -> ModelColumns:
+    columns = ModelColumns()
+    for entity, pads, objective in candidates:
+        for pad, cost in zip(pads, objective):
+            columns.add(entity, pad, 50.0, cost)
+    columns.finalize()
+    return columns
+
+
+def test_warm_start_starts_from_the_closest_pad_and_the_higher_on_a_tie(tmp_path, monkeypatch):
+    _save_pads(tmp_path, monkeypatch, "2025-01-10 080000", [(GROUND_ODS, 0.5), (WAREHOUSE, 1.9)])
+    columns = _columns(
+        [
+            (GROUND_ODS, [-1.0, 0.0, 1.0, 2.0], [0.0, 1.0, 2.0, 3.0]),
+            (AIR_ODS, [0.0, 1.0, 2.0], [2.0, 0.5, 1.0]),
+            (WAREHOUSE, [0.0, 1.0, 2.0, 3.0], [0.0, 1.0, 2.0, 3.0]),
+        ]
+    )
+
+    choice, num_matched = warm_start_choice(columns, read_previous_pads(str(tmp_path)))
+
+    # 0.5 is as close to 0 as to 1, AIR_ODS has no previous pad and takes its least cost
+    assert columns.pads[choice].tolist() == [1.0, 1.0, 2.0]
+    assert num_matched == 2
+
+
+def test_start_violating_a_dea_row_is_repaired_to_a_feasible_one():
+    columns = _columns(
+        [
+            (GROUND_ODS, [0.0, 1.0, 2.0], [0.0, 1.0, 3.0]),
+            (AIR_ODS, [0.0, 1.0, 2.0], [0.0, 2.0, 2.5]),
+            (WAREHOUSE, [0.0, 1.0, 2.0], [0.0, 0.5, 1.0]),
+        ]
+    )
+    # The DEA of a column grows with its pad; the row asks for an average of at least 0.7
+    dea = np.tile([0.4, 0.7, 0.9], 3)
+    coefficients = (dea / 3)[None, :]
+    rhs = np.array([0.7])
+    start = np.array([0, 3, 6])
+    assert (coefficients[:, start].sum(axis=1) < rhs).all()
+
+    choice = repair_solution(columns.group_starts, columns.objective, coefficients, rhs, start)
+
+    assert choice is not None
+    np.testing.assert_array_equal(columns.group[choice], [0, 1, 2])
+    assert (coefficients[:, choice].sum(axis=1) >= rhs - 1e-9).all()
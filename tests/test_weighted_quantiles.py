@@ -0,0 +1,78 @@
+"""The segmented forecast engine gives the forecasts of the per-entity reference computation."""
+
+import numpy as np
+from conftest import make_config, shipments_frame
+
+from direct_fulfillment_speed.entities.shipment import ShipmentClass
+from direct_fulfillment_speed.inputs.read_inputs import ReadInputs
+from direct_fulfillment_speed.optimization.predict import Predict
+from direct_fulfillment_speed.optimization.weighted_quantiles import forecast_quantiles
+
+
+def _random_segments(seed: int):
+    """Segments of shipments with tied dates and values, zeros and single shipments."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.choice([1, 1, 2, 3, 8, 40, 300], 80)
+    num_rows = int(lengths.sum())
+    # Whole hours over a few weeks, so many shipments share their date or their day offset
+    order_dates = np.datetime64("2025-01-01T00:00:00") + (
+        rng.integers(0, 30 * 24, num_rows) * 3600
+    ).astype("timedelta64[s]")
+    same_date = np.repeat(rng.random(len(lengths)) < 0.2, lengths)
+    order_dates[same_date] = np.datetime64("2025-01-10T12:00:00")
+    values = rng.integers(-3, 5, num_rows) + rng.choice([0.0, 0.0, 0.5], num_rows)
+    return lengths, order_dates, values
+
+
+def test_segmented_forecasts_match_the_reference_of_every_segment():
+    config = make_config("s3://bucket/inputs/*.parquet", "parquet")
+    predict = Predict(config, ShipmentClass(config))
+    quantiles = np.array(predict.quantile_list, dtype=np.float64) / 100.0
+
+    for seed in range(5):
+        lengths, order_dates, values = _random_segments(seed)
+        for lambda_decay in (0.1, 0.5):
+            predict.lambda_decay = lambda_decay
+            quantile_matrix, has_zero = forecast_quantiles(
+                lengths, order_dates, values, quantiles, lambda_decay
+            )
+            forecast_values, forecast_valid = predict.forecasts.finalize(
+                quantiles, quantile_matrix, has_zero
+            )
+
+            stops = np.cumsum(lengths)
+            for index, (start, stop) in enumerate(zip(stops - lengths, stops)):
+                weights = predict.calculate_time_decay_weights(
+                    order_dates[start:stop], lambda_decay
+                )
+                expected = predict.adjust_quantiles(
+                    values[start:stop].tolist(), weights, predict.quantile_list
+                )
+                columns = np.flatnonzero(forecast_valid[index])
+                forecast = dict(
+                    zip(
+                        predict.forecasts.quantiles[columns].tolist(),
+                        forecast_values[index, columns].tolist(),
+                    )
+                )
+                assert forecast == expected, (seed, lambda_decay, index)
+
+
+def test_process_ods_matches_the_weighted_average_of_every_entity(fake_s3):
+    shipments_frame(4000).to_parquet(fake_s3 / "shipments.parquet", index=False)
+    config = make_config("s3://bucket/inputs/shipments.parquet", "parquet")
+    shipments = ReadInputs(config).read_shipments()
+    predict = Predict(config, shipments)
+
+    entities = [
+        entity
+        for group in ("THIRD_PARTY", "SWA")
+        for entity, rows in shipments.shipment_groups[group].items()
+        if len(rows)
+    ]
+    assert len(entities) > 50
+    predict.process_ods(entities)
+
+    for entity in entities:
+        expected = predict.calculate_weighted_average(shipments.get_shipments_for_entity(entity))
+        assert predict.forecasts.to_dict(predict.forecasts.rows[entity]) == expected, entity